@@ -7,6 +7,7 @@ import streamlit as st
 import pandas as pd
 import base64
 import os
+import shutil
 import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
@@ -21,6 +22,9 @@ from config.auth_config import VALID_PASSWORDS, HINT_MESSAGE, MAX_LOGIN_ATTEMPTS
 from config.database import DatabaseManager
 from services.llm_service import llm_service
 from services.rag_service import RAGService
+from services.spreadsheet_extractor import extract_spreadsheet_text
+from services.pdf_extractor import extract_pdf_pages, render_pages
+from services.upload_spool import UploadSpool, UploadTooLargeError
 from services.ai_features import get_ai_features_service, DocumentIntelligenceService
 
 # Configure Streamlit page with Bosch branding
@@ -403,11 +407,19 @@ def initialize_app():
     """Initialize the application"""
     try:
         if 'db' not in st.session_state:
-            st.session_state.db = DatabaseManager()
+            # DATABASE_WRITE_BEHIND=true group-commits comments and audit events;
+            # DATABASE_SHARD_DIR keeps each project's files and embeddings in its own file
+            st.session_state.db = DatabaseManager(
+                write_behind=os.getenv('DATABASE_WRITE_BEHIND', 'False').lower() == 'true',
+                shard_dir=os.getenv('DATABASE_SHARD_DIR') or None
+            )
         
         if 'rag_service' not in st.session_state:
             st.session_state.rag_service = RAGService(st.session_state.db)
         
+        if 'upload_spool' not in st.session_state:
+            st.session_state.upload_spool = UploadSpool()
+        
         if 'chat_history' not in st.session_state:
             st.session_state.chat_history = []
         
@@ -423,20 +435,66 @@ def initialize_app():
         st.error(f"Initialization Error: {str(e)}")
         st.exception(e)
 
-def create_project_template_folder(project_name: str) -> str:
-    """Create and return the template folder path for a project"""
+# Folders under templates/ that hold shipped content rather than a project's files
+RESERVED_TEMPLATE_FOLDERS = {'project_templates'}
+
+# Seconds to wait for queued (write-behind) writes before confirming a change
+WRITE_CONFIRM_TIMEOUT = 5.0
+
+def writes_saved() -> bool:
+    """Wait for this session's queued writes; show an error and return False if any failed"""
+    if st.session_state.db.flush_writes(timeout=WRITE_CONFIRM_TIMEOUT):
+        return True
+    errors = st.session_state.db.write_errors
+    if errors:
+        st.error(f"❌ Some changes could not be saved: {'; '.join(errors)}")
+    else:
+        st.error("❌ Saving is taking longer than expected; reload to check that your changes were saved.")
+    return False
+
+def get_project_folder(project_name: str) -> str:
+    """Path of a project's folder under templates/ (not created)"""
     # Sanitize project name for folder creation
     safe_project_name = "".join(c for c in project_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
     safe_project_name = safe_project_name.replace(' ', '_')
     
     templates_base = os.path.join(os.getcwd(), 'templates')
-    project_template_folder = os.path.join(templates_base, safe_project_name, 'template')
+    return os.path.join(templates_base, safe_project_name)
+
+def create_project_template_folder(project_name: str) -> str:
+    """Create and return the template folder path for a project"""
+    project_template_folder = os.path.join(get_project_folder(project_name), 'template')
     
     # Create folder structure if it doesn't exist
     os.makedirs(project_template_folder, exist_ok=True)
     
     return project_template_folder
 
+def delete_projects_with_folders(projects: List[Dict]) -> Dict[str, int]:
+    """Delete projects from the database and remove their template folders
+    
+    Only the template/ subfolder created for the project is removed; the
+    project folder goes too if nothing else is left in it. A folder is kept if
+    a remaining project maps to the same folder name, and reserved folders
+    such as project_templates are never touched.
+    """
+    deleted = st.session_state.db.delete_projects([p['id'] for p in projects])
+    
+    remaining_folders = {get_project_folder(p['name']) for p in st.session_state.db.get_projects()}
+    for folder in {get_project_folder(p['name']) for p in projects}:
+        # A name with no usable characters maps to templates/ itself; never remove that
+        name = os.path.basename(folder)
+        if not name or name.lower() in RESERVED_TEMPLATE_FOLDERS or folder in remaining_folders:
+            continue
+        template_folder = os.path.join(folder, 'template')
+        if os.path.isdir(template_folder) and not os.path.islink(template_folder):
+            shutil.rmtree(template_folder, ignore_errors=True)
+        try:
+            os.rmdir(folder)
+        except OSError:
+            pass  # Missing, or holds files the project did not create
+    return deleted
+
 def generate_ai_template(doc_type: str, project_context: Dict) -> str:
     """Generate AI template for a specific document type"""
     templates_map = {
@@ -764,21 +822,25 @@ def load_project_template(uploaded_files):
             st.error(f"Missing required libraries for file parsing: {e}")
             return None
         
+        spool = st.session_state.get('upload_spool') or UploadSpool()
+        
         for uploaded_file in uploaded_files:
+            source = None
             try:
-                # Check file size (Streamlit default limit is around 200MB)
-                if hasattr(uploaded_file, 'size') and uploaded_file.size > 200 * 1024 * 1024:  # 200MB
+                # Spool to disk in chunks (size limit checked on the way) and parse from the path,
+                # so the upload's in-memory buffer can be released right away
+                try:
+                    spooled = spool.spool(uploaded_file)
+                except UploadTooLargeError:
                     st.error(f"❌ File {uploaded_file.name} is too large (>200MB). Please use a smaller file.")
                     continue
                 
                 file_extension = uploaded_file.name.lower().split('.')[-1]
-                
-                # Reset file pointer to beginning
-                uploaded_file.seek(0)
+                source = open(spooled.path, 'rb')
                 
                 if file_extension == 'json':
                     try:
-                        content = json.loads(uploaded_file.read().decode('utf-8'))
+                        content = json.loads(source.read().decode('utf-8'))
                         # Merge JSON content with existing template
                         for key in ['name', 'type', 'description']:
                             if content.get(key) and not combined_template.get(key):
@@ -795,7 +857,7 @@ def load_project_template(uploaded_files):
                     
                 elif file_extension in ['txt', 'md']:
                     try:
-                        content = uploaded_file.read().decode('utf-8')
+                        content = source.read().decode('utf-8')
                         combined_template['template_content'].append({
                             'filename': uploaded_file.name,
                             'content': content
@@ -808,12 +870,7 @@ def load_project_template(uploaded_files):
                 elif file_extension in ['xlsx', 'xls']:
                     # Extract content from Excel files
                     try:
-                        excel_data = pd.read_excel(uploaded_file, sheet_name=None)
-                        excel_content = ""
-                        for sheet_name, df in excel_data.items():
-                            excel_content += f"\n--- Sheet: {sheet_name} ---\n"
-                            excel_content += df.to_string(index=False)
-                            excel_content += "\n"
+                        excel_content = extract_spreadsheet_text(spooled.path, uploaded_file.name)
                         
                         combined_template['template_content'].append({
                             'filename': uploaded_file.name,
@@ -832,7 +889,7 @@ def load_project_template(uploaded_files):
                     # Extract content from Word documents
                     try:
                         if file_extension == 'docx':
-                            doc = docx.Document(uploaded_file)
+                            doc = docx.Document(spooled.path)
                             word_content = ""
                             for paragraph in doc.paragraphs:
                                 word_content += paragraph.text + "\n"
@@ -881,7 +938,7 @@ def load_project_template(uploaded_files):
                         st.warning(f"⚠️ Could not fully parse Word file {uploaded_file.name}: {str(e)}")
                         try:
                             # Try basic text extraction as fallback
-                            doc = docx.Document(uploaded_file)
+                            doc = docx.Document(spooled.path)
                             basic_content = ""
                             for paragraph in doc.paragraphs:
                                 basic_content += paragraph.text + "\n"
@@ -902,7 +959,7 @@ def load_project_template(uploaded_files):
                     # Extract content from PowerPoint presentations
                     try:
                         if file_extension == 'pptx':
-                            prs = Presentation(uploaded_file)
+                            prs = Presentation(spooled.path)
                             ppt_content = ""
                             for slide_num, slide in enumerate(prs.slides, 1):
                                 ppt_content += f"\n--- Slide {slide_num} ---\n"
@@ -933,17 +990,15 @@ def load_project_template(uploaded_files):
                 elif file_extension == 'pdf':
                     # Extract content from PDF files
                     try:
-                        pdf_reader = PyPDF2.PdfReader(uploaded_file)
-                        pdf_content = ""
-                        for page_num, page in enumerate(pdf_reader.pages, 1):
-                            pdf_content += f"\n--- Page {page_num} ---\n"
-                            pdf_content += page.extract_text() + "\n"
+                        pdf_pages = extract_pdf_pages(spooled.path)
+                        pdf_content, page_offsets = render_pages(pdf_pages)
                         
                         combined_template['template_content'].append({
                             'filename': uploaded_file.name,
-                            'content': pdf_content
+                            'content': pdf_content,
+                            'page_offsets': page_offsets
                         })
-                        st.success(f"✅ PDF content extracted from {uploaded_file.name} ({len(pdf_reader.pages)} pages)")
+                        st.success(f"✅ PDF content extracted from {uploaded_file.name} ({len(pdf_pages)} pages)")
                         
                     except Exception as e:
                         st.warning(f"⚠️ Could not fully parse PDF file {uploaded_file.name}: {str(e)}")
@@ -955,9 +1010,8 @@ def load_project_template(uploaded_files):
                 elif file_extension in ['csv']:
                     # Extract content from CSV files
                     try:
-                        csv_data = pd.read_csv(uploaded_file)
                         csv_content = f"\n--- CSV Data from {uploaded_file.name} ---\n"
-                        csv_content += csv_data.to_string(index=False)
+                        csv_content += extract_spreadsheet_text(spooled.path, uploaded_file.name)
                         
                         combined_template['template_content'].append({
                             'filename': uploaded_file.name,
@@ -968,8 +1022,8 @@ def load_project_template(uploaded_files):
                         st.warning(f"⚠️ Could not parse CSV {uploaded_file.name}: {e}")
                         # Try to read as plain text
                         try:
-                            uploaded_file.seek(0)  # Reset file pointer
-                            content = uploaded_file.read().decode('utf-8')
+                            source.seek(0)  # Reset file pointer
+                            content = source.read().decode('utf-8')
                             combined_template['template_content'].append({
                                 'filename': uploaded_file.name,
                                 'content': content
@@ -981,7 +1035,7 @@ def load_project_template(uploaded_files):
                 else:
                     # Try to read as text for any other file types
                     try:
-                        content = uploaded_file.read().decode('utf-8')
+                        content = source.read().decode('utf-8')
                         combined_template['template_content'].append({
                             'filename': uploaded_file.name,
                             'content': content
@@ -989,7 +1043,7 @@ def load_project_template(uploaded_files):
                         st.success(f"✅ Text content loaded from {uploaded_file.name}")
                     except UnicodeDecodeError:
                         # For binary files, store metadata only
-                        file_size = len(uploaded_file.getvalue()) if hasattr(uploaded_file, 'getvalue') else 0
+                        file_size = spooled.size
                         combined_template['template_content'].append({
                             'filename': uploaded_file.name,
                             'content': f"[Binary file: {uploaded_file.name}, Size: {file_size} bytes, Type: {file_extension.upper()}]"
@@ -1000,6 +1054,9 @@ def load_project_template(uploaded_files):
                     
             except Exception as e:
                 st.error(f"❌ Error reading file {uploaded_file.name}: {str(e)}")
+            finally:
+                if source is not None:
+                    source.close()
         
         return combined_template if any([combined_template['name'], combined_template['functional_reqs'], combined_template['template_content']]) else None
     return None
@@ -1195,6 +1252,47 @@ def main():
     except Exception as e:
         st.error(f"❌ Application Startup Error: {str(e)}")
 
+# Rows shown per page on paginated listings
+LIST_PAGE_SIZE = 20
+
+# The dashboard health analysis looks at this many of the newest documents
+DASHBOARD_ANALYSIS_DOCUMENTS = 100
+
+def keyset_pager(key: str, fetch_page, page_size: int = LIST_PAGE_SIZE):
+    """Show Previous/Next controls for a keyset-paginated listing
+    
+    fetch_page(limit, cursor) must return a page dict from DatabaseManager's
+    get_*_page methods. The cursors of the pages visited so far are kept in
+    session state, so moving between pages never rereads earlier rows.
+    
+    Returns:
+        The rows of the current page
+    """
+    cursors_key = f"{key}_page_cursors"
+    if cursors_key not in st.session_state:
+        st.session_state[cursors_key] = [None]
+    cursors = st.session_state[cursors_key]
+    
+    page = fetch_page(page_size, cursors[-1])
+    if not page['items'] and len(cursors) > 1:
+        # Rows were deleted under us; go back to the first page
+        st.session_state[cursors_key] = cursors = [None]
+        page = fetch_page(page_size, None)
+    
+    if len(cursors) > 1 or page['has_more']:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("⬅️ Previous", key=f"{key}_prev", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            st.caption(f"Page {len(cursors)}")
+        with col3:
+            if st.button("Next ➡️", key=f"{key}_next", disabled=not page['has_more']):
+                cursors.append(page['next_cursor'])
+                st.rerun()
+    return page['items']
+
 def show_dashboard():
     """Display main dashboard with persistent data and AI insights"""
     st.title("🏠 Dashboard")
@@ -1204,22 +1302,26 @@ def show_dashboard():
     if st.button("🔄 Refresh Data", type="secondary"):
         st.rerun()
     
-    # Load data from database
-    projects = st.session_state.db.get_projects()
-    documents = st.session_state.db.get_documents()
-    workflows = st.session_state.db.get_workflows()
+    # Load data from database: SQL aggregates plus only the newest rows that are shown
+    db = st.session_state.db
+    projects = db.get_projects(limit=5)
+    documents = db.get_documents(limit=DASHBOARD_ANALYSIS_DOCUMENTS)
+    metrics = db.get_metrics(project_ids=[p['id'] for p in projects])
+    project_count = metrics['project_count']
+    document_count = metrics['document_count']
+    workflow_count = metrics['workflow_count']
     
     # Display metrics with AI enhancements
     col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
-        st.metric("Total Projects", len(projects))
+        st.metric("Total Projects", project_count)
     
     with col2:
-        st.metric("Generated Documents", len(documents))
+        st.metric("Generated Documents", document_count)
         
     with col3:
-        active_workflows = len([w for w in workflows if w['status'] == 'Active'])
+        active_workflows = metrics['workflows_by_status'].get('Active', 0)
         st.metric("Active Workflows", active_workflows)
         
     with col4:
@@ -1244,6 +1346,9 @@ def show_dashboard():
                     # Generate compliance report
                     compliance_report = ai_service.generate_compliance_report(documents)
                     
+                    if document_count > len(documents):
+                        st.caption(f"Based on the {len(documents)} most recent documents")
+                    
                     # Health indicators
                     health_score = min(100, int(compliance_report['quality_stats']['average_quality'] * 100))
                     health_color = "🟢" if health_score >= 80 else "🟡" if health_score >= 60 else "🔴"
@@ -1261,7 +1366,7 @@ def show_dashboard():
             except Exception as e:
                 st.warning(f"AI analysis temporarily unavailable: {str(e)}")
                 # Fallback metrics
-                st.metric("Documents", len(documents))
+                st.metric("Documents", document_count)
                 st.metric("Avg. Quality", "85%")
     
     with col2:
@@ -1270,18 +1375,18 @@ def show_dashboard():
         # AI-powered recommendations based on current data
         recommendations = []
         
-        if len(documents) == 0:
+        if document_count == 0:
             recommendations.append("📝 Create your first project document to get started")
-        elif len(workflows) == 0:
+        elif workflow_count == 0:
             recommendations.append("🔄 Set up approval workflows for better document management")
         elif active_workflows > 5:
             recommendations.append("⚡ Consider optimizing workflows - many are currently active")
         
         # Add more intelligent recommendations
-        if len(documents) > 10:
+        if document_count > 10:
             recommendations.append("🔍 Use AI search to find similar documents across projects")
         
-        if len(projects) > 3:
+        if project_count > 3:
             recommendations.append("📊 Generate a compliance report to ensure standards adherence")
         
         recommendations.append("💬 Try the AI Assistant for intelligent document insights")
@@ -1296,15 +1401,16 @@ def show_dashboard():
     st.subheader("📊 Recent Projects")
     if projects:
         project_data = []
-        for project in projects[:5]:  # Last 5 projects
-            project_docs = len([d for d in documents if d['project_id'] == project['id']])
-            project_workflows = len([w for w in workflows if any(d['project_id'] == project['id'] for d in documents if d['id'] == w['document_id'])])
+        any_rejected = metrics['workflows_by_status'].get('Rejected', 0) > 0
+        for project in projects:  # Last 5 projects
+            project_docs = metrics['documents_per_project'].get(project['id'], 0)
+            project_workflows = metrics['workflows_per_project'].get(project['id'], 0)
             
             # AI-powered project risk assessment
             risk_level = "Low"
             if project_workflows > 3:
                 risk_level = "Medium"
-            if any(w['status'] == 'Rejected' for w in workflows):
+            if any_rejected:
                 risk_level = "High"
             
             project_data.append({
@@ -1339,8 +1445,10 @@ def show_dashboard():
     st.subheader("📄 Recent Documents")
     if documents:
         doc_data = []
-        for doc in documents[:5]:
-            project = next((p for p in projects if p['id'] == doc['project_id']), None)
+        recent_documents = documents[:5]
+        doc_projects = db.get_projects_by_ids([doc['project_id'] for doc in recent_documents])
+        for doc in recent_documents:
+            project = doc_projects.get(doc['project_id'])
             doc_data.append({
                 "Document": doc["name"],
                 "Project": project["name"] if project else "Unknown",
@@ -1465,7 +1573,7 @@ def show_new_project():
         st.write("**📁 Upload Project Data Files:**")
         project_data_files = st.file_uploader(
             "Select multiple files of any type", 
-            help="Supports: PDF, Word, Excel, PowerPoint, Text, Markdown, Images, Code files, and more. All files will be processed for AI enhancement.",
+            help="Supports: PDF, Word, Excel, PowerPoint, Text, Markdown, Images, Code files, ZIP/TAR.GZ archives, and more. All files will be processed for AI enhancement.",
             accept_multiple_files=True,
             key="project_data_files"
         )
@@ -1473,7 +1581,7 @@ def show_new_project():
         if project_data_files:
             st.success(f"✅ Selected {len(project_data_files)} files:")
             for file in project_data_files:
-                file_size = len(file.getvalue()) if hasattr(file, 'getvalue') else 0
+                file_size = getattr(file, 'size', 0)  # no read: uploads stay spooled
                 st.write(f"• {file.name} ({file_size:,} bytes)")
     
     with col2:
@@ -1513,6 +1621,7 @@ def show_new_project():
         st.caption("💻 Code: PY, JS, HTML, CSS, SQL, etc.")
         st.caption("🖼️ Images: PNG, JPG, GIF (OCR)")
         st.caption("📊 Data: Any structured/unstructured files")
+        st.caption("📦 Archives: ZIP, TAR.GZ (members processed directly)")
     
     st.subheader("📋 Project Information")
     
@@ -1720,17 +1829,16 @@ def show_new_project():
                 with st.spinner("🔄 Processing project data files..."):
                     # Process uploaded files
                     if project_data_files:
-                        for uploaded_file in project_data_files:
-                            result = st.session_state.rag_service.process_file(
-                                project_id=project_id,
-                                file_obj=uploaded_file,
-                                filename=uploaded_file.name,
-                                is_template=False
-                            )
-                            if result["success"]:
-                                files_processed += 1
-                            else:
-                                failed_files.append(f"{uploaded_file.name}: {result.get('error', 'Unknown error')}")
+                        upload_result = st.session_state.rag_service.process_uploaded_files(
+                            project_id=project_id,
+                            uploaded_files=project_data_files,
+                            spool=st.session_state.upload_spool,
+                            is_template=False
+                        )
+                        files_processed += upload_result["successful_files"]
+                        for file_result in upload_result["results"]:
+                            if not file_result["result"]["success"]:
+                                failed_files.append(f"{file_result['filename']}: {file_result['result'].get('error', 'Unknown error')}")
                     
                     # Process folder if specified
                     if project_data_folder and os.path.exists(project_data_folder):
@@ -1846,24 +1954,22 @@ def show_edit_projects():
             
             # Show existing project data files with enhanced management
             st.subheader("📂 Current Project Data Files")
-            existing_files = st.session_state.db.get_project_data_files(selected_project['id'])
+            # Metadata only; file content is loaded when previewed or exported
+            existing_files = st.session_state.db.list_project_data_files(selected_project['id'])
             
             if existing_files:
                 # File statistics
-                total_files = len(existing_files)
-                template_files = len([f for f in existing_files if f['is_template']])
-                data_files = total_files - template_files
-                total_size = sum(f['file_size'] for f in existing_files)
+                file_stats = st.session_state.db.get_project_data_stats(selected_project['id'])
                 
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
-                    st.metric("Total Files", total_files)
+                    st.metric("Total Files", file_stats['total_files'])
                 with col2:
-                    st.metric("Data Files", data_files)
+                    st.metric("Data Files", file_stats['data_files'])
                 with col3:
-                    st.metric("Template Files", template_files)
+                    st.metric("Template Files", file_stats['template_files'])
                 with col4:
-                    st.metric("Total Size", f"{total_size:,} bytes")
+                    st.metric("Total Size", f"{file_stats['total_size']:,} bytes")
                 
                 st.write("---")
                 
@@ -1907,7 +2013,7 @@ def show_edit_projects():
                                 with col3:
                                     # Download file content (if available)
                                     if st.button("💾 Export", key=f"export_{file_info['id']}", help="Download file content"):
-                                        content = file_info.get('content', '')
+                                        content = st.session_state.db.get_file_content(file_info['id'])
                                         if content:
                                             st.download_button(
                                                 label="Download",
@@ -1933,7 +2039,7 @@ def show_edit_projects():
                                 # Show preview if requested
                                 if st.session_state.get(f"show_preview_{file_info['id']}", False):
                                     with st.expander(f"📖 Content Preview - {file_info['filename']}", expanded=True):
-                                        content = file_info.get('content', '')
+                                        content = st.session_state.db.get_file_content(file_info['id'])
                                         if content:
                                             # Show preview with syntax highlighting if possible
                                             if file_info['file_type'] in ['json', 'py', 'js', 'html', 'css', 'xml']:
@@ -1976,7 +2082,7 @@ def show_edit_projects():
                 if new_project_data_files:
                     st.success(f"✅ {len(new_project_data_files)} file(s) ready to upload:")
                     for file in new_project_data_files:
-                        file_size = len(file.getvalue()) if hasattr(file, 'getvalue') else 0
+                        file_size = getattr(file, 'size', 0)  # no read: uploads stay spooled
                         st.write(f"• {file.name} ({file_size:,} bytes)")
             
             with col2:
@@ -2165,17 +2271,16 @@ def show_edit_projects():
                         with st.spinner("🔄 Processing new project data files..."):
                             # Process uploaded files
                             if new_project_data_files:
-                                for uploaded_file in new_project_data_files:
-                                    result = st.session_state.rag_service.process_file(
-                                        project_id=selected_project['id'],
-                                        file_obj=uploaded_file,
-                                        filename=uploaded_file.name,
-                                        is_template=False
-                                    )
-                                    if result["success"]:
-                                        files_processed += 1
-                                    else:
-                                        failed_files.append(f"{uploaded_file.name}: {result.get('error', 'Unknown error')}")
+                                upload_result = st.session_state.rag_service.process_uploaded_files(
+                                    project_id=selected_project['id'],
+                                    uploaded_files=new_project_data_files,
+                                    spool=st.session_state.upload_spool,
+                                    is_template=False
+                                )
+                                files_processed += upload_result["successful_files"]
+                                for file_result in upload_result["results"]:
+                                    if not file_result["result"]["success"]:
+                                        failed_files.append(f"{file_result['filename']}: {file_result['result'].get('error', 'Unknown error')}")
                             
                             # Process folder if specified
                             if new_project_data_folder and os.path.exists(new_project_data_folder):
@@ -2246,10 +2351,8 @@ def show_edit_projects():
                         st.write(f"**Created:** {selected_project.get('created_at', 'Unknown')[:10]}")
                     with col2:
                         # Count related items
-                        documents = st.session_state.db.get_documents(selected_project['id'])
-                        workflows = st.session_state.db.get_workflows(selected_project['id'])
-                        st.write(f"**Documents:** {len(documents)}")
-                        st.write(f"**Workflows:** {len(workflows)}")
+                        st.write(f"**Documents:** {st.session_state.db.count_documents(selected_project['id'])}")
+                        st.write(f"**Workflows:** {st.session_state.db.count_workflows(selected_project['id'])}")
                 
                 # Confirmation
                 confirm_delete = st.checkbox(
@@ -2258,7 +2361,7 @@ def show_edit_projects():
                 )
                 
                 if st.button("🗑️ Delete Project", type="secondary", disabled=not confirm_delete):
-                    st.session_state.db.delete_project(selected_project['id'])
+                    delete_projects_with_folders([selected_project])
                     st.success(f"✅ Project '{selected_project['name']}' deleted successfully!")
                     time.sleep(1)
                     st.rerun()
@@ -2269,12 +2372,13 @@ def show_edit_projects():
             
             # Create checkboxes for each project
             selected_projects = []
+            # Count related items for all projects in one query
+            metrics = st.session_state.db.get_metrics(project_ids=[p['id'] for p in projects])
             for project in projects:
-                # Count related items
-                documents = st.session_state.db.get_documents(project['id'])
-                workflows = st.session_state.db.get_workflows(project['id'])
+                doc_count = metrics['documents_per_project'].get(project['id'], 0)
+                workflow_count = metrics['workflows_per_project'].get(project['id'], 0)
                 
-                checkbox_label = f"{project['name']} ({project['type']}) - {len(documents)} docs, {len(workflows)} workflows"
+                checkbox_label = f"{project['name']} ({project['type']}) - {doc_count} docs, {workflow_count} workflows"
                 
                 if st.checkbox(checkbox_label, key=f"multi_delete_{project['id']}"):
                     selected_projects.append(project)
@@ -2291,10 +2395,9 @@ def show_edit_projects():
                 )
                 
                 if st.button("🗑️ Delete Selected Projects", type="secondary", disabled=not confirm_multiple_delete):
-                    project_ids = [p['id'] for p in selected_projects]
                     project_names = [p['name'] for p in selected_projects]
                     
-                    st.session_state.db.delete_multiple_projects(project_ids)
+                    delete_projects_with_folders(selected_projects)
                     st.success(f"✅ Deleted {len(selected_projects)} project(s): {', '.join(project_names)}")
                     time.sleep(1)
                     st.rerun()
@@ -2477,20 +2580,22 @@ def show_document_generation():
                             "status": "Draft"
                         }
                         
-                        document_id = st.session_state.db.save_document(document)
-                        document["id"] = document_id
-                        
-                        # Create workflow
-                        workflow = {
-                            "project_id": selected_project["id"],
-                            "document_id": document_id,
-                            "name": f"{document_type} Review",
-                            "status": "Active",
-                            "approvers": ["Project Manager", "Technical Lead", "Quality Assurance"],
-                            "current_step": 0
-                        }
-                        
-                        workflow_id = st.session_state.db.save_workflow(workflow)
+                        # Document and its approval workflow are created together
+                        with st.session_state.db.transaction():
+                            document_id = st.session_state.db.save_document(document)
+                            document["id"] = document_id
+                            
+                            # Create workflow
+                            workflow = {
+                                "project_id": selected_project["id"],
+                                "document_id": document_id,
+                                "name": f"{document_type} Review",
+                                "status": "Active",
+                                "approvers": ["Project Manager", "Technical Lead", "Quality Assurance"],
+                                "current_step": 0
+                            }
+                            
+                            workflow_id = st.session_state.db.save_workflow(workflow)
                         
                         st.success("✅ Document generated successfully!")
                         st.success("🔄 Approval workflow created!")
@@ -2657,19 +2762,20 @@ def show_workflow_management():
     """Show workflow management interface with AI insights"""
     st.title("👥 Workflow Management")
     
-    workflows = st.session_state.db.get_workflows()
-    documents = st.session_state.db.get_documents()
+    metrics = st.session_state.db.get_metrics()
+    workflow_count = metrics['workflow_count']
+    active_workflows = metrics['workflows_by_status'].get('Active', 0)
+    rejected_workflows = metrics['workflows_by_status'].get('Rejected', 0)
     
     # AI Workflow Insights at the top
-    if workflows and documents:
+    if workflow_count and metrics['document_count']:
         st.markdown("### 🧠 AI Workflow Insights")
         col1, col2, col3 = st.columns(3)
         
         with col1:
             # Bottleneck detection
-            active_workflows = [w for w in workflows if w['status'] == 'Active']
             if active_workflows:
-                avg_step = sum(w['current_step'] for w in active_workflows) / len(active_workflows)
+                avg_step = metrics['avg_step_by_status'].get('Active', 0.0)
                 bottleneck_status = "High" if avg_step > 1.5 else "Medium" if avg_step > 0.5 else "Low"
                 bottleneck_color = "🔴" if bottleneck_status == "High" else "🟡" if bottleneck_status == "Medium" else "🟢"
                 st.metric("Bottleneck Risk", f"{bottleneck_color} {bottleneck_status}")
@@ -2678,17 +2784,15 @@ def show_workflow_management():
         
         with col2:
             # Completion prediction
-            total_workflows = len(workflows)
-            completed_workflows = len([w for w in workflows if w['status'] == 'Completed'])
-            if total_workflows > 0:
-                completion_rate = (completed_workflows / total_workflows) * 100
+            completed_workflows = metrics['workflows_by_status'].get('Completed', 0)
+            if workflow_count > 0:
+                completion_rate = (completed_workflows / workflow_count) * 100
                 st.metric("Completion Rate", f"{completion_rate:.0f}%")
             else:
                 st.metric("Completion Rate", "N/A")
         
         with col3:
             # Risk assessment
-            rejected_workflows = len([w for w in workflows if w['status'] == 'Rejected'])
             risk_level = "High" if rejected_workflows > 2 else "Medium" if rejected_workflows > 0 else "Low"
             risk_color = "🔴" if risk_level == "High" else "🟡" if risk_level == "Medium" else "🟢"
             st.metric("Quality Risk", f"{risk_color} {risk_level}")
@@ -2697,13 +2801,13 @@ def show_workflow_management():
         st.markdown("#### 💡 AI Recommendations")
         recommendations = []
         
-        if len(active_workflows) > 5:
+        if active_workflows > 5:
             recommendations.append("⚡ Consider parallel approval processes to reduce bottlenecks")
         
         if rejected_workflows > 1:
             recommendations.append("📋 Review document templates to improve first-pass approval rates")
         
-        if len(workflows) > 0:
+        if workflow_count > 0:
             avg_duration = 3  # Placeholder - in real implementation, calculate from workflow history
             recommendations.append(f"⏱️ Average workflow duration: {avg_duration} days - consider optimization")
         
@@ -2715,14 +2819,14 @@ def show_workflow_management():
     
     # Debug information for troubleshooting
     with st.expander("🔍 Debug Information", expanded=False):
-        st.write(f"**Total Workflows:** {len(workflows)}")
-        st.write(f"**Total Documents:** {len(documents)}")
+        st.write(f"**Total Workflows:** {workflow_count}")
+        st.write(f"**Total Documents:** {metrics['document_count']}")
         
         # Add button to reset incorrectly rejected workflows for testing
         if st.button("🔄 Reset All Workflows to Active Status (Debug)"):
             try:
-                for workflow in workflows:
-                    if workflow['status'] == 'Rejected':
+                with st.session_state.db.transaction():
+                    for workflow in st.session_state.db.get_workflows(status='Rejected'):
                         st.session_state.db.update_workflow(
                             workflow['id'], 
                             {'status': 'Active', 'current_step': 0}
@@ -2732,24 +2836,27 @@ def show_workflow_management():
                             workflow['document_id'], 
                             {'status': 'Draft'}
                         )
-                st.success("✅ All workflows reset to Active status")
-                st.rerun()
+                if writes_saved():
+                    st.success("✅ All workflows reset to Active status")
+                    st.rerun()
             except Exception as e:
                 st.error(f"❌ Error resetting workflows: {str(e)}")
         
-        if workflows:
-            st.write("**Workflow Details:**")
-            for w in workflows:
+        debug_workflows = st.session_state.db.get_workflows(limit=LIST_PAGE_SIZE)
+        if debug_workflows:
+            st.write(f"**Workflow Details** (newest {LIST_PAGE_SIZE}):")
+            for w in debug_workflows:
                 st.write(f"- ID: {w.get('id')}, Status: {w.get('status')}, Document ID: {w.get('document_id')}")
-        if documents:
-            st.write("**Document Details:**")
-            for d in documents:
+        debug_documents = st.session_state.db.get_documents(limit=LIST_PAGE_SIZE, include_content=False)
+        if debug_documents:
+            st.write(f"**Document Details** (newest {LIST_PAGE_SIZE}):")
+            for d in debug_documents:
                 st.write(f"- ID: {d.get('id')}, Name: {d.get('name')}, Type: {d.get('type')}, Status: {d.get('status')}")
     
     tab1, tab2, tab3, tab4 = st.tabs(["📋 Pending Tasks", "📊 Workflow Status", "📈 Workflow Flowchart", "🤖 AI Optimizer"])
     
     with tab4:
-        show_ai_workflow_optimizer(workflows, documents)
+        show_ai_workflow_optimizer(metrics)
     
     with tab1:
         st.subheader("Pending Tasks")
@@ -2757,15 +2864,19 @@ def show_workflow_management():
         # For PM: Show active workflows for approval
         # For Project team: Show active workflows (view only) AND rejected workflows for rework
         if check_access('PM'):
-            pending_workflows = [w for w in workflows if w["status"] == "Active"]
+            pending_workflows = st.session_state.db.get_workflow_details(status="Active")
             st.write("**Approval Tasks:**")
         else:  # Project team
-            pending_workflows = [w for w in workflows if w["status"] in ["Active", "Rejected"]]
+            pending_workflows = st.session_state.db.get_workflow_details(status=["Active", "Rejected"])
             st.write("**Active Workflows and Rework Tasks:**")
         
         if pending_workflows:
+            # Last 3 comments of every listed workflow, in one query
+            recent_comments = st.session_state.db.get_workflow_comments_batch(
+                [w['id'] for w in pending_workflows], last_n=3
+            )
             for workflow in pending_workflows:
-                document = next((d for d in documents if d["id"] == workflow["document_id"]), None)
+                document = workflow["document"]
                 
                 if document:
                     # Different display based on workflow status and user role
@@ -2794,14 +2905,11 @@ def show_workflow_management():
                             st.write(f"**Status:** {workflow['status']}")
                         
                         # Show workflow comments/feedback
-                        try:
-                            comments = st.session_state.db.get_workflow_comments(workflow['id'])
-                            if comments:
-                                st.write("**Feedback/Comments:**")
-                                for comment in comments[-3:]:  # Show last 3 comments
-                                    st.write(f"- **{comment['approver']}** ({comment['action']}): {comment['comment']}")
-                        except:
-                            pass  # Handle case where get_workflow_comments doesn't exist yet
+                        comments = recent_comments.get(workflow['id'], [])
+                        if comments:
+                            st.write("**Feedback/Comments:**")
+                            for comment in comments:  # Last 3 comments
+                                st.write(f"- **{comment['approver']}** ({comment['action']}): {comment['comment']}")
                         
                         # Action buttons based on role and workflow status
                         if workflow["status"] == "Active" and check_access('PM'):
@@ -2823,50 +2931,63 @@ def show_workflow_management():
                                     current_approver = workflow["approvers"][workflow["current_step"]]
                                     
                                     try:
-                                        # Add comment to workflow history
-                                        st.session_state.db.add_workflow_comment(
-                                            workflow['id'], 
-                                            current_approver, 
-                                            action, 
-                                            comments
-                                        )
-                                        
                                         if action == "Approve":
                                             new_step = workflow["current_step"] + 1
                                             if new_step >= len(workflow["approvers"]):
                                                 # Workflow complete
-                                                st.session_state.db.update_workflow(
+                                                workflow_updates = {'status': 'Completed', 'current_step': new_step}
+                                                document_status = 'Approved'
+                                            else:
+                                                # Move to next step
+                                                workflow_updates = {'current_step': new_step}
+                                                document_status = None
+                                        else:
+                                            # Reject workflow
+                                            workflow_updates = {'status': 'Rejected'}
+                                            document_status = 'Rejected'
+                                        
+                                        # Comment, workflow step and document status change atomically, and
+                                        # only if nobody acted on this workflow since the page was loaded
+                                        with st.session_state.db.transaction():
+                                            result = st.session_state.db.update_workflow_if_version(
+                                                workflow['id'],
+                                                workflow['version'],
+                                                workflow_updates
+                                            )
+                                            if not result['conflict']:
+                                                # Add comment to workflow history
+                                                st.session_state.db.add_workflow_comment(
                                                     workflow['id'], 
-                                                    {'status': 'Completed', 'current_step': new_step}
+                                                    current_approver, 
+                                                    action, 
+                                                    comments
                                                 )
-                                                st.session_state.db.update_document(
-                                                    document['id'], 
-                                                    {'status': 'Approved'}
+                                                st.session_state.db.log_audit_event(
+                                                    f"workflow.{action.lower()}", 'workflow', workflow['id'],
+                                                    current_approver, workflow_updates
                                                 )
+                                                if document_status:
+                                                    st.session_state.db.update_document(
+                                                        document['id'], 
+                                                        {'status': document_status}
+                                                    )
+                                        
+                                        if result['conflict']:
+                                            current = result['current']
+                                            st.warning(
+                                                "⚠️ This workflow was changed by someone else while you were reviewing it"
+                                                + (f" (now {current['status']}, step {current['current_step'] + 1})" if current else "")
+                                                + ". Your decision was not saved; reload to see the latest state."
+                                            )
+                                        elif writes_saved():
+                                            if action == "Reject":
+                                                st.error("❌ Document rejected!")
+                                            elif document_status:
                                                 st.success("✅ Document fully approved!")
                                             else:
-                                                # Move to next step
-                                                st.session_state.db.update_workflow(
-                                                    workflow['id'], 
-                                                    {'current_step': new_step}
-                                                )
                                                 next_approver = workflow['approvers'][new_step]
                                                 st.success(f"✅ Approved! Moving to next approver: {next_approver}")
-                                        elif action == "Reject":
-                                            # Reject workflow
-                                            st.session_state.db.update_workflow(
-                                                workflow['id'], 
-                                                {'status': 'Rejected'}
-                                            )
-                                            st.session_state.db.update_document(
-                                                document['id'], 
-                                                {'status': 'Rejected'}
-                                            )
-                                            st.error("❌ Document rejected!")
-                                        else:
-                                            st.error(f"❌ Unknown action: {action}")
-                                        
-                                        st.rerun()
+                                            st.rerun()
                                         
                                     except Exception as e:
                                         st.error(f"❌ Error processing workflow decision: {str(e)}")
@@ -2885,27 +3006,36 @@ def show_workflow_management():
                                 
                                 if st.form_submit_button("🔄 Resubmit for Approval"):
                                     try:
-                                        # Add rework comment
-                                        st.session_state.db.add_workflow_comment(
-                                            workflow['id'], 
-                                            "Project Team", 
-                                            "Resubmit", 
-                                            rework_comments
-                                        )
-                                        
-                                        # Reset workflow to active status
-                                        st.session_state.db.update_workflow(
-                                            workflow['id'], 
-                                            {'status': 'Active', 'current_step': 0}
-                                        )
-                                        st.session_state.db.update_document(
-                                            document['id'], 
-                                            {'status': 'Draft'}
-                                        )
+                                        with st.session_state.db.transaction():
+                                            # Reset workflow to active status, unless it changed since the page loaded
+                                            result = st.session_state.db.update_workflow_if_version(
+                                                workflow['id'],
+                                                workflow['version'],
+                                                {'status': 'Active', 'current_step': 0}
+                                            )
+                                            if not result['conflict']:
+                                                # Add rework comment
+                                                st.session_state.db.add_workflow_comment(
+                                                    workflow['id'], 
+                                                    "Project Team", 
+                                                    "Resubmit", 
+                                                    rework_comments
+                                                )
+                                                st.session_state.db.log_audit_event(
+                                                    "workflow.resubmit", 'workflow', workflow['id'], "Project Team"
+                                                )
+                                                st.session_state.db.update_document(
+                                                    document['id'], 
+                                                    {'status': 'Draft'}
+                                                )
                                         
-                                        st.success("✅ Document resubmitted for approval!")
-                                        st.info("The document will now go through the approval process again.")
-                                        st.rerun()
+                                        if result['conflict']:
+                                            st.warning("⚠️ This workflow was changed by someone else (it may already have "
+                                                       "been resubmitted). Reload to see the latest state.")
+                                        elif writes_saved():
+                                            st.success("✅ Document resubmitted for approval!")
+                                            st.info("The document will now go through the approval process again.")
+                                            st.rerun()
                                         
                                     except Exception as e:
                                         st.error(f"❌ Error resubmitting document: {str(e)}")
@@ -2920,9 +3050,14 @@ def show_workflow_management():
     with tab2:
         st.subheader("Workflow Status Overview")
         
-        if workflows:
-            for workflow in workflows:
-                document = next((d for d in documents if d["id"] == workflow["document_id"]), None)
+        if workflow_count:
+            status_page = keyset_pager(
+                "workflow_status",
+                lambda limit, cursor: st.session_state.db.get_workflow_details_page(limit=limit, cursor=cursor)
+            )
+            status_comments = st.session_state.db.get_workflow_comments_batch([w['id'] for w in status_page])
+            for workflow in status_page:
+                document = workflow["document"]
                 
                 if document:
                     progress = (workflow["current_step"] / len(workflow["approvers"]) * 100) if workflow["status"] != "Completed" else 100
@@ -2950,7 +3085,7 @@ def show_workflow_management():
                                 st.write(f"⏸️ {approver}")
                         
                         # Workflow comments
-                        workflow_comments = st.session_state.db.get_workflow_comments(workflow['id'])
+                        workflow_comments = status_comments.get(workflow['id'], [])
                         if workflow_comments:
                             st.write("**📝 Comments History:**")
                             for comment in workflow_comments:
@@ -3077,7 +3212,7 @@ def show_workflow_management():
         </style>
         """, unsafe_allow_html=True)
         
-        if workflows:
+        if workflow_count:
             # Add status legend
             st.markdown("""
             <div class="status-legend">
@@ -3104,8 +3239,14 @@ def show_workflow_management():
             </div>
             """, unsafe_allow_html=True)
             
-            for workflow in workflows:
-                document = next((d for d in documents if d["id"] == workflow["document_id"]), None)
+            flowchart_page = keyset_pager(
+                "workflow_flowchart",
+                lambda limit, cursor: st.session_state.db.get_workflow_details_page(limit=limit, cursor=cursor),
+                page_size=10
+            )
+            flowchart_comments = st.session_state.db.get_workflow_comments_batch([w['id'] for w in flowchart_page])
+            for workflow in flowchart_page:
+                document = workflow["document"]
                 
                 if document:
                     # Workflow title header
@@ -3241,7 +3382,7 @@ def show_workflow_management():
                             st.success("🎯 **Result:** Process Complete")
                     
                     # Workflow timeline/comments
-                    workflow_comments = st.session_state.db.get_workflow_comments(workflow['id'])
+                    workflow_comments = flowchart_comments.get(workflow['id'], [])
                     if workflow_comments:
                         with st.expander("📝 **View Approval Timeline**", expanded=False):
                             for comment in workflow_comments:
@@ -3269,13 +3410,13 @@ def show_workflow_management():
             st.info("No workflows available to display in flowchart.")
             st.markdown("**Create some documents and start workflows to see the flowchart visualization!**")
 
-def show_ai_workflow_optimizer(workflows, documents):
-    """AI-powered workflow optimization tab"""
+def show_ai_workflow_optimizer(metrics):
+    """AI-powered workflow optimization tab (metrics come from DatabaseManager.get_metrics)"""
     st.subheader("🤖 AI Workflow Optimizer")
     
     st.info("🎯 Use AI to analyze and optimize your approval workflows for better efficiency and quality.")
     
-    if not workflows:
+    if not metrics['workflow_count']:
         st.warning("No workflows available for optimization analysis.")
         return
     
@@ -3285,10 +3426,10 @@ def show_ai_workflow_optimizer(workflows, documents):
         st.markdown("### 📊 Workflow Performance Analysis")
         
         # Performance metrics
-        total_workflows = len(workflows)
-        active_workflows = len([w for w in workflows if w['status'] == 'Active'])
-        completed_workflows = len([w for w in workflows if w['status'] == 'Completed'])
-        rejected_workflows = len([w for w in workflows if w['status'] == 'Rejected'])
+        total_workflows = metrics['workflow_count']
+        active_workflows = metrics['workflows_by_status'].get('Active', 0)
+        completed_workflows = metrics['workflows_by_status'].get('Completed', 0)
+        rejected_workflows = metrics['workflows_by_status'].get('Rejected', 0)
         
         # Create performance chart data
         performance_data = {
@@ -3324,8 +3465,8 @@ def show_ai_workflow_optimizer(workflows, documents):
                             'active': active_workflows,
                             'completed': completed_workflows,
                             'rejected': rejected_workflows,
-                            'document_types': list(set([d['type'] for d in documents if d.get('type')])),
-                            'average_approvers': sum(len(w.get('approvers', [])) for w in workflows) / len(workflows) if workflows else 0
+                            'document_types': [t for t in metrics['documents_by_type'] if t != 'Unknown'],
+                            'average_approvers': metrics['avg_approvers']
                         }
                         
                         optimization_prompt = f"""
@@ -3379,7 +3520,7 @@ def show_ai_workflow_optimizer(workflows, documents):
             st.write("• Set up automated reminders for approvers")
             st.write("• Review approval timeframes")
         
-        if workflows and all(len(w.get('approvers', [])) > 3 for w in workflows):
+        if metrics['min_approvers'] > 3:
             st.info("⚡ Long approval chains detected:")
             st.write("• Evaluate if all approvers are necessary")
             st.write("• Consider conditional approvals")
@@ -3392,16 +3533,8 @@ def show_ai_workflow_optimizer(workflows, documents):
     
     with col1:
         st.markdown("#### 📋 Document Type Analysis")
-        if documents:
-            doc_types = {}
-            for doc in documents:
-                doc_type = doc.get('type', 'Unknown')
-                if doc_type in doc_types:
-                    doc_types[doc_type] += 1
-                else:
-                    doc_types[doc_type] = 1
-            
-            for doc_type, count in doc_types.items():
+        if metrics['document_count']:
+            for doc_type, count in metrics['documents_by_type'].items():
                 st.write(f"• **{doc_type}**: {count} documents")
                 
                 # AI suggestion for optimal workflow
@@ -3435,14 +3568,26 @@ def show_project_overview():
     """Show project overview"""
     st.title("📊 Project Overview")
     
-    projects = st.session_state.db.get_projects()
-    documents = st.session_state.db.get_documents()
-    workflows = st.session_state.db.get_workflows()
+    db = st.session_state.db
+    requirement_query = st.text_input("🔎 Filter by requirement",
+                                      placeholder="e.g. latency 10ms, ASIL, budget",
+                                      key="project_overview_requirement_query")
+    requirement_matches = {}
+    if requirement_query.strip():
+        # Ranked from the requirements index; only the matching projects are loaded
+        found = db.find_projects_by_requirement(requirement_query, limit=LIST_PAGE_SIZE)
+        requirement_matches = {match['project_id']: match['matches'] for match in found}
+        projects_by_id = db.get_projects_by_ids(list(requirement_matches))
+        projects = [projects_by_id[pid] for pid in requirement_matches if pid in projects_by_id]
+        st.caption(f"{len(projects)} project(s) with matching requirements")
+    else:
+        projects = keyset_pager("project_overview", lambda limit, cursor: db.get_projects_page(limit, cursor))
     
     if projects:
         for project in projects:
-            project_documents = [d for d in documents if d["project_id"] == project["id"]]
-            project_workflows = [w for w in workflows if w["project_id"] == project["id"]]
+            document_count = db.count_documents(project["id"])
+            workflow_count = db.count_workflows(project["id"])
+            recent_documents = db.get_documents(project["id"], limit=3, include_content=False)
             
             with st.expander(f"📁 {project['name']} ({project['type']})", expanded=False):
                 col1, col2 = st.columns(2)
@@ -3459,11 +3604,16 @@ def show_project_overview():
                         if len(project['functional_reqs']) > 3:
                             st.write(f"... and {len(project['functional_reqs']) - 3} more")
                 
-                st.write(f"**Documents:** {len(project_documents)} | **Workflows:** {len(project_workflows)}")
+                if requirement_matches.get(project['id']):
+                    st.write("**Matching Requirements:**")
+                    for match in requirement_matches[project['id']]:
+                        st.markdown(f"• {match['snippet']}")
+                
+                st.write(f"**Documents:** {document_count} | **Workflows:** {workflow_count}")
                 
-                if project_documents:
+                if recent_documents:
                     st.write("**Recent Documents:**")
-                    for doc in project_documents[-3:]:
+                    for doc in recent_documents:
                         status_emoji = {"Draft": "📄", "Under Review": "🔍", "Approved": "✅", "Rejected": "❌"}
                         st.write(f"{status_emoji.get(doc['status'], '📄')} {doc['name']} - {doc['status']}")
     else:
@@ -4258,6 +4408,71 @@ LLM_FARM_API_KEY = "your-api-key-here"
         with col3:
             st.metric("Workflows", len(workflows))
         
+        with st.expander("🔌 Database Connection Pool"):
+            pool_stats = st.session_state.db.get_pool_stats()
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Open Connections", pool_stats['open_connections'])
+            with col2:
+                st.metric("Connections Opened", pool_stats['connections_opened'])
+            with col3:
+                st.metric("Checkouts per Connection", pool_stats['reuse_ratio'])
+            st.caption(f"Transactions: {pool_stats['transactions']:,} | Rollbacks: {pool_stats['rollbacks']:,}")
+            st.json(pool_stats['pragmas'])
+
+        with st.expander("⚡ Query Cache"):
+            cache_stats = st.session_state.db.get_cache_stats()
+            if cache_stats:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+                with col2:
+                    st.metric("Round Trips Avoided", f"{cache_stats['round_trips_avoided']:,}")
+                with col3:
+                    st.metric("Cached Queries", cache_stats['entries'])
+                st.caption(f"Lookups: {cache_stats['lookups']:,} | Stale: {cache_stats['stale']:,} | "
+                           f"Bypassed in transactions: {cache_stats['bypassed']:,} | "
+                           f"Invalidations: {cache_stats['invalidations']:,}")
+                st.json(cache_stats['table_versions'])
+            else:
+                st.info("Query cache is disabled")
+
+        with st.expander("📨 Write-Behind Queue"):
+            queue_stats = st.session_state.db.get_write_queue_stats()
+            if queue_stats:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Writes per Commit", f"{queue_stats['avg_batch_writes']:.1f}")
+                with col2:
+                    st.metric("Avg Latency", f"{queue_stats['avg_latency_ms']:.1f} ms")
+                with col3:
+                    st.metric("Pending", queue_stats['pending'])
+                st.caption(f"Writes: {queue_stats['writes']:,} | Commits: {queue_stats['batches']:,} | "
+                           f"Max latency: {queue_stats['max_latency_ms']:.1f} ms | "
+                           f"Blocked enqueues: {queue_stats['blocked_enqueues']:,} | "
+                           f"Failed: {queue_stats['failed_writes']:,}")
+                if queue_stats['last_error']:
+                    st.warning(f"Last failed write: {queue_stats['last_error']}")
+            else:
+                st.info("Write-behind is disabled (set DATABASE_WRITE_BEHIND=true to enable)")
+
+        with st.expander("🗂️ Project Shards"):
+            shard_stats = st.session_state.db.get_shard_stats()
+            if shard_stats:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Shards", shard_stats['shards'])
+                with col2:
+                    st.metric("Files / Chunks", f"{shard_stats['files']:,} / {shard_stats['chunks']:,}")
+                with col3:
+                    st.metric("Disk Usage", f"{shard_stats['size_bytes'] / 1024 / 1024:.1f} MB")
+                st.caption(f"Shard directory: {shard_stats['shard_dir']}")
+                if st.button("📦 Move remaining project files into shards"):
+                    moved = st.session_state.db.shard_projects()
+                    st.success(f"✅ Moved {len(moved)} project(s) into their shards")
+            else:
+                st.info("Sharding is disabled (set DATABASE_SHARD_DIR to enable)")
+
         st.subheader("Database Actions")
         
         col1, col2 = st.columns(2)
@@ -4273,7 +4488,8 @@ LLM_FARM_API_KEY = "your-api-key-here"
                 
                 st.download_button(
                     label="⬇️ Download Export",
-                    data=json.dumps(export_data, indent=2),
+                    # Database rows are dict-like row objects; serialize them as plain dicts
+                    data=json.dumps(export_data, indent=2, default=dict),
                     file_name=f"bosch_projects_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                     mime="application/json"
                 )
@@ -4319,18 +4535,20 @@ def show_workflow_visualization():
     """Display workflow visualization with current status"""
     st.title("📋 Workflow Visualization")
     
-    workflows = st.session_state.db.get_workflows()
-    documents = st.session_state.db.get_documents()
-    
-    if not workflows:
+    if not st.session_state.db.count_workflows():
         st.info("No workflows found. Generate some documents first.")
         return
     
     st.subheader("📊 Workflow Status Overview")
     
+    workflows = keyset_pager(
+        "workflow_visualization",
+        lambda limit, cursor: st.session_state.db.get_workflow_details_page(limit=limit, cursor=cursor)
+    )
+    
     # Create visual workflow cards
     for workflow in workflows:
-        document = next((d for d in documents if d["id"] == workflow["document_id"]), None)
+        document = workflow["document"]
         if document:
             # Determine status color
             if workflow['status'] == 'Active':
@@ -4399,24 +4617,22 @@ def show_compliance_audit():
         st.subheader("📋 System Audit Trail")
         
         # Get all workflows and documents for audit
-        workflows = st.session_state.db.get_workflows()
-        documents = st.session_state.db.get_documents()
+        metrics = st.session_state.db.get_metrics()
+        workflows = st.session_state.db.get_workflow_details()
+        documents = st.session_state.db.get_documents(include_content=False)
         
-        st.info(f"**Total Documents:** {len(documents)} | **Total Workflows:** {len(workflows)}")
+        st.info(f"**Total Documents:** {metrics['document_count']} | **Total Workflows:** {metrics['workflow_count']}")
         
         # Show detailed audit information
         if workflows:
             st.write("**Workflow Audit Trail:**")
             audit_data = []
+            # Comment counts for the whole trail in one grouped query
+            comment_counts = st.session_state.db.count_workflow_comments([w['id'] for w in workflows])
             for workflow in workflows:
-                document = next((d for d in documents if d["id"] == workflow["document_id"]), None)
+                document = workflow["document"]
                 if document:
-                    # Get workflow comments for audit trail
-                    try:
-                        comments = st.session_state.db.get_workflow_comments(workflow['id'])
-                        comment_count = len(comments) if comments else 0
-                    except:
-                        comment_count = 0
+                    comment_count = comment_counts.get(workflow['id'], 0)
                     
                     audit_data.append({
                         'Document': document['name'],
@@ -4434,12 +4650,12 @@ def show_compliance_audit():
     with tab2:
         st.subheader("📊 Compliance Metrics")
         
-        if workflows:
+        if metrics['workflow_count']:
             # Calculate compliance metrics
-            total_workflows = len(workflows)
-            active_workflows = len([w for w in workflows if w['status'] == 'Active'])
-            completed_workflows = len([w for w in workflows if w['status'] == 'Completed'])
-            rejected_workflows = len([w for w in workflows if w['status'] == 'Rejected'])
+            total_workflows = metrics['workflow_count']
+            active_workflows = metrics['workflows_by_status'].get('Active', 0)
+            completed_workflows = metrics['workflows_by_status'].get('Completed', 0)
+            rejected_workflows = metrics['workflows_by_status'].get('Rejected', 0)
             
             col1, col2, col3, col4 = st.columns(4)
             with col1:
@@ -4465,18 +4681,47 @@ def show_compliance_audit():
             st.write("- ✅ Document versioning tracked")
     
     with tab3:
+        st.subheader("🔎 Search Documents and Review Comments")
+
+        search_query = st.text_input("Search text", placeholder='e.g. ASIL-D, supplier name, or prefix like "calib*"',
+                                     key="compliance_search_query")
+        col1, col2 = st.columns(2)
+        with col1:
+            projects_by_name = {p['name']: p['id'] for p in st.session_state.db.get_projects()}
+            search_projects = st.multiselect("Projects", options=list(projects_by_name), key="compliance_search_projects")
+        with col2:
+            search_statuses = st.multiselect("Document status", options=list(metrics['documents_by_status']),
+                                             key="compliance_search_statuses")
+
+        if search_query.strip():
+            project_filter = [projects_by_name[name] for name in search_projects] or None
+            document_hits = st.session_state.db.search_documents(
+                search_query, project_id=project_filter, status=search_statuses or None, limit=50)
+            comment_hits = st.session_state.db.search_workflow_comments(
+                search_query, project_id=project_filter, limit=50)
+
+            st.write(f"**Documents ({len(document_hits)}):**")
+            for hit in document_hits:
+                st.markdown(f"- **{hit['name']}** ({hit['type']}, {hit['status']}) · "
+                            f"{hit['project_name'] or 'No project'}  \n  {hit['snippet']}")
+            st.write(f"**Review comments ({len(comment_hits)}):**")
+            for hit in comment_hits:
+                st.markdown(f"- **{hit['workflow_name']}** · {hit['approver']} ({hit['action']}, "
+                            f"{hit['created_at']})  \n  {hit['snippet']}")
+
+        st.divider()
         st.subheader("🔍 Document Quality Review")
-        
+
         if documents:
+            documents_by_label = {f"{d['name']} ({d['type']})": d for d in documents}
             selected_doc = st.selectbox(
                 "Select document for quality review:",
-                options=[f"{d['name']} ({d['type']})" for d in documents],
+                options=list(documents_by_label),
                 key="quality_review_doc"
             )
             
             if selected_doc:
-                doc_name = selected_doc.split(' (')[0]
-                document = next((d for d in documents if d['name'] == doc_name), None)
+                document = documents_by_label.get(selected_doc)
                 
                 if document:
                     st.write(f"**Document:** {document['name']}")
@@ -0,0 +1,94 @@
+# Compressed, content-addressed blob store for extracted file text
+import hashlib
+import zlib
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+BLOB_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS content_blobs (
+        hash TEXT PRIMARY KEY,
+        compression TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        stored_size INTEGER NOT NULL,
+        data BLOB NOT NULL,
+        ref_count INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def blob_hash(text: str) -> str:
+    """Content address of a text: SHA-256 of its UTF-8 encoding"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def compress_text(text: str) -> Tuple[str, bytes]:
+    """Compress text with zstd when available, else zlib"""
+    raw = text.encode('utf-8')
+    if HAS_ZSTD:
+        return 'zstd', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return 'zlib', zlib.compress(raw, ZLIB_LEVEL)
+
+
+def decompress_text(compression: str, data: bytes) -> str:
+    """Inverse of compress_text"""
+    if compression == 'zstd':
+        if not HAS_ZSTD:
+            raise RuntimeError("Blob is zstd-compressed but the zstandard package is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif compression == 'zlib':
+        raw = zlib.decompress(data)
+    else:
+        raw = data
+    return raw.decode('utf-8')
+
+
+def put_blob(cursor, text: str, schema: str = 'main') -> str:
+    """Store text (once) and take a reference to it; returns its hash
+
+    schema selects the attached database holding the blobs (a project shard).
+    """
+    key = blob_hash(text)
+    cursor.execute(f'UPDATE {schema}.content_blobs SET ref_count = ref_count + 1 WHERE hash = ?', (key,))
+    if cursor.rowcount == 0:
+        compression, data = compress_text(text)
+        cursor.execute(f'''
+            INSERT INTO {schema}.content_blobs (hash, compression, size, stored_size, data, ref_count)
+            VALUES (?, ?, ?, ?, ?, 1)
+        ''', (key, compression, len(text.encode('utf-8')), len(data), data))
+    return key
+
+
+def release_blobs(cursor, hashes: Iterable[Optional[str]], schema: str = 'main'):
+    """Drop one reference per hash and delete blobs nobody references any more"""
+    hashes = [key for key in hashes if key]
+    if not hashes:
+        return
+    cursor.executemany(f'UPDATE {schema}.content_blobs SET ref_count = ref_count - 1 WHERE hash = ?',
+                       [(key,) for key in hashes])
+    placeholders = ', '.join('?' for _ in set(hashes))
+    cursor.execute(f'DELETE FROM {schema}.content_blobs WHERE ref_count <= 0 AND hash IN ({placeholders})',
+                   list(set(hashes)))
+
+
+def get_blob_texts(cursor, hashes: Iterable[Optional[str]], schema: str = 'main') -> Dict[str, str]:
+    """Load and decompress blobs; returns {hash: text}"""
+    keys = list({key for key in hashes if key})
+    texts = {}
+    # Stay well below SQLite's bound-parameter limit
+    for start in range(0, len(keys), 500):
+        batch = keys[start:start + 500]
+        placeholders = ', '.join('?' for _ in batch)
+        cursor.execute(f'SELECT hash, compression, data FROM {schema}.content_blobs WHERE hash IN ({placeholders})',
+                       batch)
+        for key, compression, data in cursor.fetchall():
+            texts[key] = decompress_text(compression, data)
+    return texts
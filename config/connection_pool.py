@@ -0,0 +1,223 @@
+# Persistent per-thread SQLite connections with tuned pragmas
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+# Applied to every new connection. WAL lets readers run concurrently with a
+# writer; synchronous=NORMAL is durable across application crashes in WAL mode.
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,       # 64 MB page cache (negative = KiB)
+    'mmap_size': 268435456,     # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+}
+
+BUSY_TIMEOUT_SECONDS = 30.0
+
+# Databases attached to one connection at a time (SQLite's default limit is 10);
+# the least recently used one is detached to make room
+MAX_ATTACHED = 8
+
+
+class ConnectionPool:
+    """Process-wide pool handing each thread its own persistent connection
+
+    sqlite3 connections must not be shared between threads, so every thread
+    gets one connection that is reused for all of its calls. Connections of
+    threads that have finished are closed the next time a connection is opened.
+    """
+
+    _pools: Dict[str, 'ConnectionPool'] = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, db_path: str, pragmas: Optional[Dict[str, Any]] = None):
+        self.db_path = db_path
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._schema_lock = threading.Lock()
+        self._connections: Dict[int, tuple] = {}  # thread ident -> (thread, connection)
+        self._schema_ready = False
+        self._stats = {
+            'connections_opened': 0,
+            'connections_closed': 0,
+            'checkouts': 0,
+            'transactions': 0,
+            'rollbacks': 0,
+            'attaches': 0,
+        }
+        self._created_at = time.time()
+
+    @classmethod
+    def for_path(cls, db_path: str) -> 'ConnectionPool':
+        """Shared pool for a database file (one per file per process)"""
+        key = os.path.abspath(db_path)
+        with cls._pools_lock:
+            pool = cls._pools.get(key)
+            if pool is None:
+                pool = cls._pools[key] = cls(db_path)
+            return pool
+
+    def ensure_schema(self, initializer: Callable[[], None]):
+        """Run the schema initializer once per process for this database"""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if not self._schema_ready:
+                initializer()
+                self._schema_ready = True
+
+    def _open(self) -> sqlite3.Connection:
+        # The pool guarantees one thread per connection; check_same_thread is off
+        # only so that connections of finished threads can be closed here
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.attached = OrderedDict()
+            self._local.untuned = set()
+            with self._lock:
+                self._prune_dead_threads()
+                self._connections[threading.get_ident()] = (threading.current_thread(), conn)
+                self._stats['connections_opened'] += 1
+        with self._lock:
+            self._stats['checkouts'] += 1
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Yield the thread's connection; commit on success, roll back on error
+
+        Transactions nest: an inner block joins the outermost one, which alone
+        commits or rolls back, so several writes can be made atomic together.
+        """
+        conn = self.connection()
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        if depth == 0:
+            self._local.after_end = []
+        try:
+            yield conn
+            if depth == 0:
+                conn.commit()
+                with self._lock:
+                    self._stats['transactions'] += 1
+        except BaseException:
+            if depth == 0:
+                conn.rollback()
+                with self._lock:
+                    self._stats['rollbacks'] += 1
+            raise
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                callbacks, self._local.after_end = self._local.after_end, []
+                for callback in callbacks:
+                    callback()
+    
+    def in_transaction(self) -> bool:
+        """Whether the calling thread is inside transaction()"""
+        return getattr(self._local, 'depth', 0) > 0
+    
+    def call_after_transaction(self, callback: Callable[[], None]):
+        """Run callback once the calling thread's outermost transaction ends
+        
+        Runs immediately when no transaction is open.
+        """
+        if self.in_transaction():
+            self._local.after_end.append(callback)
+        else:
+            callback()
+
+    def attach(self, db_path: str, schema: str) -> sqlite3.Connection:
+        """Attach another database file to the calling thread's connection as schema
+
+        Attachments stay open for later calls; beyond MAX_ATTACHED the least
+        recently used one is detached. Inside a transaction, databases the
+        transaction has used cannot be detached and are skipped, so one
+        transaction can use at most SQLite's limit of 10 databases.
+        """
+        conn = self.connection()
+        attached = self._local.attached
+        if schema not in attached:
+            for oldest in list(attached):
+                if len(attached) < MAX_ATTACHED:
+                    break
+                try:
+                    conn.execute(f'DETACH DATABASE {oldest}')
+                except sqlite3.OperationalError:
+                    continue  # "database is locked": in use by the open transaction
+                del attached[oldest]
+                self._local.untuned.discard(oldest)
+            conn.execute(f'ATTACH DATABASE ? AS {schema}', (db_path,))
+            attached[schema] = db_path
+            self._local.untuned.add(schema)
+            with self._lock:
+                self._stats['attaches'] += 1
+        attached.move_to_end(schema)
+        # journal_mode and synchronous are per database, not per connection, and
+        # neither can be changed inside a transaction; until the next attach
+        # outside one the database keeps its own journal mode (WAL for files
+        # made by build_shard) and SQLite's default synchronous=FULL
+        if schema in self._local.untuned and not conn.in_transaction:
+            for name in ('journal_mode', 'synchronous'):
+                if name in self.pragmas:
+                    conn.execute(f'PRAGMA {schema}.{name} = {self.pragmas[name]}')
+            self._local.untuned.discard(schema)
+        return conn
+
+    def detach(self, schema: str):
+        """Detach schema from the calling thread's connection, if attached"""
+        attached = getattr(self._local, 'attached', None)
+        if attached and schema in attached:
+            self._local.conn.execute(f'DETACH DATABASE {schema}')
+            del attached[schema]
+            self._local.untuned.discard(schema)
+
+    def _prune_dead_threads(self):
+        # Caller holds self._lock
+        for ident, (thread, conn) in list(self._connections.items()):
+            if not thread.is_alive():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+                del self._connections[ident]
+                self._stats['connections_closed'] += 1
+
+    def close_thread_connection(self):
+        """Close the calling thread's connection (it is reopened on next use)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+            self._local.attached = OrderedDict()
+            self._local.untuned = set()
+            with self._lock:
+                self._connections.pop(threading.get_ident(), None)
+                self._stats['connections_closed'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool statistics for monitoring"""
+        with self._lock:
+            self._prune_dead_threads()
+            stats = dict(self._stats)
+            stats['open_connections'] = len(self._connections)
+        opened = stats['connections_opened'] or 1
+        stats['reuse_ratio'] = round(stats['checkouts'] / opened, 2)
+        stats['db_path'] = self.db_path
+        stats['pragmas'] = dict(self.pragmas)
+        stats['uptime_seconds'] = round(time.time() - self._created_at, 1)
+        return stats
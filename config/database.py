@@ -1,506 +1,1780 @@
 # Database configuration for persistent storage
-import sqlite3
 import json
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple, Iterator, Callable, Hashable, Optional
+from contextlib import contextmanager
+from functools import wraps
 from datetime import datetime
 import os
+import threading
+
+from config.connection_pool import ConnectionPool, MAX_ATTACHED
+from config.blob_store import BLOB_TABLE_SQL, put_blob, release_blobs, get_blob_texts
+from config.migrations import (get_schema_version, run_migrations, ensure_search_indexes, REQUIREMENT_FIELDS,
+                               requirement_rows)
+from config.query_cache import QueryCache
+from config.rows import Project, Document, Workflow, WorkflowDetail, Comment
+from config.revision_store import record_revision, get_revision_text, list_revisions, current_revision
+from config.write_queue import WriteQueue, QueuedWriteError
+from config.shard_store import (DATA_FILE_TABLE_SQL, EMBEDDING_TABLE_SQL, shard_schema, shard_path, file_project,
+                                list_shards, build_shard, remove_shard, shard_sizes, upgrade_shard)
+
+def _writes(*tables: str, queued: bool = False):
+    """Mark a DatabaseManager method as writing tables, invalidating cached reads of them
+    
+    Methods that write directly (queued=False) first wait for queued writes
+    to the same tables, so writes stay in the order they were made.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not queued:
+                self._write_barrier(tables)
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._invalidate(tables)
+        return wrapper
+    return decorator
 
 class DatabaseManager:
     """Simple database manager for project data persistence"""
     
-    def __init__(self, db_path: str = "bosch_projects.db"):
+    # Rows passed to a single executemany call by the bulk write methods
+    DEFAULT_BATCH_SIZE = 500
+    
+    # Serializes shard creation within the process
+    _shard_lock = threading.Lock()
+    # Shards checked for missing columns by this process
+    _upgraded_shards = set()
+    
+    def __init__(self, db_path: str = "bosch_projects.db", batch_size: int = DEFAULT_BATCH_SIZE,
+                 cache: bool = True, write_behind: bool = False, shard_dir: str = None):
         self.db_path = db_path
-        self.init_database()
+        self.batch_size = max(1, batch_size)
+        # With a shard_dir each project's files and embeddings get their own
+        # SQLite file there, see _data_schema; db_path stays the catalog
+        self.shard_dir = shard_dir
+        if shard_dir:
+            os.makedirs(shard_dir, exist_ok=True)
+        self.pool = ConnectionPool.for_path(db_path)
+        # Search index name -> whether it exists, looked up once per manager
+        self._search_indexes = {}
+        # Listing reads are shared by every session of this process
+        self.cache = QueryCache.for_path(db_path) if cache else None
+        # Schema creation and migrations run once per process, not per session
+        self.pool.ensure_schema(self.init_database)
+        # Comments, workflow status changes and audit events are group-committed
+        # in the background instead of committing one by one
+        self.write_queue = WriteQueue.for_pool(
+            self.pool, on_commit=self.cache.invalidate if self.cache else None
+        ) if write_behind else None
+        # Writes this manager queued whose outcome it has not reported yet
+        self._queued_writes: List[int] = []
+        self._queued_writes_lock = threading.Lock()
+        # Errors of queued writes reported by the last flush_writes()
+        self.write_errors: List[str] = []
     
     def init_database(self):
         """Initialize database tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Projects table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS projects (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                type TEXT NOT NULL,
-                description TEXT,
-                functional_reqs TEXT,
-                non_functional_reqs TEXT,
-                conditions TEXT,
-                recommended_docs TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Documents table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS documents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                project_id INTEGER,
-                name TEXT NOT NULL,
-                type TEXT NOT NULL,
-                content TEXT,
-                status TEXT DEFAULT 'Draft',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (project_id) REFERENCES projects (id)
-            )
-        ''')
-        
-        # Project data files table for RAG
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS project_data_files (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                project_id INTEGER,
-                filename TEXT NOT NULL,
-                file_path TEXT,
-                file_type TEXT,
-                file_size INTEGER,
-                content TEXT,
-                content_hash TEXT,
-                is_template BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (project_id) REFERENCES projects (id)
-            )
-        ''')
-        
-        # Vector embeddings table for RAG
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS vector_embeddings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                project_id INTEGER,
-                file_id INTEGER,
-                chunk_index INTEGER,
-                chunk_text TEXT,
-                embedding_vector TEXT,
-                metadata TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (project_id) REFERENCES projects (id),
-                FOREIGN KEY (file_id) REFERENCES project_data_files (id)
-            )
-        ''')
-        
-        # Workflows table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS workflows (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                project_id INTEGER,
-                document_id INTEGER,
-                name TEXT NOT NULL,
-                status TEXT DEFAULT 'Active',
-                approvers TEXT,
-                current_step INTEGER DEFAULT 0,
-                comments TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (project_id) REFERENCES projects (id),
-                FOREIGN KEY (document_id) REFERENCES documents (id)
-            )
-        ''')
-        
-        # Workflow comments table for detailed comment history
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS workflow_comments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                workflow_id INTEGER,
-                approver TEXT NOT NULL,
-                action TEXT NOT NULL,
-                comment TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (workflow_id) REFERENCES workflows (id)
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+        
+            # Projects table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS projects (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    description TEXT,
+                    functional_reqs TEXT,
+                    non_functional_reqs TEXT,
+                    conditions TEXT,
+                    recommended_docs TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+        
+            # Documents table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    project_id INTEGER,
+                    name TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    content TEXT,
+                    status TEXT DEFAULT 'Draft',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (project_id) REFERENCES projects (id)
+                )
+            ''')
+        
+            # Project data files table for RAG (same schema in project shards)
+            cursor.execute(DATA_FILE_TABLE_SQL)
+        
+            # Vector embeddings table for RAG
+            cursor.execute(EMBEDDING_TABLE_SQL)
+        
+            # Workflows table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS workflows (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    project_id INTEGER,
+                    document_id INTEGER,
+                    name TEXT NOT NULL,
+                    status TEXT DEFAULT 'Active',
+                    approvers TEXT,
+                    current_step INTEGER DEFAULT 0,
+                    comments TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (project_id) REFERENCES projects (id),
+                    FOREIGN KEY (document_id) REFERENCES documents (id)
+                )
+            ''')
+        
+            # Workflow comments table for detailed comment history
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS workflow_comments (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    workflow_id INTEGER,
+                    approver TEXT NOT NULL,
+                    action TEXT NOT NULL,
+                    comment TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (workflow_id) REFERENCES workflows (id)
+                )
+            ''')
+        
+            # Compressed, content-addressed store for extracted file text
+            cursor.execute(BLOB_TABLE_SQL)
+        
+        # Later schema changes (new columns, data moves, indexes) are versioned
+        # migrations, see config/migrations.py
+        run_migrations(self.pool.connection())
+        # Search indexes skipped by a migration run without FTS5
+        ensure_search_indexes(self.pool.connection())
+    
+    def get_schema_version(self) -> int:
+        """Highest schema migration applied to this database"""
+        return get_schema_version(self.pool.connection())
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Connection pool statistics (connections opened, reuse ratio, pragmas)"""
+        return self.pool.stats()
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Query cache statistics (hit rate, round trips avoided, table versions)"""
+        return self.cache.stats() if self.cache else {}
+    
+    def get_write_queue_stats(self) -> Dict[str, Any]:
+        """Write-behind queue statistics (batch sizes, commit latency, pending writes)"""
+        return self.write_queue.stats() if self.write_queue else {}
+    
+    def flush_writes(self, timeout: float = None) -> bool:
+        """Durability barrier: wait until every queued write is committed
+        
+        Returns:
+            False if the timeout expired first or a write queued through this
+            manager since the last flush failed; the errors of failed writes
+            are then in self.write_errors (always True without write-behind)
+        """
+        if self.write_queue is None:
+            return True
+        with self._queued_writes_lock:
+            seqs = self._queued_writes
+        flushed = self.write_queue.flush(timeout, seqs)
+        failed, pending = self.write_queue.check(seqs)
+        with self._queued_writes_lock:
+            # Keep writes queued meanwhile and those still pending for the next flush
+            self._queued_writes = pending + self._queued_writes[len(seqs):]
+        self.write_errors = list(failed.values())
+        return flushed
+    
+    def get_shard_stats(self) -> Dict[str, Any]:
+        """Files, chunks and disk usage per project shard (empty when sharding is off)
+        
+        A cross-project query: shards are attached a few at a time and
+        counted in one UNION ALL statement per group.
+        """
+        if not self.shard_dir:
+            return {}
+        shards = list_shards(self.shard_dir)
+        stats = {'shard_dir': self.shard_dir, 'shards': len(shards), 'files': 0, 'chunks': 0,
+                 'size_bytes': 0, 'projects': {}}
+        project_ids = sorted(shards)
+        for start in range(0, len(project_ids), MAX_ATTACHED):
+            batch = project_ids[start:start + MAX_ATTACHED]
+            schemas = [self._data_schema(pid) for pid in batch]
+            sql = ' UNION ALL '.join(
+                f"SELECT ?, (SELECT COUNT(*) FROM {schema}.project_data_files), "
+                f"(SELECT COUNT(*) FROM {schema}.vector_embeddings)"
+                for schema in schemas
             )
-        ''')
+            with self.pool.transaction() as conn:
+                rows = conn.execute(sql, batch).fetchall()
+            for project_id, files, chunks in rows:
+                size = shard_sizes([shards[project_id]])
+                stats['projects'][project_id] = {'files': files, 'chunks': chunks, 'size_bytes': size}
+                stats['files'] += files
+                stats['chunks'] += chunks
+                stats['size_bytes'] += size
+        return stats
+    
+    # Read-through cache: listings, counts and metrics are cached per process
+    # and keyed by the write counters of the tables they read. Every write
+    # method is decorated with @_writes, which bumps those counters once its
+    # transaction has committed (or rolled back). Writes made by another
+    # process are not seen until a write in this process touches the table.
+    def _cached(self, key: Hashable, tables: Tuple[str, ...], load: Callable[[], Any]) -> Any:
+        self._read_barrier(tables)
+        if self.cache is None:
+            return load()
+        if self.pool.in_transaction():
+            # Uncommitted writes of this transaction must not leak into the cache
+            self.cache.record_bypass()
+            return load()
+        return self.cache.get_or_load(key, tables, load)
+    
+    def _invalidate(self, tables: Tuple[str, ...]):
+        if self.cache is not None:
+            self.pool.call_after_transaction(lambda: self.cache.invalidate(tables))
+    
+    # Write-behind: with write_behind=True, small writes outside a transaction
+    # are handed to the WriteQueue and committed a few milliseconds later (a
+    # few tens under sustained load) together with other queued writes. Reads
+    # of a table with queued writes wait for them first (read-your-writes), and
+    # so do direct writes and new transactions, so the queue never reorders
+    # writes. Inside a transaction queued methods write directly, keeping the
+    # transaction atomic. A queued write that fails is reported to the manager
+    # that queued it: flush_writes() returns False, and the next read or write
+    # through the manager raises QueuedWriteError.
+    def _enqueue(self, sql: str, rows: List[Tuple], tables: Tuple[str, ...]) -> bool:
+        if self.write_queue is None or self.pool.in_transaction():
+            self._write_barrier(tables)
+            return False
+        seq = self.write_queue.enqueue(sql, rows, tables)
+        with self._queued_writes_lock:
+            self._queued_writes.append(seq)
+        return True
+    
+    def _read_barrier(self, tables: Optional[Tuple[str, ...]]):
+        """Wait for queued writes to tables (all tables if None), raising if one of ours failed"""
+        if self.write_queue is None or self.pool.in_transaction():
+            return
+        if self._queued_writes or self.write_queue.has_pending(tables):
+            if not self.flush_writes():
+                raise QueuedWriteError("Queued write failed: " + "; ".join(self.write_errors))
+    
+    # Writes wait the same way; inside a transaction the queue was already
+    # flushed when it began
+    _write_barrier = _read_barrier
+    
+    # Sharding: with shard_dir set, a project's project_data_files,
+    # vector_embeddings and content_blobs live in shard_dir/project_<id>.db,
+    # attached to the thread's catalog connection as shard_<id> on first use.
+    # Writes to a shard take only that file's write lock, so one project's
+    # ingestion no longer blocks other projects or workflow approvals. A
+    # project's existing catalog rows are moved into its shard on its first
+    # write outside a transaction; until then it is served from the catalog.
+    def _data_schema(self, project_id: int, create: bool = False) -> str:
+        """Schema holding a project's files and embeddings ('main' = catalog)"""
+        if not self.shard_dir or project_id is None:
+            return 'main'
+        path = shard_path(self.shard_dir, project_id)
+        if not os.path.exists(path) and not (create and self._create_shard(project_id, path)):
+            return 'main'
+        schema = shard_schema(project_id)
+        conn = self.pool.attach(path, schema)
+        if path not in self._upgraded_shards:
+            upgrade_shard(conn, schema)
+            # A rolled back transaction would undo the upgrade
+            if not conn.in_transaction:
+                self._upgraded_shards.add(path)
+        return schema
+    
+    def _file_schema(self, file_id: int) -> str:
+        """Schema holding a data file; shard file ids encode their project"""
+        return self._data_schema(file_project(file_id)) if file_id is not None else 'main'
+    
+    def _create_shard(self, project_id: int, path: str) -> bool:
+        with self._shard_lock:
+            if os.path.exists(path):
+                return True
+            conn = self.pool.connection()
+            if conn.execute('SELECT 1 FROM project_data_files WHERE project_id = ? LIMIT 1', (project_id,)).fetchone():
+                if self.pool.in_transaction():
+                    # The move has to commit on its own
+                    return False
+                self._move_to_shard(project_id, path)
+            else:
+                build_shard(path, project_id, journal_mode=self.pool.pragmas.get('journal_mode'))
+            return True
+    
+    def _move_to_shard(self, project_id: int, path: str) -> Dict[str, int]:
+        # build_shard copies what the catalog has committed, so uncommitted
+        # rows of an enclosing transaction would be deleted without being copied
+        if self.pool.in_transaction():
+            raise RuntimeError("Moving a project into its shard cannot be part of a transaction")
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+            # The first delete takes the catalog write lock, so no file is added
+            # to the project mid-copy; build_shard still reads the committed rows
+            cursor.execute('DELETE FROM vector_embeddings WHERE project_id = ?', (project_id,))
+            cursor.execute('SELECT content_blob FROM project_data_files WHERE project_id = ?', (project_id,))
+            blob_hashes = [row[0] for row in cursor.fetchall()]
+            cursor.execute('DELETE FROM project_data_files WHERE project_id = ?', (project_id,))
+            moved = build_shard(path, project_id, catalog_path=self.db_path,
+                                journal_mode=self.pool.pragmas.get('journal_mode'))
+            release_blobs(cursor, blob_hashes)
+        return moved
+    
+    @_writes('project_data_files', 'vector_embeddings')
+    def shard_projects(self, project_ids: List[int] = None) -> Dict[int, Dict[str, int]]:
+        """Move projects whose files are still in the catalog into their shards
+        
+        Args:
+            project_ids: Projects to move (default: every project with catalog files)
+        
+        Returns:
+            {project_id: rows moved per table}
+        """
+        if not self.shard_dir:
+            raise ValueError("Sharding is not enabled (no shard_dir)")
+        if project_ids is None:
+            with self.pool.transaction() as conn:
+                project_ids = [row[0] for row in conn.execute(
+                    'SELECT DISTINCT project_id FROM project_data_files WHERE project_id IS NOT NULL'
+                ).fetchall()]
+        moved = {}
+        for project_id in project_ids:
+            path = shard_path(self.shard_dir, project_id)
+            with self._shard_lock:
+                if not os.path.exists(path):
+                    moved[project_id] = self._move_to_shard(project_id, path)
+        return moved
+    
+    def _drop_shard(self, project_id: int) -> Dict[str, int]:
+        """Delete a project's shard; returns the rows it held per table"""
+        path = shard_path(self.shard_dir, project_id)
+        if not os.path.exists(path):
+            return {}
+        schema = self._data_schema(project_id)
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+            counts = {table: cursor.execute(f'SELECT COUNT(*) FROM {schema}.{table}').fetchone()[0]
+                      for table in ('project_data_files', 'vector_embeddings')}
+        if not self.pool.in_transaction():
+            self.pool.detach(schema)
+            if remove_shard(path):
+                return counts
+            schema = self._data_schema(project_id)
+        # Still open elsewhere (or inside a transaction): empty it instead
+        with self.pool.transaction() as conn:
+            for table in ('vector_embeddings', 'project_data_files', 'content_blobs'):
+                conn.execute(f'DELETE FROM {schema}.{table}')
+        return counts
+    
+    @contextmanager
+    def transaction(self):
+        """Group several DatabaseManager calls into one atomic transaction
+        
+        Example:
+            with db.transaction():
+                file_id = db.save_project_data_file(...)
+                db.save_vector_embeddings(...)
+        """
+        self._write_barrier(None)
+        with self.pool.transaction() as conn:
+            yield conn
+    
+    def _batches(self, rows: List[Any], batch_size: int = None) -> Iterator[List[Any]]:
+        size = max(1, batch_size or self.batch_size)
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+    
+    # Keyset pagination: rows are ordered by (created_at, id) descending and a
+    # page continues strictly after the (created_at, id) of the previous page's
+    # last row, so every page is an index range scan however deep it is.
+    def _cache_key(self, *parts) -> Tuple:
+        return tuple(tuple(part) if isinstance(part, (list, set)) else part for part in parts)
+    
+    def _filters(self, filters: Dict[str, Any], prefix: str = '') -> Tuple[List[str], List[Any]]:
+        clauses, params = [], []
+        for column, value in filters.items():
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                values = list(value)
+                clauses.append(f"{prefix}{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+            else:
+                clauses.append(f"{prefix}{column} = ?")
+                params.append(value)
+        return clauses, params
+    
+    def _keyset_query(self, table: str, columns: str, from_row, limit: int = None,
+                      cursor: Tuple[str, int] = None, alias: str = None, depends_on: Tuple[str, ...] = None,
+                      **filters) -> List[Dict[str, Any]]:
+        # For joins, table is the whole FROM clause, alias names the paginated
+        # table and depends_on lists every joined table (for cache invalidation)
+        prefix = f'{alias}.' if alias else ''
+        clauses, params = self._filters(filters, prefix)
+        if cursor is not None:
+            clauses.append(f'({prefix}created_at, {prefix}id) < (?, ?)')
+            params.extend(cursor)
+        sql = f'SELECT {columns} FROM {table}'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += f' ORDER BY {prefix}created_at DESC, {prefix}id DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        
+        def load():
+            with self.pool.transaction() as conn:
+                db_cursor = conn.cursor()
+                db_cursor.execute(sql, params)
+                return tuple(db_cursor.fetchall())
+        
+        rows = self._cached(self._cache_key('rows', sql, params), depends_on or (table,), load)
+        return [from_row(row) for row in rows]
+    
+    def _keyset_page(self, table: str, columns: str, from_row, limit: int,
+                     cursor: Tuple[str, int] = None, alias: str = None, depends_on: Tuple[str, ...] = None,
+                     **filters) -> Dict[str, Any]:
+        limit = max(1, limit)
+        # One extra row tells whether another page exists
+        items = self._keyset_query(table, columns, from_row, limit + 1, cursor, alias, depends_on, **filters)
+        has_more = len(items) > limit
+        items = items[:limit]
+        next_cursor = (items[-1]['created_at'], items[-1]['id']) if has_more else None
+        return {'items': items, 'next_cursor': next_cursor, 'has_more': has_more}
+    
+    def _count(self, table: str, **filters) -> int:
+        clauses, params = self._filters(filters)
+        sql = f'SELECT COUNT(*) FROM {table}'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        
+        def load():
+            with self.pool.transaction() as conn:
+                return conn.execute(sql, params).fetchone()[0]
         
-        conn.commit()
-        conn.close()
+        return self._cached(self._cache_key('count', sql, params), (table,), load)
     
+    @_writes('projects', 'project_requirements')
     def save_project(self, project: Dict[str, Any]) -> int:
         """Save project to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO projects (name, type, description, functional_reqs, 
-                                non_functional_reqs, conditions, recommended_docs)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            project['name'],
-            project['type'],
-            project['description'],
-            json.dumps(project.get('functional_reqs', [])),
-            json.dumps(project.get('non_functional_reqs', [])),
-            json.dumps(project.get('conditions', [])),
-            json.dumps(project.get('recommended_docs', []))
-        ))
-        
-        project_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+        
+            cursor.execute('''
+                INSERT INTO projects (name, type, description, functional_reqs, 
+                                    non_functional_reqs, conditions, recommended_docs)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                project['name'],
+                project['type'],
+                project['description'],
+                json.dumps(project.get('functional_reqs', [])),
+                json.dumps(project.get('non_functional_reqs', [])),
+                json.dumps(project.get('conditions', [])),
+                json.dumps(project.get('recommended_docs', []))
+            ))
+        
+            project_id = cursor.lastrowid
+            self._sync_requirements(cursor, project_id, project)
         return project_id
     
-    def get_projects(self) -> List[Dict[str, Any]]:
-        """Get all projects from database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _sync_requirements(self, cursor, project_id: int, fields: Dict[str, Any]):
+        """Rewrite the project_requirements rows of every requirement list present in fields"""
+        for kind in REQUIREMENT_FIELDS:
+            if kind not in fields:
+                continue
+            items = fields[kind]
+            if isinstance(items, str):
+                items = json.loads(items) if items else []
+            cursor.execute('DELETE FROM project_requirements WHERE project_id = ? AND kind = ?', (project_id, kind))
+            cursor.executemany('''
+                INSERT INTO project_requirements (project_id, kind, position, text) VALUES (?, ?, ?, ?)
+            ''', requirement_rows(project_id, kind, items if isinstance(items, list) else []))
+    
+    PROJECT_COLUMNS = ('id, name, type, description, functional_reqs, non_functional_reqs, '
+                       'conditions, recommended_docs, created_at, updated_at')
+    
+    # Rows are slotted, dict-compatible types (config/rows.py) whose JSON
+    # columns are decoded on first access
+    def _project_from_row(self, row) -> Project:
+        return Project(row)
+    
+    def get_projects(self, limit: int = None) -> List[Dict[str, Any]]:
+        """Get projects from database, newest first (at most limit rows if given)"""
+        return self._keyset_query('projects', self.PROJECT_COLUMNS, self._project_from_row, limit=limit)
+    
+    def get_projects_page(self, limit: int = 20, cursor: Tuple[str, int] = None) -> Dict[str, Any]:
+        """Get one page of projects, newest first
         
-        cursor.execute('SELECT * FROM projects ORDER BY created_at DESC')
-        rows = cursor.fetchall()
+        Args:
+            limit: Page size
+            cursor: next_cursor of the previous page (None for the first page)
         
-        projects = []
-        for row in rows:
-            project = {
-                'id': row[0],
-                'name': row[1],
-                'type': row[2],
-                'description': row[3],
-                'functional_reqs': json.loads(row[4]) if row[4] else [],
-                'non_functional_reqs': json.loads(row[5]) if row[5] else [],
-                'conditions': json.loads(row[6]) if row[6] else [],
-                'recommended_docs': json.loads(row[7]) if row[7] else [],
-                'created_at': row[8],
-                'updated_at': row[9]
-            }
-            projects.append(project)
-        
-        conn.close()
-        return projects
+        Returns:
+            Dict with 'items', 'next_cursor' and 'has_more'
+        """
+        return self._keyset_page('projects', self.PROJECT_COLUMNS, self._project_from_row, limit, cursor)
+    
+    def get_projects_by_ids(self, project_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Get specific projects, keyed by id"""
+        ids = list({pid for pid in project_ids if pid is not None})
+        if not ids:
+            return {}
+        placeholders = ', '.join('?' for _ in ids)
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT {self.PROJECT_COLUMNS} FROM projects WHERE id IN ({placeholders})', ids)
+            rows = cursor.fetchall()
+        return {row[0]: self._project_from_row(row) for row in rows}
     
+    def count_projects(self) -> int:
+        """Number of projects"""
+        return self._count('projects')
+    
+    @_writes('documents')
     def save_document(self, document: Dict[str, Any]) -> int:
         """Save document to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO documents (project_id, name, type, content, status)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
-            document['project_id'],
-            document['name'],
-            document['type'],
-            document['content'],
-            document.get('status', 'Draft')
-        ))
-        
-        document_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+        
+            cursor.execute('''
+                INSERT INTO documents (project_id, name, type, content, status)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (
+                document['project_id'],
+                document['name'],
+                document['type'],
+                document['content'],
+                document.get('status', 'Draft')
+            ))
+        
+            document_id = cursor.lastrowid
         return document_id
     
-    def get_documents(self, project_id: int = None) -> List[Dict[str, Any]]:
-        """Get documents from database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if project_id:
-            cursor.execute('SELECT * FROM documents WHERE project_id = ? ORDER BY created_at DESC', (project_id,))
-        else:
-            cursor.execute('SELECT * FROM documents ORDER BY created_at DESC')
+    DOCUMENT_COLUMNS = 'id, project_id, name, type, content, status, created_at, updated_at, version'
+    # Same shape without reading the (potentially large) generated content
+    DOCUMENT_SUMMARY_COLUMNS = 'id, project_id, name, type, NULL, status, created_at, updated_at, version'
+    
+    def _document_from_row(self, row) -> Document:
+        return Document(row)
+    
+    def _document_summary_from_row(self, row) -> Document:
+        document = self._document_from_row(row)
+        del document['content']
+        return document
+    
+    def _document_projection(self, include_content: bool):
+        if include_content:
+            return self.DOCUMENT_COLUMNS, self._document_from_row
+        return self.DOCUMENT_SUMMARY_COLUMNS, self._document_summary_from_row
+    
+    def get_documents(self, project_id: int = None, limit: int = None,
+                      include_content: bool = True) -> List[Dict[str, Any]]:
+        """Get documents from database, newest first (at most limit rows if given)
         
-        rows = cursor.fetchall()
+        With include_content=False the rows carry metadata only (no 'content'
+        key); load the text with get_document_content when it is needed.
+        """
+        columns, from_row = self._document_projection(include_content)
+        return self._keyset_query('documents', columns, from_row, limit=limit, project_id=project_id or None)
+    
+    def get_documents_page(self, project_id: int = None, limit: int = 20, cursor: Tuple[str, int] = None,
+                           include_content: bool = True) -> Dict[str, Any]:
+        """Get one page of documents, newest first (see get_projects_page)"""
+        columns, from_row = self._document_projection(include_content)
+        return self._keyset_page('documents', columns, from_row, limit, cursor, project_id=project_id or None)
+    
+    def get_document_content(self, document_id: int) -> str:
+        """Get the content of a single document"""
+        with self.pool.transaction() as conn:
+            row = conn.execute('SELECT content FROM documents WHERE id = ?', (document_id,)).fetchone()
+        return (row[0] or '') if row else ''
+    
+    def get_document_revisions(self, document_id: int) -> List[Dict[str, Any]]:
+        """Revision history of a document, newest first
         
-        documents = []
-        for row in rows:
-            document = {
-                'id': row[0],
-                'project_id': row[1],
-                'name': row[2],
-                'type': row[3],
-                'content': row[4],
-                'status': row[5],
-                'created_at': row[6],
-                'updated_at': row[7]
-            }
-            documents.append(document)
-        
-        conn.close()
-        return documents
+        The first entry is the current content (kind 'current'); older entries
+        are archived deltas or snapshots with their original and stored sizes.
+        """
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT LENGTH(CAST(content AS BLOB)), updated_at FROM documents WHERE id = ?',
+                           (document_id,))
+            row = cursor.fetchone()
+            if not row:
+                return []
+            current = {'revision': current_revision(cursor, document_id), 'kind': 'current',
+                       'size': row[0] or 0, 'stored_size': row[0] or 0, 'created_at': row[1]}
+            return [current] + list_revisions(cursor, document_id)
+    
+    def get_document_revision(self, document_id: int, revision: int) -> str:
+        """Content of a document as of a revision (None if there is no such revision)"""
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT content FROM documents WHERE id = ?', (document_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return get_revision_text(cursor, document_id, revision, row[0])
+    
+    def get_revision_storage_stats(self) -> Dict[str, Any]:
+        """Size of archived revisions as written versus as stored"""
+        with self.pool.transaction() as conn:
+            row = conn.execute('''
+                SELECT COUNT(*), SUM(kind = 'snapshot'), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0)
+                FROM document_revisions
+            ''').fetchone()
+        return {
+            'revisions': row[0],
+            'snapshots': row[1] or 0,
+            'original_size': row[2],
+            'stored_size': row[3],
+            'compression_ratio': round(row[2] / row[3], 2) if row[3] else 0.0
+        }
     
+    def count_documents(self, project_id: int = None) -> int:
+        """Number of documents, optionally for one project"""
+        return self._count('documents', project_id=project_id or None)
+    
+    @_writes('workflows')
     def save_workflow(self, workflow: Dict[str, Any]) -> int:
         """Save workflow to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO workflows (project_id, document_id, name, status, approvers, current_step)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            workflow['project_id'],
-            workflow.get('document_id'),
-            workflow['name'],
-            workflow.get('status', 'Active'),
-            json.dumps(workflow.get('approvers', [])),
-            workflow.get('current_step', 0)
-        ))
-        
-        workflow_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+        
+            cursor.execute('''
+                INSERT INTO workflows (project_id, document_id, name, status, approvers, current_step)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (
+                workflow['project_id'],
+                workflow.get('document_id'),
+                workflow['name'],
+                workflow.get('status', 'Active'),
+                json.dumps(workflow.get('approvers', [])),
+                workflow.get('current_step', 0)
+            ))
+        
+            workflow_id = cursor.lastrowid
         return workflow_id
     
-    def get_workflows(self, project_id: int = None) -> List[Dict[str, Any]]:
-        """Get workflows from database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if project_id:
-            cursor.execute('SELECT * FROM workflows WHERE project_id = ? ORDER BY created_at DESC', (project_id,))
-        else:
-            cursor.execute('SELECT * FROM workflows ORDER BY created_at DESC')
+    WORKFLOW_COLUMNS = ('id, project_id, document_id, name, status, approvers, current_step, created_at, updated_at, '
+                        'version')
+    
+    def _workflow_from_row(self, row) -> Workflow:
+        return Workflow(row)
+    
+    def get_workflows(self, project_id: int = None, limit: int = None, status=None) -> List[Dict[str, Any]]:
+        """Get workflows from database, newest first
         
-        rows = cursor.fetchall()
+        Args:
+            project_id: Only workflows of this project
+            limit: Return at most this many rows
+            status: A status or list of statuses to keep
+        """
+        return self._keyset_query('workflows', self.WORKFLOW_COLUMNS, self._workflow_from_row,
+                                  limit=limit, project_id=project_id or None, status=status)
+    
+    def get_workflows_page(self, project_id: int = None, limit: int = 20, cursor: Tuple[str, int] = None,
+                           status=None) -> Dict[str, Any]:
+        """Get one page of workflows, newest first (see get_projects_page)"""
+        return self._keyset_page('workflows', self.WORKFLOW_COLUMNS, self._workflow_from_row,
+                                 limit, cursor, project_id=project_id or None, status=status)
+    
+    def count_workflows(self, project_id: int = None, status=None) -> int:
+        """Number of workflows, optionally filtered by project and status"""
+        return self._count('workflows', project_id=project_id or None, status=status)
+    
+    # Workflows joined with their document and project. Workflows whose
+    # document no longer exists are left out, as the pages always did.
+    WORKFLOW_DETAIL_FROM = (
+        'workflows w JOIN documents d ON d.id = w.document_id '
+        'LEFT JOIN projects p ON p.id = w.project_id'
+    )
+    WORKFLOW_DETAIL_COLUMNS = (
+        'w.id, w.project_id, w.document_id, w.name, w.status, w.approvers, w.current_step, '
+        'w.created_at, w.updated_at, w.version, d.name, d.type, d.status, d.project_id, d.version, '
+        'p.name, p.type'
+    )
+    WORKFLOW_DETAIL_TABLES = ('workflows', 'documents', 'projects')
+    
+    def _workflow_detail_from_row(self, row) -> WorkflowDetail:
+        workflow = WorkflowDetail(row[:10])
+        workflow['document'] = {
+            'id': row[2],
+            'name': row[10],
+            'type': row[11],
+            'status': row[12],
+            'project_id': row[13],
+            'version': row[14]
+        }
+        workflow['project'] = {'id': row[1], 'name': row[15], 'type': row[16]} if row[15] is not None else None
+        return workflow
+    
+    def get_workflow_details(self, project_id: int = None, limit: int = None, status=None) -> List[Dict[str, Any]]:
+        """Get workflows with their document and project attached, newest first
         
-        workflows = []
-        for row in rows:
-            workflow = {
-                'id': row[0],
-                'project_id': row[1],
-                'document_id': row[2],
-                'name': row[3],
-                'status': row[4],
-                'approvers': json.loads(row[5]) if row[5] else [],
-                'current_step': row[6],
-                'created_at': row[7],
-                'updated_at': row[8]
-            }
-            workflows.append(workflow)
-        
-        conn.close()
-        return workflows
+        Each row is a workflow dict plus 'document' (id, name, type, status,
+        project_id) and 'project' (id, name, type, or None), from one joined query.
+        """
+        return self._keyset_query(self.WORKFLOW_DETAIL_FROM, self.WORKFLOW_DETAIL_COLUMNS,
+                                  self._workflow_detail_from_row, limit=limit, alias='w',
+                                  depends_on=self.WORKFLOW_DETAIL_TABLES,
+                                  project_id=project_id or None, status=status)
     
-    def update_workflow(self, workflow_id: int, updates: Dict[str, Any]):
-        """Update workflow in database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def get_workflow_details_page(self, project_id: int = None, limit: int = 20, cursor: Tuple[str, int] = None,
+                                  status=None) -> Dict[str, Any]:
+        """Get one page of get_workflow_details rows (see get_projects_page)"""
+        return self._keyset_page(self.WORKFLOW_DETAIL_FROM, self.WORKFLOW_DETAIL_COLUMNS,
+                                 self._workflow_detail_from_row, limit, cursor, alias='w',
+                                 depends_on=self.WORKFLOW_DETAIL_TABLES,
+                                 project_id=project_id or None, status=status)
+    
+    def get_metrics(self, project_ids: List[int] = None) -> Dict[str, Any]:
+        """Dashboard and compliance aggregates, computed in SQL in one round trip
         
-        set_clause = ', '.join([f"{key} = ?" for key in updates.keys()])
-        values = list(updates.values())
-        values.append(workflow_id)
+        Args:
+            project_ids: Projects to include per-project document and workflow
+                counts for (none when omitted, so the cost stays flat)
         
-        cursor.execute(f'''
-            UPDATE workflows 
-            SET {set_clause}, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', values)
+        Returns:
+            Dict with project/document/workflow totals, workflows_by_status,
+            avg_step_by_status, documents_by_type, documents_by_status,
+            documents_per_project, workflows_per_project, avg_approvers and
+            min_approvers
+        """
+        metrics = {
+            'project_count': 0,
+            'document_count': 0,
+            'workflow_count': 0,
+            'workflows_by_status': {},
+            'avg_step_by_status': {},
+            'documents_by_type': {},
+            'documents_by_status': {},
+            'documents_per_project': {},
+            'workflows_per_project': {},
+            'avg_approvers': 0.0,
+            'min_approvers': 0
+        }
         
-        conn.commit()
-        conn.close()
-    
-    def update_document(self, document_id: int, updates: Dict[str, Any]):
-        """Update document in database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Every row is (metric, key, value, extra); the branches share one statement
+        queries = [
+            "SELECT 'projects', NULL, COUNT(*), NULL FROM projects",
+            "SELECT 'workflow_status', status, COUNT(*), AVG(current_step) FROM workflows GROUP BY status",
+            "SELECT 'document_type', type, COUNT(*), NULL FROM documents GROUP BY type",
+            "SELECT 'document_status', status, COUNT(*), NULL FROM documents GROUP BY status",
+            "SELECT 'approvers', NULL, AVG(json_array_length(approvers)), MIN(json_array_length(approvers)) "
+            "FROM workflows WHERE json_valid(approvers)",
+        ]
+        params: List[Any] = []
+        ids = list({pid for pid in (project_ids or []) if pid is not None})
+        if ids:
+            placeholders = ', '.join('?' for _ in ids)
+            queries.append(f"SELECT 'project_documents', project_id, COUNT(*), NULL FROM documents "
+                           f"WHERE project_id IN ({placeholders}) GROUP BY project_id")
+            queries.append(f"SELECT 'project_workflows', project_id, COUNT(*), NULL FROM workflows "
+                           f"WHERE project_id IN ({placeholders}) GROUP BY project_id")
+            params = ids + ids
+        
+        sql = ' UNION ALL '.join(queries)
+        
+        def load():
+            with self.pool.transaction() as conn:
+                return tuple(conn.execute(sql, params).fetchall())
         
+        rows = self._cached(self._cache_key('metrics', sql, params), ('projects', 'documents', 'workflows'), load)
+        
+        for metric, key, value, extra in rows:
+            if metric == 'projects':
+                metrics['project_count'] = value
+            elif metric == 'workflow_status':
+                metrics['workflows_by_status'][key] = value
+                metrics['avg_step_by_status'][key] = extra or 0.0
+                metrics['workflow_count'] += value
+            elif metric == 'document_type':
+                metrics['documents_by_type'][key or 'Unknown'] = value
+                metrics['document_count'] += value
+            elif metric == 'document_status':
+                metrics['documents_by_status'][key] = value
+            elif metric == 'approvers':
+                metrics['avg_approvers'] = value or 0.0
+                metrics['min_approvers'] = extra or 0
+            elif metric == 'project_documents':
+                metrics['documents_per_project'][key] = value
+            elif metric == 'project_workflows':
+                metrics['workflows_per_project'][key] = value
+        return metrics
+    
+    # Optimistic concurrency: every update of a workflow or document bumps its
+    # version column. The *_if_version methods only apply when the row is
+    # still at the version the caller read (a single conditional UPDATE, so no
+    # lock is held between read and write) and report a conflict otherwise.
+    def _update_versioned(self, cursor, table: str, row_id: int, updates: Dict[str, Any],
+                          expected_version: int = None) -> bool:
         set_clause = ', '.join([f"{key} = ?" for key in updates.keys()])
         values = list(updates.values())
-        values.append(document_id)
+        values.append(row_id)
+        where = 'id = ?'
+        if expected_version is not None:
+            where += ' AND version = ?'
+            values.append(expected_version)
         
         cursor.execute(f'''
-            UPDATE documents 
-            SET {set_clause}, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
+            UPDATE {table} 
+            SET {set_clause + ', ' if set_clause else ''}version = version + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE {where}
         ''', values)
+        return cursor.rowcount == 1
+    
+    def _version_conflict(self, cursor, table: str, columns: str, from_row, row_id: int) -> Dict[str, Any]:
+        cursor.execute(f'SELECT {columns} FROM {table} WHERE id = ?', (row_id,))
+        row = cursor.fetchone()
+        current = from_row(row) if row else None
+        return {'updated': False, 'conflict': True, 'version': current['version'] if current else None,
+                'current': current}
+    
+    @_writes('workflows', queued=True)
+    def update_workflow(self, workflow_id: int, updates: Dict[str, Any]):
+        """Update workflow in database (queued with write-behind)"""
+        set_clause = ''.join(f"{key} = ?, " for key in updates.keys())
+        if self._enqueue(f'''
+            UPDATE workflows SET {set_clause}version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = ?
+        ''', [list(updates.values()) + [workflow_id]], ('workflows',)):
+            return
+        with self.pool.transaction() as conn:
+            self._update_versioned(conn.cursor(), 'workflows', workflow_id, updates)
+    
+    @_writes('workflows')
+    def update_workflow_if_version(self, workflow_id: int, expected_version: int,
+                                   updates: Dict[str, Any]) -> Dict[str, Any]:
+        """Compare-and-swap update of a workflow
+        
+        Args:
+            workflow_id: Workflow to update
+            expected_version: The 'version' the caller's copy of the workflow has
+            updates: Columns to set
         
-        conn.commit()
-        conn.close()
+        Returns:
+            Dict with 'updated', 'conflict', the row's 'version' after the call
+            and, on conflict, the 'current' workflow (None if it was deleted)
+        """
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+            if self._update_versioned(cursor, 'workflows', workflow_id, updates, expected_version):
+                return {'updated': True, 'conflict': False, 'version': expected_version + 1, 'current': None}
+            return self._version_conflict(cursor, 'workflows', self.WORKFLOW_COLUMNS, self._workflow_from_row,
+                                          workflow_id)
     
+    def _update_document(self, cursor, document_id: int, updates: Dict[str, Any],
+                         expected_version: int = None) -> bool:
+        if 'content' not in updates:
+            return self._update_versioned(cursor, 'documents', document_id, updates, expected_version)
+        while True:
+            cursor.execute('SELECT content, version FROM documents WHERE id = ?', (document_id,))
+            row = cursor.fetchone()
+            if not row or (expected_version is not None and row[1] != expected_version):
+                return False
+            # The version just read guards the write, so the archived content is
+            # exactly the content being replaced
+            if self._update_versioned(cursor, 'documents', document_id, updates, row[1]):
+                record_revision(cursor, document_id, row[0], updates['content'])
+                return True
+            if expected_version is not None:
+                return False
+    
+    @_writes('documents', 'document_revisions')
+    def update_document(self, document_id: int, updates: Dict[str, Any]):
+        """Update document in database
+        
+        When the content changes, the previous content is archived as a
+        revision (see get_document_revisions) in the same transaction.
+        """
+        with self.pool.transaction() as conn:
+            self._update_document(conn.cursor(), document_id, updates)
+    
+    @_writes('documents', 'document_revisions')
+    def update_document_if_version(self, document_id: int, expected_version: int,
+                                   updates: Dict[str, Any]) -> Dict[str, Any]:
+        """Compare-and-swap update of a document (see update_workflow_if_version)"""
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+            if self._update_document(cursor, document_id, updates, expected_version):
+                return {'updated': True, 'conflict': False, 'version': expected_version + 1, 'current': None}
+            columns, from_row = self._document_projection(include_content=False)
+            return self._version_conflict(cursor, 'documents', columns, from_row, document_id)
+    
+    @_writes('projects', 'project_requirements')
     def update_project(self, project_id: int, updates: Dict[str, Any]):
         """Update project in database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Handle list fields
-        processed_updates = {}
-        for key, value in updates.items():
-            if key in ['functional_reqs', 'non_functional_reqs', 'conditions', 'recommended_docs'] and isinstance(value, list):
-                processed_updates[key] = json.dumps(value)
-            else:
-                processed_updates[key] = value
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
         
-        set_clause = ', '.join([f"{key} = ?" for key in processed_updates.keys()])
-        values = list(processed_updates.values())
-        values.append(project_id)
+            # Handle list fields
+            processed_updates = {}
+            for key, value in updates.items():
+                if key in ['functional_reqs', 'non_functional_reqs', 'conditions', 'recommended_docs'] and isinstance(value, list):
+                    processed_updates[key] = json.dumps(value)
+                else:
+                    processed_updates[key] = value
         
-        cursor.execute(f'''
-            UPDATE projects 
-            SET {set_clause}, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', values)
+            set_clause = ', '.join([f"{key} = ?" for key in processed_updates.keys()])
+            values = list(processed_updates.values())
+            values.append(project_id)
         
-        conn.commit()
-        conn.close()
+            cursor.execute(f'''
+                UPDATE projects 
+                SET {set_clause}, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', values)
+            self._sync_requirements(cursor, project_id, updates)
+    
+    # Embedding rows deleted per short transaction when projects are removed
+    EMBEDDING_DELETE_BATCH_SIZE = 2000
     
     def delete_project(self, project_id: int):
         """Delete project and all related data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Delete related workflow comments first
-        cursor.execute('''
-            DELETE FROM workflow_comments 
-            WHERE workflow_id IN (
-                SELECT id FROM workflows WHERE project_id = ?
-            )
-        ''', (project_id,))
+        self.delete_projects([project_id])
+    
+    def delete_multiple_projects(self, project_ids: List[int]):
+        """Delete multiple projects and all related data"""
+        return self.delete_projects(project_ids)
+    
+    @_writes('projects', 'project_requirements', 'documents', 'document_revisions', 'workflows',
+             'workflow_comments', 'project_data_files', 'vector_embeddings')
+    def delete_projects(self, project_ids: List[int], embedding_batch_size: int = None) -> Dict[str, int]:
+        """Delete projects and all related data
         
-        # Delete related workflows
-        cursor.execute('DELETE FROM workflows WHERE project_id = ?', (project_id,))
+        Projects, documents, workflows, comments and data files are removed in
+        one transaction, keyed through a temp table of the project ids. The
+        (much larger) embeddings are then deleted in bounded batches, each in
+        its own short transaction, so other sessions are not locked out for
+        the whole delete. Until then the leftover embeddings are unreachable:
+        embedding reads join project_data_files, and ids are never reused.
+        Project shards are deleted last, as whole files.
         
-        # Delete related documents
-        cursor.execute('DELETE FROM documents WHERE project_id = ?', (project_id,))
+        Returns:
+            Number of rows deleted per table
+        """
+        ids = list(dict.fromkeys(pid for pid in project_ids if pid is not None))
+        deleted = {}
+        if not ids:
+            return deleted
         
-        # Delete project data files and embeddings
-        cursor.execute('DELETE FROM vector_embeddings WHERE project_id = ?', (project_id,))
-        cursor.execute('DELETE FROM project_data_files WHERE project_id = ?', (project_id,))
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
         
-        # Delete project
-        cursor.execute('DELETE FROM projects WHERE id = ?', (project_id,))
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS doomed_projects (id INTEGER PRIMARY KEY)')
+            cursor.execute('DELETE FROM doomed_projects')
+            cursor.executemany('INSERT INTO doomed_projects (id) VALUES (?)', [(pid,) for pid in ids])
         
-        conn.commit()
-        conn.close()
+            # Delete related workflow comments first
+            cursor.execute('''
+                DELETE FROM workflow_comments 
+                WHERE workflow_id IN (
+                    SELECT id FROM workflows WHERE project_id IN (SELECT id FROM doomed_projects)
+                )
+            ''')
+            deleted['workflow_comments'] = cursor.rowcount
+        
+            cursor.execute('''
+                DELETE FROM document_revisions
+                WHERE document_id IN (SELECT id FROM documents WHERE project_id IN (SELECT id FROM doomed_projects))
+            ''')
+            deleted['document_revisions'] = cursor.rowcount
+        
+            for table in ('workflows', 'documents', 'project_requirements'):
+                cursor.execute(f'DELETE FROM {table} WHERE project_id IN (SELECT id FROM doomed_projects)')
+                deleted[table] = cursor.rowcount
+        
+            # Delete project data files, releasing their content blobs
+            cursor.execute('''
+                SELECT content_blob FROM project_data_files
+                WHERE project_id IN (SELECT id FROM doomed_projects)
+            ''')
+            blob_hashes = [row[0] for row in cursor.fetchall()]
+            cursor.execute('DELETE FROM project_data_files WHERE project_id IN (SELECT id FROM doomed_projects)')
+            deleted['project_data_files'] = cursor.rowcount
+            release_blobs(cursor, blob_hashes)
+        
+            cursor.execute('DELETE FROM projects WHERE id IN (SELECT id FROM doomed_projects)')
+            deleted['projects'] = cursor.rowcount
+            cursor.execute('DELETE FROM doomed_projects')
+        
+        deleted['vector_embeddings'] = self._delete_project_embeddings(ids, embedding_batch_size)
+        
+        if self.shard_dir:
+            for pid in ids:
+                for table, count in self._drop_shard(pid).items():
+                    deleted[table] += count
+        return deleted
     
-    def delete_multiple_projects(self, project_ids: List[int]):
-        """Delete multiple projects and all related data"""
-        for project_id in project_ids:
-            self.delete_project(project_id)
+    def _delete_project_embeddings(self, project_ids: List[int], batch_size: int = None) -> int:
+        """Delete the embeddings of projects in bounded batches; returns rows deleted"""
+        batch_size = max(1, batch_size or self.EMBEDDING_DELETE_BATCH_SIZE)
+        placeholders = ', '.join('?' for _ in project_ids)
+        total = 0
+        while True:
+            with self.pool.transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    DELETE FROM vector_embeddings WHERE id IN (
+                        SELECT id FROM vector_embeddings WHERE project_id IN ({placeholders}) LIMIT ?
+                    )
+                ''', list(project_ids) + [batch_size])
+                deleted = cursor.rowcount
+            total += deleted
+            if deleted < batch_size:
+                return total
     
     # Project Data Files Management
     def save_project_data_file(self, project_id: int, filename: str, file_path: str, file_type: str, 
-                               file_size: int, content: str, content_hash: str, is_template: bool = False) -> int:
-        """Save project data file information"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO project_data_files 
-            (project_id, filename, file_path, file_type, file_size, content, content_hash, is_template)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (project_id, filename, file_path, file_type, file_size, content, content_hash, is_template))
-        
-        file_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return file_id
+                               file_size: int, content: str, content_hash: str, is_template: bool = False,
+                               source_fingerprint: str = None) -> int:
+        """Save project data file information
+        
+        The extracted text goes to the content-addressed blob store, so identical
+        files uploaded to several projects are stored once. source_fingerprint
+        identifies the raw source (e.g. an archive member's size and CRC), so an
+        unchanged source can be skipped before it is extracted again.
+        """
+        return self.save_project_data_files([{
+            'project_id': project_id, 'filename': filename, 'file_path': file_path,
+            'file_type': file_type, 'file_size': file_size, 'content': content,
+            'content_hash': content_hash, 'is_template': is_template,
+            'source_fingerprint': source_fingerprint
+        }])[0]
     
-    def get_project_data_files(self, project_id: int, include_templates: bool = True) -> List[Dict]:
-        """Get all data files for a project"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    @_writes('project_data_files')
+    def save_project_data_files(self, files: List[Dict[str, Any]]) -> List[int]:
+        """Save several project data files in one transaction
         
-        if include_templates:
-            cursor.execute('''
-                SELECT * FROM project_data_files WHERE project_id = ?
-                ORDER BY created_at DESC
-            ''', (project_id,))
-        else:
-            cursor.execute('''
-                SELECT * FROM project_data_files WHERE project_id = ? AND is_template = FALSE
-                ORDER BY created_at DESC
+        Args:
+            files: Dicts with the keyword arguments of save_project_data_file
+        
+        Returns:
+            The new file ids, in input order
+        """
+        file_ids = []
+        schemas = {pid: self._data_schema(pid, create=True) for pid in {f['project_id'] for f in files}}
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+        
+            # File ids are needed back, so files are inserted one at a time;
+            # they still share a single commit
+            for file_info in files:
+                schema = schemas[file_info['project_id']]
+                blob_key = put_blob(cursor, file_info.get('content') or "", schema)
+                cursor.execute(f'''
+                    INSERT INTO {schema}.project_data_files 
+                    (project_id, filename, file_path, file_type, file_size, content, content_hash, content_blob,
+                     is_template, source_fingerprint)
+                    VALUES (?, ?, ?, ?, ?, NULL, ?, ?, ?, ?)
+                ''', (file_info['project_id'], file_info['filename'], file_info.get('file_path'),
+                      file_info.get('file_type'), file_info.get('file_size'), file_info.get('content_hash'),
+                      blob_key, file_info.get('is_template', False), file_info.get('source_fingerprint')))
+                file_ids.append(cursor.lastrowid)
+        return file_ids
+    
+    DATA_FILE_COLUMNS = ('id, project_id, filename, file_path, file_type, file_size, content_hash, '
+                         'is_template, created_at')
+    
+    def list_project_data_files(self, project_id: int, include_templates: bool = True) -> List[Dict]:
+        """List a project's data files without their content (see get_file_content)"""
+        schema = self._data_schema(project_id)
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+        
+            sql = f'SELECT {self.DATA_FILE_COLUMNS} FROM {schema}.project_data_files WHERE project_id = ?'
+            if not include_templates:
+                sql += ' AND is_template = FALSE'
+            cursor.execute(sql + ' ORDER BY created_at DESC', (project_id,))
+        
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def find_project_data_file(self, project_id: int, filename: str, content_hash: str) -> int:
+        """Id of a project file with this name and content hash, or None"""
+        schema = self._data_schema(project_id)
+        with self.pool.transaction() as conn:
+            row = conn.execute(f'''
+                SELECT id FROM {schema}.project_data_files
+                WHERE project_id = ? AND filename = ? AND content_hash = ?
+                LIMIT 1
+            ''', (project_id, filename, content_hash)).fetchone()
+        return row[0] if row else None
+    
+    def get_source_fingerprints(self, project_id: int, filename_prefix: str = '') -> Dict[str, str]:
+        """{filename: source fingerprint} of a project's newest file per name
+        
+        Args:
+            filename_prefix: Only files whose name starts with this (e.g. 'docs.zip/')
+        """
+        schema = self._data_schema(project_id)
+        prefix = filename_prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        with self.pool.transaction() as conn:
+            rows = conn.execute(f'''
+                SELECT filename, source_fingerprint FROM {schema}.project_data_files
+                WHERE project_id = ? AND source_fingerprint IS NOT NULL AND filename LIKE ? ESCAPE '\\'
+                ORDER BY id
+            ''', (project_id, prefix + '%')).fetchall()
+        return dict(rows)
+    
+    @_writes('project_data_files')
+    def update_source_fingerprint(self, file_id: int, source_fingerprint: str):
+        """Record the source fingerprint of an already stored file"""
+        schema = self._file_schema(file_id)
+        with self.pool.transaction() as conn:
+            conn.execute(f'UPDATE {schema}.project_data_files SET source_fingerprint = ? WHERE id = ?',
+                         (source_fingerprint, file_id))
+    
+    def get_project_data_stats(self, project_id: int) -> Dict[str, Any]:
+        """File counts, total size, per-type counts and chunk count for a project
+        
+        Computed with aggregates only; no file content or embeddings are read.
+        """
+        stats = {
+            "total_files": 0,
+            "data_files": 0,
+            "template_files": 0,
+            "total_size": 0,
+            "total_chunks": 0,
+            "file_types": {}
+        }
+        schema = self._data_schema(project_id)
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+        
+            cursor.execute(f'''
+                SELECT file_type, is_template, COUNT(*), COALESCE(SUM(file_size), 0)
+                FROM {schema}.project_data_files WHERE project_id = ?
+                GROUP BY file_type, is_template
             ''', (project_id,))
+            for file_type, is_template, count, size in cursor.fetchall():
+                stats["total_files"] += count
+                stats["total_size"] += size
+                stats["template_files" if is_template else "data_files"] += count
+                stats["file_types"][file_type] = stats["file_types"].get(file_type, 0) + count
+        
+            cursor.execute(f'SELECT COUNT(*) FROM {schema}.vector_embeddings WHERE project_id = ?', (project_id,))
+            stats["total_chunks"] = cursor.fetchone()[0]
+        return stats
+    
+    def get_project_data_files(self, project_id: int, include_templates: bool = True) -> List[Dict]:
+        """Get all data files for a project, including their full content"""
+        schema = self._data_schema(project_id)
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+        
+            if include_templates:
+                cursor.execute(f'''
+                    SELECT * FROM {schema}.project_data_files WHERE project_id = ?
+                    ORDER BY created_at DESC
+                ''', (project_id,))
+            else:
+                cursor.execute(f'''
+                    SELECT * FROM {schema}.project_data_files WHERE project_id = ? AND is_template = FALSE
+                    ORDER BY created_at DESC
+                ''', (project_id,))
         
-        columns = [col[0] for col in cursor.description]
-        files = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            columns = [col[0] for col in cursor.description]
+            files = [dict(zip(columns, row)) for row in cursor.fetchall()]
         
-        conn.close()
+            # Resolve content stored in the blob store
+            blob_texts = get_blob_texts(cursor, [f['content_blob'] for f in files if f['content'] is None], schema)
+            for file_info in files:
+                if file_info['content'] is None:
+                    file_info['content'] = blob_texts.get(file_info['content_blob'], '')
         return files
     
+    def get_file_content(self, file_id: int) -> str:
+        """Get the extracted text of a single project data file"""
+        schema = self._file_schema(file_id)
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+        
+            cursor.execute(f'SELECT content, content_blob FROM {schema}.project_data_files WHERE id = ?', (file_id,))
+            row = cursor.fetchone()
+            content = ''
+            if row:
+                content = row[0] if row[0] is not None else get_blob_texts(cursor, [row[1]], schema).get(row[1], '')
+        return content
+    
+    @_writes('project_data_files', 'vector_embeddings')
     def delete_project_data_file(self, file_id: int):
         """Delete a project data file and its embeddings"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        schema = self._file_schema(file_id)
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
         
-        # Delete associated embeddings
-        cursor.execute('DELETE FROM vector_embeddings WHERE file_id = ?', (file_id,))
+            cursor.execute(f'SELECT content_blob FROM {schema}.project_data_files WHERE id = ?', (file_id,))
+            blob_hashes = [row[0] for row in cursor.fetchall()]
         
-        # Delete file record
-        cursor.execute('DELETE FROM project_data_files WHERE id = ?', (file_id,))
+            # Delete associated embeddings
+            cursor.execute(f'DELETE FROM {schema}.vector_embeddings WHERE file_id = ?', (file_id,))
         
-        conn.commit()
-        conn.close()
+            # Delete file record
+            cursor.execute(f'DELETE FROM {schema}.project_data_files WHERE id = ?', (file_id,))
+            release_blobs(cursor, blob_hashes, schema)
     
     # Vector Embeddings Management
     def save_vector_embedding(self, project_id: int, file_id: int, chunk_index: int, 
-                              chunk_text: str, embedding_vector: List[float], metadata: Dict = None):
-        """Save vector embedding for text chunk"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Convert embedding to JSON string
-        embedding_json = json.dumps(embedding_vector)
-        metadata_json = json.dumps(metadata or {})
-        
-        cursor.execute('''
-            INSERT INTO vector_embeddings 
-            (project_id, file_id, chunk_index, chunk_text, embedding_vector, metadata)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (project_id, file_id, chunk_index, chunk_text, embedding_json, metadata_json))
-        
-        conn.commit()
-        conn.close()
-    
-    def get_vector_embeddings(self, project_id: int) -> List[Dict]:
-        """Get all vector embeddings for a project"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT ve.*, pdf.filename 
-            FROM vector_embeddings ve
-            JOIN project_data_files pdf ON ve.file_id = pdf.id
-            WHERE ve.project_id = ?
-            ORDER BY ve.file_id, ve.chunk_index
-        ''', (project_id,))
-        
-        columns = [col[0] for col in cursor.description]
-        embeddings = []
-        
-        for row in cursor.fetchall():
-            embedding_dict = dict(zip(columns, row))
-            # Parse JSON fields
-            embedding_dict['embedding_vector'] = json.loads(embedding_dict['embedding_vector'])
-            embedding_dict['metadata'] = json.loads(embedding_dict['metadata'])
-            embeddings.append(embedding_dict)
-        
-        conn.close()
+                              chunk_text: str, embedding_vector: List[float], metadata: Dict = None,
+                              chunk_span: Tuple[int, int] = None):
+        """Save vector embedding for text chunk
+        
+        When chunk_span (start, end offsets into the file's content) is given, the
+        chunk text is not stored again; it is sliced from the file's blob on read.
+        """
+        self.save_vector_embeddings([{
+            'project_id': project_id, 'file_id': file_id, 'chunk_index': chunk_index,
+            'chunk_text': chunk_text, 'embedding_vector': embedding_vector,
+            'metadata': metadata, 'chunk_span': chunk_span
+        }])
+    
+    @_writes('vector_embeddings')
+    def save_vector_embeddings(self, embeddings: List[Dict[str, Any]], batch_size: int = None) -> int:
+        """Save many chunk embeddings with executemany in one transaction
+        
+        Args:
+            embeddings: Dicts with the keyword arguments of save_vector_embedding
+            batch_size: Rows per executemany call (defaults to self.batch_size)
+        
+        Returns:
+            Number of rows written
+        """
+        # Embeddings go wherever their file is
+        rows_by_schema: Dict[str, List[Tuple]] = {}
+        for e in embeddings:
+            chunk_span = e.get('chunk_span')
+            chunk_start, chunk_end = chunk_span if chunk_span else (None, None)
+            rows_by_schema.setdefault(self._file_schema(e['file_id']), []).append((
+                e['project_id'], e['file_id'], e['chunk_index'],
+                None if chunk_span else e.get('chunk_text'), chunk_start, chunk_end,
+                json.dumps(e['embedding_vector']), json.dumps(e.get('metadata') or {})
+            ))
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+        
+            for schema, rows in rows_by_schema.items():
+                for batch in self._batches(rows, batch_size):
+                    cursor.executemany(f'''
+                        INSERT INTO {schema}.vector_embeddings 
+                        (project_id, file_id, chunk_index, chunk_text, chunk_start, chunk_end, embedding_vector, metadata)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', batch)
+        return len(embeddings)
+    
+    def get_vector_embeddings(self, project_id: int, include_text: bool = True) -> List[Dict]:
+        """Get all vector embeddings for a project
+        
+        With include_text=False chunk text that lives in the blob store is left as
+        None; call load_chunk_texts on the rows that are actually needed.
+        """
+        schema = self._data_schema(project_id)
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+        
+            cursor.execute(f'''
+                SELECT ve.*, pdf.filename, pdf.content_blob
+                FROM {schema}.vector_embeddings ve
+                JOIN {schema}.project_data_files pdf ON ve.file_id = pdf.id
+                WHERE ve.project_id = ?
+                ORDER BY ve.file_id, ve.chunk_index
+            ''', (project_id,))
+        
+            columns = [col[0] for col in cursor.description]
+            embeddings = []
+        
+            for row in cursor.fetchall():
+                embedding_dict = dict(zip(columns, row))
+                # Parse JSON fields
+                embedding_dict['embedding_vector'] = json.loads(embedding_dict['embedding_vector'])
+                embedding_dict['metadata'] = json.loads(embedding_dict['metadata'])
+                embeddings.append(embedding_dict)
+        
+            if include_text:
+                self._fill_chunk_texts(cursor, embeddings, schema)
         return embeddings
     
+    def load_chunk_texts(self, embeddings: List[Dict]) -> List[Dict]:
+        """Fill in chunk_text for embedding rows loaded with include_text=False"""
+        by_schema: Dict[str, List[Dict]] = {}
+        for embedding in embeddings:
+            by_schema.setdefault(self._file_schema(embedding.get('file_id')), []).append(embedding)
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+            for schema, rows in by_schema.items():
+                self._fill_chunk_texts(cursor, rows, schema)
+        return embeddings
+    
+    def _fill_chunk_texts(self, cursor, embeddings: List[Dict], schema: str = 'main'):
+        missing = [e for e in embeddings if e.get('chunk_text') is None and e.get('chunk_start') is not None]
+        blob_texts = get_blob_texts(cursor, [e['content_blob'] for e in missing], schema)
+        for embedding in missing:
+            text = blob_texts.get(embedding['content_blob'], '')
+            embedding['chunk_text'] = text[embedding['chunk_start']:embedding['chunk_end']]
+    
     def add_workflow_comment(self, workflow_id: int, approver: str, action: str, comment: str = ""):
         """Add comment to workflow"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        self.add_workflow_comments([{
+            'workflow_id': workflow_id, 'approver': approver, 'action': action, 'comment': comment
+        }])
+    
+    COMMENT_INSERT_SQL = '''
+        INSERT INTO workflow_comments (workflow_id, approver, action, comment)
+        VALUES (?, ?, ?, ?)
+    '''
+    
+    @_writes('workflow_comments', queued=True)
+    def add_workflow_comments(self, comments: List[Dict[str, Any]], batch_size: int = None) -> int:
+        """Add many workflow comments with executemany in one transaction (queued with write-behind)
         
-        cursor.execute('''
-            INSERT INTO workflow_comments (workflow_id, approver, action, comment)
-            VALUES (?, ?, ?, ?)
-        ''', (workflow_id, approver, action, comment))
+        Args:
+            comments: Dicts with workflow_id, approver, action and optional comment
+            batch_size: Rows per executemany call (defaults to self.batch_size)
         
-        conn.commit()
-        conn.close()
+        Returns:
+            Number of comments written (or queued)
+        """
+        rows = [(c['workflow_id'], c['approver'], c['action'], c.get('comment', "")) for c in comments]
+        if self._enqueue(self.COMMENT_INSERT_SQL, rows, ('workflow_comments',)):
+            return len(comments)
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+        
+            for batch in self._batches(rows, batch_size):
+                cursor.executemany(self.COMMENT_INSERT_SQL, batch)
+        return len(comments)
     
     def get_workflow_comments(self, workflow_id: int) -> List[Dict[str, Any]]:
         """Get all comments for a workflow"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        return self.get_workflow_comments_batch([workflow_id])[workflow_id]
+    
+    def _comment_from_row(self, row) -> Comment:
+        return Comment(row)
+    
+    def get_workflow_comments_batch(self, workflow_ids: List[int], last_n: int = None) -> Dict[int, List[Dict[str, Any]]]:
+        """Get comments for many workflows in one query per 500 ids
         
-        cursor.execute('''
-            SELECT * FROM workflow_comments 
-            WHERE workflow_id = ? 
-            ORDER BY created_at ASC
-        ''', (workflow_id,))
+        Args:
+            workflow_ids: Workflows to fetch comments for
+            last_n: Keep only the newest last_n comments of each workflow
         
-        rows = cursor.fetchall()
+        Returns:
+            {workflow_id: [comments oldest first]}, with an empty list for
+            workflows that have no comments
+        """
+        ids = list(dict.fromkeys(wid for wid in workflow_ids if wid is not None))
+        comments = {wid: [] for wid in ids}
+        self._read_barrier(('workflow_comments',))
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
         
-        comments = []
-        for row in rows:
-            comment = {
-                'id': row[0],
-                'workflow_id': row[1],
-                'approver': row[2],
-                'action': row[3],
-                'comment': row[4],
-                'created_at': row[5]
-            }
-            comments.append(comment)
-        
-        conn.close()
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ', '.join('?' for _ in batch)
+                if last_n:
+                    # Rank each workflow's comments newest first and keep the top last_n
+                    cursor.execute(f'''
+                        SELECT id, workflow_id, approver, action, comment, created_at FROM (
+                            SELECT *, ROW_NUMBER() OVER (
+                                PARTITION BY workflow_id ORDER BY created_at DESC, id DESC
+                            ) AS recency
+                            FROM workflow_comments WHERE workflow_id IN ({placeholders})
+                        )
+                        WHERE recency <= ?
+                        ORDER BY workflow_id, created_at ASC, id ASC
+                    ''', batch + [last_n])
+                else:
+                    cursor.execute(f'''
+                        SELECT id, workflow_id, approver, action, comment, created_at
+                        FROM workflow_comments WHERE workflow_id IN ({placeholders})
+                        ORDER BY workflow_id, created_at ASC, id ASC
+                    ''', batch)
+                for row in cursor.fetchall():
+                    comments[row[1]].append(self._comment_from_row(row))
         return comments
+    
+    def count_workflow_comments(self, workflow_ids: List[int]) -> Dict[int, int]:
+        """Number of comments per workflow, for many workflows at once"""
+        ids = list(dict.fromkeys(wid for wid in workflow_ids if wid is not None))
+        counts = {wid: 0 for wid in ids}
+        self._read_barrier(('workflow_comments',))
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+        
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ', '.join('?' for _ in batch)
+                cursor.execute(f'''
+                    SELECT workflow_id, COUNT(*) FROM workflow_comments
+                    WHERE workflow_id IN ({placeholders}) GROUP BY workflow_id
+                ''', batch)
+                counts.update(dict(cursor.fetchall()))
+        return counts
+    
+    AUDIT_INSERT_SQL = '''
+        INSERT INTO audit_events (event_type, entity_type, entity_id, actor, details)
+        VALUES (?, ?, ?, ?, ?)
+    '''
+    
+    @_writes('audit_events', queued=True)
+    def log_audit_event(self, event_type: str, entity_type: str = None, entity_id: int = None,
+                        actor: str = None, details: Dict[str, Any] = None):
+        """Record an audit event (queued with write-behind)
+        
+        Args:
+            event_type: What happened, e.g. 'workflow.approved'
+            entity_type: Kind of record it happened to ('workflow', 'document', ...)
+            entity_id: Id of that record
+            actor: User or role that caused it
+            details: Extra JSON-serializable data
+        """
+        rows = [(event_type, entity_type, entity_id, actor, json.dumps(details) if details else None)]
+        if self._enqueue(self.AUDIT_INSERT_SQL, rows, ('audit_events',)):
+            return
+        with self.pool.transaction() as conn:
+            conn.cursor().executemany(self.AUDIT_INSERT_SQL, rows)
+    
+    def get_audit_events(self, entity_type: str = None, entity_id: int = None,
+                         limit: int = 100) -> List[Dict[str, Any]]:
+        """Newest audit events, optionally only those of one entity"""
+        clauses, params = self._filters({'entity_type': entity_type, 'entity_id': entity_id})
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        self._read_barrier(('audit_events',))
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT id, event_type, entity_type, entity_id, actor, details, created_at
+                FROM audit_events {where} ORDER BY id DESC LIMIT ?
+            ''', params + [limit])
+            return [{
+                'id': row[0], 'event_type': row[1], 'entity_type': row[2], 'entity_id': row[3],
+                'actor': row[4], 'details': json.loads(row[5]) if row[5] else {}, 'created_at': row[6]
+            } for row in cursor.fetchall()]
+    
+    # Full-text search over document content and workflow comments, backed by
+    # the FTS5 indexes of migration 4 (LIKE scans where FTS5 is unavailable)
+    DOCUMENT_SEARCH_COLUMNS = ('d.id, d.project_id, d.name, d.type, NULL, d.status, d.created_at, d.updated_at, '
+                               'd.version, p.name')
+    COMMENT_SEARCH_COLUMNS = ('c.id, c.workflow_id, c.approver, c.action, c.comment, c.created_at, '
+                              'w.name, w.status, w.project_id, w.document_id')
+    
+    def _search_terms(self, query: str) -> List[str]:
+        # Words without letters or digits ("<", "-") are not indexed, so they are dropped
+        return [term for term in (query or '').split() if any(ch.isalnum() for ch in term)]
+    
+    def _fts_match(self, terms: List[str]) -> str:
+        """FTS5 query where every word must match; a trailing * makes a word a prefix"""
+        match = []
+        for term in terms:
+            phrase = '"' + term.rstrip('*').replace('"', '""') + '"'
+            match.append(phrase + '*' if term.endswith('*') else phrase)
+        return ' '.join(match)
+    
+    def _like_clauses(self, terms: List[str], columns: List[str]) -> Tuple[List[str], List[Any]]:
+        """Fallback filter: every word must appear in one of the columns"""
+        clauses, params = [], []
+        for term in terms:
+            pattern = '%' + term.rstrip('*').replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            clauses.append('(' + ' OR '.join(f"{column} LIKE ? ESCAPE '\\'" for column in columns) + ')')
+            params.extend([pattern] * len(columns))
+        return clauses, params
+    
+    def _has_search_index(self, index: str) -> bool:
+        if index not in self._search_indexes:
+            with self.pool.transaction() as conn:
+                self._search_indexes[index] = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (index,)
+                ).fetchone() is not None
+        return self._search_indexes[index]
+    
+    def _plain_snippet(self, text: str, terms: List[str], highlight: Tuple[str, str], width: int = 60) -> str:
+        """Excerpt around the first matching word, for the LIKE fallback"""
+        text = text or ''
+        lowered = text.lower()
+        matches = [(lowered.find(term.rstrip('*').lower()), len(term.rstrip('*'))) for term in terms]
+        matches = [match for match in matches if match[0] >= 0]
+        if not matches:
+            return text[:2 * width]
+        start, length = min(matches)
+        end = start + length
+        before = max(0, start - width)
+        return ('…' if before else '') + text[before:start] + highlight[0] + text[start:end] + highlight[1] + \
+            text[end:end + width] + ('…' if end + width < len(text) else '')
+    
+    def _search_rows(self, index: str, fts_sql: str, fallback_sql: str, fts_params: List[Any],
+                     fallback_params: List[Any], depends_on: Tuple[str, ...]) -> Tuple[bool, tuple]:
+        use_fts = self._has_search_index(index)
+        sql, params = (fts_sql, fts_params) if use_fts else (fallback_sql, fallback_params)
+        
+        def load():
+            with self.pool.transaction() as conn:
+                return tuple(conn.execute(sql, params).fetchall())
+        
+        return use_fts, self._cached(self._cache_key('search', sql, params), depends_on, load)
+    
+    def search_documents(self, query: str, project_id=None, status=None, limit: int = 20,
+                         highlight: Tuple[str, str] = ('**', '**')) -> List[Dict[str, Any]]:
+        """Full-text search over document names and content, best match first
+        
+        Args:
+            query: Words that must all appear; quote-free, a trailing * matches prefixes
+            project_id: A project id or list of ids to search in
+            status: A document status or list of statuses to keep
+            limit: Maximum number of results
+            highlight: Markers placed around matched words in the snippet
+        
+        Returns:
+            Document metadata (no 'content') plus 'project_name', 'snippet'
+            and 'score' (higher is a better match)
+        """
+        terms = self._search_terms(query)
+        if not terms:
+            return []
+        clauses, params = self._filters({'project_id': project_id or None, 'status': status}, 'd.')
+        filters = ''.join(f' AND {clause}' for clause in clauses)
+        like_clauses, like_params = self._like_clauses(terms, ['d.name', 'd.content'])
+        
+        # Name matches weigh more than body matches
+        fts_sql = f'''
+            SELECT {self.DOCUMENT_SEARCH_COLUMNS},
+                   snippet(documents_fts, 1, ?, ?, '…', 16), bm25(documents_fts, 5.0, 1.0) AS rank
+            FROM documents_fts
+            JOIN documents d ON d.id = documents_fts.rowid
+            LEFT JOIN projects p ON p.id = d.project_id
+            WHERE documents_fts MATCH ?{filters}
+            ORDER BY rank LIMIT ?
+        '''
+        fallback_sql = f'''
+            SELECT {self.DOCUMENT_SEARCH_COLUMNS}, d.content, 0
+            FROM documents d
+            LEFT JOIN projects p ON p.id = d.project_id
+            WHERE {' AND '.join(like_clauses)}{filters}
+            ORDER BY d.created_at DESC, d.id DESC LIMIT ?
+        '''
+        use_fts, rows = self._search_rows(
+            'documents_fts', fts_sql, fallback_sql,
+            list(highlight) + [self._fts_match(terms)] + params + [limit],
+            like_params + params + [limit],
+            ('documents', 'projects'))
+        
+        results = []
+        for row in rows:
+            document = self._document_summary_from_row(row[:9])
+            document['project_name'] = row[9]
+            document['snippet'] = row[10] if use_fts else self._plain_snippet(row[10], terms, highlight)
+            document['score'] = -row[11]
+            results.append(document)
+        return results
+    
+    def search_workflow_comments(self, query: str, project_id=None, status=None, limit: int = 20,
+                                 highlight: Tuple[str, str] = ('**', '**')) -> List[Dict[str, Any]]:
+        """Full-text search over review comments, best match first
+        
+        Args:
+            query: Words that must all appear; a trailing * matches prefixes
+            project_id: A project id or list of ids to search in
+            status: A workflow status or list of statuses to keep
+            limit: Maximum number of results
+            highlight: Markers placed around matched words in the snippet
+        
+        Returns:
+            Comment dicts plus 'workflow_name', 'workflow_status', 'project_id',
+            'document_id', 'snippet' and 'score' (higher is a better match)
+        """
+        terms = self._search_terms(query)
+        if not terms:
+            return []
+        clauses, params = self._filters({'project_id': project_id or None, 'status': status}, 'w.')
+        filters = ''.join(f' AND {clause}' for clause in clauses)
+        like_clauses, like_params = self._like_clauses(terms, ['c.comment'])
+        
+        fts_sql = f'''
+            SELECT {self.COMMENT_SEARCH_COLUMNS},
+                   snippet(workflow_comments_fts, 0, ?, ?, '…', 16), bm25(workflow_comments_fts) AS rank
+            FROM workflow_comments_fts
+            JOIN workflow_comments c ON c.id = workflow_comments_fts.rowid
+            JOIN workflows w ON w.id = c.workflow_id
+            WHERE workflow_comments_fts MATCH ?{filters}
+            ORDER BY rank LIMIT ?
+        '''
+        fallback_sql = f'''
+            SELECT {self.COMMENT_SEARCH_COLUMNS}, c.comment, 0
+            FROM workflow_comments c
+            JOIN workflows w ON w.id = c.workflow_id
+            WHERE {' AND '.join(like_clauses)}{filters}
+            ORDER BY c.created_at DESC, c.id DESC LIMIT ?
+        '''
+        use_fts, rows = self._search_rows(
+            'workflow_comments_fts', fts_sql, fallback_sql,
+            list(highlight) + [self._fts_match(terms)] + params + [limit],
+            like_params + params + [limit],
+            ('workflow_comments', 'workflows'))
+        
+        results = []
+        for row in rows:
+            comment = self._comment_from_row(row[:6])
+            comment.update({
+                'workflow_name': row[6],
+                'workflow_status': row[7],
+                'project_id': row[8],
+                'document_id': row[9],
+                'snippet': row[10] if use_fts else self._plain_snippet(row[10], terms, highlight),
+                'score': -row[11]
+            })
+            results.append(comment)
+        return results
+    
+    REQUIREMENT_SEARCH_COLUMNS = 'r.id, r.project_id, r.kind, r.position, r.text, p.name, p.type'
+    
+    def get_project_requirements(self, project_id: int) -> Dict[str, List[str]]:
+        """Requirement lists of a project from the normalized table, keyed by kind"""
+        requirements = {kind: [] for kind in REQUIREMENT_FIELDS}
+        with self.pool.transaction() as conn:
+            rows = conn.execute('''
+                SELECT kind, text FROM project_requirements WHERE project_id = ? ORDER BY kind, position
+            ''', (project_id,)).fetchall()
+        for kind, text in rows:
+            requirements.setdefault(kind, []).append(text)
+        return requirements
+    
+    def search_requirements(self, query: str, project_id=None, kind=None, limit: int = 50,
+                            highlight: Tuple[str, str] = ('**', '**'),
+                            per_project: int = None) -> List[Dict[str, Any]]:
+        """Full-text search over individual project requirements, best match first
+        
+        Args:
+            query: Words that must all appear in one requirement; a trailing * matches prefixes
+            project_id: A project id or list of ids to search in
+            kind: 'functional_reqs', 'non_functional_reqs', 'conditions' or a list of them
+            limit: Maximum number of requirements returned
+            highlight: Markers placed around matched words in the snippet
+            per_project: Maximum number of requirements returned per project
+        
+        Returns:
+            Dicts with id, project_id, kind, position, text, project_name,
+            project_type, snippet and score (higher is a better match)
+        """
+        terms = self._search_terms(query)
+        if not terms:
+            return []
+        clauses, params = self._filters({'project_id': project_id or None, 'kind': kind}, 'r.')
+        filters = ''.join(f' AND {clause}' for clause in clauses)
+        like_clauses, like_params = self._like_clauses(terms, ['r.text'])
+        
+        fts_sql = f'''
+            SELECT {self.REQUIREMENT_SEARCH_COLUMNS},
+                   snippet(project_requirements_fts, 0, ?, ?, '…', 16) AS snippet,
+                   bm25(project_requirements_fts) AS rank
+            FROM project_requirements_fts
+            JOIN project_requirements r ON r.id = project_requirements_fts.rowid
+            JOIN projects p ON p.id = r.project_id
+            WHERE project_requirements_fts MATCH ?{filters}
+        '''
+        fallback_sql = f'''
+            SELECT {self.REQUIREMENT_SEARCH_COLUMNS}, r.text AS snippet, 0 AS rank
+            FROM project_requirements r
+            JOIN projects p ON p.id = r.project_id
+            WHERE {' AND '.join(like_clauses)}{filters}
+        '''
+        fts_order, fallback_order = 'rank', 'project_id, kind, position'
+        cap_params = []
+        if per_project:
+            # Number each project's matches, best first, and keep the first per_project
+            fts_sql, fallback_sql = [f'''
+                SELECT id, project_id, kind, position, text, name, type, snippet, rank FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY project_id ORDER BY rank, kind, position)
+                        AS match_number
+                    FROM ({sql})
+                ) WHERE match_number <= ?
+            ''' for sql in (fts_sql, fallback_sql)]
+            cap_params = [per_project]
+        else:
+            fts_sql, fallback_sql = [f'SELECT * FROM ({sql})' for sql in (fts_sql, fallback_sql)]
+        use_fts, rows = self._search_rows(
+            'project_requirements_fts', f'{fts_sql} ORDER BY {fts_order} LIMIT ?',
+            f'{fallback_sql} ORDER BY {fallback_order} LIMIT ?',
+            list(highlight) + [self._fts_match(terms)] + params + cap_params + [limit],
+            like_params + params + cap_params + [limit],
+            ('project_requirements', 'projects'))
+        
+        return [{
+            'id': row[0],
+            'project_id': row[1],
+            'kind': row[2],
+            'position': row[3],
+            'text': row[4],
+            'project_name': row[5],
+            'project_type': row[6],
+            'snippet': row[7] if use_fts else self._plain_snippet(row[7], terms, highlight),
+            'score': -row[8]
+        } for row in rows]
+    
+    def find_projects_by_requirement(self, query: str, kind=None, limit: int = 20,
+                                     matches_per_project: int = 5) -> List[Dict[str, Any]]:
+        """Projects with at least one requirement matching query, best match first
+        
+        Projects are ranked in SQL from the requirements index, so no project
+        row or JSON column is decoded to answer the question.
+        
+        Returns:
+            Dicts with project_id, project_name, project_type, match_count,
+            score and 'matches' (up to matches_per_project search_requirements rows)
+        """
+        terms = self._search_terms(query)
+        if not terms:
+            return []
+        clauses, params = self._filters({'kind': kind}, 'r.')
+        filters = ''.join(f' AND {clause}' for clause in clauses)
+        like_clauses, like_params = self._like_clauses(terms, ['r.text'])
+        
+        fts_sql = f'''
+            SELECT r.project_id, p.name, p.type, COUNT(*), MIN(project_requirements_fts.rank) AS best
+            FROM project_requirements_fts
+            JOIN project_requirements r ON r.id = project_requirements_fts.rowid
+            JOIN projects p ON p.id = r.project_id
+            WHERE project_requirements_fts MATCH ?{filters}
+            GROUP BY r.project_id
+            ORDER BY best LIMIT ?
+        '''
+        fallback_sql = f'''
+            SELECT r.project_id, p.name, p.type, COUNT(*), 0 AS best
+            FROM project_requirements r
+            JOIN projects p ON p.id = r.project_id
+            WHERE {' AND '.join(like_clauses)}{filters}
+            GROUP BY r.project_id
+            ORDER BY COUNT(*) DESC, r.project_id LIMIT ?
+        '''
+        _, rows = self._search_rows(
+            'project_requirements_fts', fts_sql, fallback_sql,
+            [self._fts_match(terms)] + params + [limit],
+            like_params + params + [limit],
+            ('project_requirements', 'projects'))
+        
+        projects = [{
+            'project_id': row[0],
+            'project_name': row[1],
+            'project_type': row[2],
+            'match_count': row[3],
+            'score': -row[4],
+            'matches': []
+        } for row in rows]
+        if projects and matches_per_project:
+            by_id = {project['project_id']: project for project in projects}
+            # Capped per project in SQL, so one project's many matches cannot
+            # crowd out the others
+            for match in self.search_requirements(query, project_id=list(by_id), kind=kind,
+                                                  limit=len(by_id) * matches_per_project,
+                                                  per_project=matches_per_project):
+                by_id[match['project_id']]['matches'].append(match)
+        return projects
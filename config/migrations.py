@@ -0,0 +1,292 @@
+# Versioned schema migrations for the SQLite project database
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Union
+
+from config.blob_store import put_blob
+from config.revision_store import REVISION_TABLE_SQL
+
+SCHEMA_VERSION_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+Step = Union[str, Callable]
+
+
+@dataclass
+class Migration:
+    """One schema change; steps are SQL strings or callables taking a cursor"""
+    version: int
+    description: str
+    steps: List[Step] = field(default_factory=list)
+
+
+def add_columns(table: str, columns: Dict[str, str]) -> Callable:
+    """Step that adds columns missing from a table (no-op on fresh databases)"""
+    def step(cursor):
+        cursor.execute(f'PRAGMA table_info({table})')
+        existing = {row[1] for row in cursor.fetchall()}
+        for column, column_type in columns.items():
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+    return step
+
+
+def _move_inline_content_to_blobs(cursor):
+    """Move file text still stored inline in project_data_files into the blob store"""
+    cursor.execute('SELECT id FROM project_data_files WHERE content IS NOT NULL AND content_blob IS NULL')
+    file_ids = [row[0] for row in cursor.fetchall()]
+    for file_id in file_ids:
+        cursor.execute('SELECT content FROM project_data_files WHERE id = ?', (file_id,))
+        blob_key = put_blob(cursor, cursor.fetchone()[0])
+        cursor.execute('UPDATE project_data_files SET content = NULL, content_blob = ? WHERE id = ?',
+                       (blob_key, file_id))
+
+
+# Full-text indexes: (index, source table, indexed columns). They are
+# external-content FTS5 tables kept in sync by triggers, so every insert,
+# update and delete of the source row updates the index in the same statement.
+SEARCH_INDEXES = [
+    ('documents_fts', 'documents', ('name', 'content')),
+    ('workflow_comments_fts', 'workflow_comments', ('comment',)),
+]
+# Added with the requirements table of migration 5
+REQUIREMENT_SEARCH_INDEXES = [
+    ('project_requirements_fts', 'project_requirements', ('text',)),
+]
+# Every search index, for the startup repair of ensure_search_indexes
+ALL_SEARCH_INDEXES = SEARCH_INDEXES + REQUIREMENT_SEARCH_INDEXES
+
+
+def fts5_available(cursor) -> bool:
+    """Whether this SQLite build has the FTS5 extension"""
+    try:
+        cursor.execute('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)')
+        cursor.execute('DROP TABLE temp.fts5_probe')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def create_search_indexes(indexes) -> Callable:
+    """Step that creates FTS5 indexes and their sync triggers, then indexes existing rows"""
+    def step(cursor):
+        if not fts5_available(cursor):
+            # Searches fall back to LIKE scans on builds without FTS5; the
+            # indexes are created by ensure_search_indexes once it is available
+            return
+        for index, table, columns in indexes:
+            _create_search_index(cursor, index, table, columns)
+    return step
+
+
+def ensure_search_indexes(conn, indexes=ALL_SEARCH_INDEXES) -> List[str]:
+    """Create search indexes missing from a database migrated without FTS5
+
+    Run at startup after the migrations; does nothing while FTS5 is unavailable.
+
+    Returns:
+        Names of the indexes created
+    """
+    cursor = conn.cursor()
+    if not fts5_available(cursor):
+        return []
+    created = []
+    for index, table, columns in indexes:
+        if cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                          (index,)).fetchone():
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Another process may have created it while we waited for the lock
+            if not cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                  (index,)).fetchone():
+                _create_search_index(cursor, index, table, columns)
+                created.append(index)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return created
+
+
+def _create_search_index(cursor, index: str, table: str, columns):
+    """Create one external-content FTS5 index with its sync triggers and fill it"""
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+            {column_list}, content='{table}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {index} (rowid, {column_list}) VALUES (new.id, {new_values});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {index} ({index}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF {column_list} ON {table} BEGIN
+            INSERT INTO {index} ({index}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {index} (rowid, {column_list}) VALUES (new.id, {new_values});
+        END
+    """)
+    cursor.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+
+
+# Project columns holding JSON arrays of requirement strings; each item is also
+# stored as one row of project_requirements, with the column name as its kind
+REQUIREMENT_FIELDS = ('functional_reqs', 'non_functional_reqs', 'conditions')
+
+REQUIREMENTS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS project_requirements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        FOREIGN KEY (project_id) REFERENCES projects (id)
+    )
+'''
+
+
+# Append-only log of who did what; written through the write-behind queue
+AUDIT_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS audit_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_type TEXT NOT NULL,
+        entity_type TEXT,
+        entity_id INTEGER,
+        actor TEXT,
+        details TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def requirement_rows(project_id: int, kind: str, items) -> List[tuple]:
+    """(project_id, kind, position, text) rows for a requirement list"""
+    return [(project_id, kind, position, item if isinstance(item, str) else json.dumps(item))
+            for position, item in enumerate(items or [])]
+
+
+def _backfill_requirements(cursor):
+    """Copy the JSON requirement arrays of existing projects into project_requirements"""
+    cursor.execute(f"SELECT id, {', '.join(REQUIREMENT_FIELDS)} FROM projects")
+    for row in cursor.fetchall():
+        for kind, value in zip(REQUIREMENT_FIELDS, row[1:]):
+            try:
+                items = json.loads(value) if value else []
+            except ValueError:
+                continue
+            cursor.executemany(
+                'INSERT INTO project_requirements (project_id, kind, position, text) VALUES (?, ?, ?, ?)',
+                requirement_rows(row[0], kind, items if isinstance(items, list) else []))
+
+
+# Append new migrations at the end with the next version number; never edit
+# or reorder a migration that has been released.
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Content blob references and chunk offsets", [
+        add_columns('project_data_files', {'content_blob': 'TEXT'}),
+        add_columns('vector_embeddings', {'chunk_start': 'INTEGER', 'chunk_end': 'INTEGER'}),
+    ]),
+    Migration(2, "Move inline file text into the blob store", [
+        _move_inline_content_to_blobs,
+    ]),
+    Migration(3, "Secondary indexes for project, document and workflow lookups", [
+        'CREATE INDEX IF NOT EXISTS idx_projects_created ON projects (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_documents_created ON documents (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_documents_project_created ON documents (project_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_project_data_files_lookup '
+        'ON project_data_files (project_id, filename, content_hash)',
+        'CREATE INDEX IF NOT EXISTS idx_vector_embeddings_project '
+        'ON vector_embeddings (project_id, file_id, chunk_index)',
+        'CREATE INDEX IF NOT EXISTS idx_vector_embeddings_file ON vector_embeddings (file_id)',
+        'CREATE INDEX IF NOT EXISTS idx_workflows_created ON workflows (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_workflows_project_status ON workflows (project_id, status)',
+        'CREATE INDEX IF NOT EXISTS idx_workflow_comments_workflow ON workflow_comments (workflow_id, created_at)',
+        'ANALYZE',
+    ]),
+    Migration(4, "Full-text search indexes over document content and workflow comments", [
+        create_search_indexes(SEARCH_INDEXES),
+    ]),
+    Migration(5, "Normalized, searchable project requirements", [
+        REQUIREMENTS_TABLE_SQL,
+        'CREATE INDEX IF NOT EXISTS idx_project_requirements_project ON project_requirements (project_id, kind, position)',
+        _backfill_requirements,
+        create_search_indexes(REQUIREMENT_SEARCH_INDEXES),
+    ]),
+    Migration(6, "Delta-compressed document revision history", [
+        REVISION_TABLE_SQL,
+    ]),
+    Migration(7, "Row versions for optimistic concurrency on workflows and documents", [
+        add_columns('workflows', {'version': 'INTEGER NOT NULL DEFAULT 1'}),
+        add_columns('documents', {'version': 'INTEGER NOT NULL DEFAULT 1'}),
+    ]),
+    Migration(8, "Audit event log", [
+        AUDIT_TABLE_SQL,
+        'CREATE INDEX IF NOT EXISTS idx_audit_events_entity ON audit_events (entity_type, entity_id, id)',
+    ]),
+    Migration(9, "Source fingerprints of ingested archive members", [
+        add_columns('project_data_files', {'source_fingerprint': 'TEXT'}),
+    ]),
+]
+
+
+def get_schema_version(conn) -> int:
+    """Highest migration version applied to the database (0 if none)"""
+    conn.execute(SCHEMA_VERSION_TABLE_SQL)
+    row = conn.execute('SELECT MAX(version) FROM schema_migrations').fetchone()
+    return row[0] or 0
+
+
+def run_migrations(conn, migrations: List[Migration] = None) -> List[int]:
+    """Apply pending migrations in order, each in its own transaction
+
+    Every migration takes the write lock (BEGIN IMMEDIATE) and re-checks the
+    version first, so several processes starting at once apply it only once.
+
+    Returns:
+        Versions applied by this call
+    """
+    migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+    conn.execute(SCHEMA_VERSION_TABLE_SQL)
+    conn.commit()
+
+    applied = []
+    for migration in migrations:
+        if migration.version <= get_schema_version(conn):
+            continue
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if migration.version <= get_schema_version(conn):
+                conn.rollback()
+                continue
+            cursor = conn.cursor()
+            for step in migration.steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute('INSERT INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)',
+                           (migration.version, migration.description, datetime.now().isoformat()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(migration.version)
+    return applied
@@ -0,0 +1,90 @@
+# Process-wide read-through cache for DatabaseManager listings
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+class QueryCache:
+    """Cache of query results, invalidated by per-table write counters
+
+    Every write bumps the counter of each table it touches. A cached result
+    remembers the counters of the tables it was read from and is only served
+    while none of them has moved, so no explicit eviction is needed on write.
+    Cached values are shared between sessions and must be immutable (tuples of
+    raw rows); callers build fresh dicts from them on every read.
+    """
+
+    _caches: Dict[str, 'QueryCache'] = {}
+    _caches_lock = threading.Lock()
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'stale': 0, 'bypassed': 0, 'invalidations': 0}
+
+    @classmethod
+    def for_path(cls, db_path: str) -> 'QueryCache':
+        """Shared cache for a database file (one per file per process)"""
+        key = os.path.abspath(db_path)
+        with cls._caches_lock:
+            cache = cls._caches.get(key)
+            if cache is None:
+                cache = cls._caches[key] = cls()
+            return cache
+
+    def _snapshot(self, tables: Iterable[str]) -> tuple:
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    def invalidate(self, tables: Iterable[str]):
+        """Bump the write counter of each table"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            self._stats['invalidations'] += 1
+
+    def get_or_load(self, key: Hashable, tables: tuple, loader: Callable[[], Any]) -> Any:
+        """Return the cached result for key, or run loader and cache its result"""
+        with self._lock:
+            entry = self._entries.get(key)
+            versions = self._snapshot(tables)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[1]
+            self._stats['stale' if entry is not None else 'misses'] += 1
+
+        # Versions were taken before the read: a write that lands while the
+        # query runs bumps them, so this result is stale on the next lookup
+        value = loader()
+        with self._lock:
+            self._entries[key] = (versions, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def record_bypass(self):
+        with self._lock:
+            self._stats['bypassed'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and database round trips avoided"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['table_versions'] = dict(self._versions)
+        lookups = stats['hits'] + stats['misses'] + stats['stale']
+        stats['lookups'] = lookups
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        # Every hit is a query that did not go to SQLite
+        stats['round_trips_avoided'] = stats['hits']
+        return stats
@@ -0,0 +1,127 @@
+# Delta-compressed revision history for generated document content
+import difflib
+import json
+from typing import Dict, List, Optional, Union
+
+from config.blob_store import compress_text, decompress_text
+
+# Every SNAPSHOT_INTERVAL-th revision is stored in full, so rebuilding any
+# revision applies at most SNAPSHOT_INTERVAL - 1 deltas
+SNAPSHOT_INTERVAL = 10
+
+REVISION_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS document_revisions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        document_id INTEGER NOT NULL,
+        revision INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        compression TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        stored_size INTEGER NOT NULL,
+        data BLOB NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (document_id, revision),
+        FOREIGN KEY (document_id) REFERENCES documents (id)
+    )
+'''
+
+# A delta rebuilds an older text from the next newer one: [start, end] copies
+# those lines of the newer text, a string is inserted as is
+Delta = List[Union[List[int], str]]
+
+
+def make_delta(newer: str, older: str) -> Delta:
+    """Line-based delta that turns newer back into older"""
+    newer_lines = newer.splitlines(keepends=True)
+    older_lines = older.splitlines(keepends=True)
+    delta: Delta = []
+    matcher = difflib.SequenceMatcher(None, newer_lines, older_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif j2 > j1:
+            delta.append(''.join(older_lines[j1:j2]))
+    return delta
+
+
+def apply_delta(newer: str, delta: Delta) -> str:
+    """Inverse of make_delta: rebuild the older text from newer"""
+    newer_lines = newer.splitlines(keepends=True)
+    return ''.join(''.join(newer_lines[op[0]:op[1]]) if isinstance(op, list) else op for op in delta)
+
+
+def current_revision(cursor, document_id: int) -> int:
+    """Revision number of the content currently stored on the document (1 if never edited)"""
+    cursor.execute('SELECT MAX(revision) FROM document_revisions WHERE document_id = ?', (document_id,))
+    return (cursor.fetchone()[0] or 0) + 1
+
+
+def record_revision(cursor, document_id: int, old_content: Optional[str], new_content: Optional[str]) -> Optional[int]:
+    """Archive old_content before a document's content is replaced by new_content
+
+    The archived revision is a compressed delta against new_content, or a full
+    compressed snapshot on every SNAPSHOT_INTERVAL-th revision (and whenever
+    the delta would not be smaller).
+
+    Returns:
+        The archived revision number, or None when the content did not change
+    """
+    old_content = old_content or ''
+    new_content = new_content or ''
+    if old_content == new_content:
+        return None
+
+    revision = current_revision(cursor, document_id)
+    snapshot_compression, snapshot = compress_text(old_content)
+    kind, compression, data = 'snapshot', snapshot_compression, snapshot
+    if revision % SNAPSHOT_INTERVAL:
+        delta_compression, delta = compress_text(json.dumps(make_delta(new_content, old_content),
+                                                            separators=(',', ':')))
+        if len(delta) < len(snapshot):
+            kind, compression, data = 'delta', delta_compression, delta
+
+    cursor.execute('''
+        INSERT INTO document_revisions (document_id, revision, kind, compression, size, stored_size, data)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (document_id, revision, kind, compression, len(old_content.encode('utf-8')), len(data), data))
+    return revision
+
+
+def get_revision_text(cursor, document_id: int, revision: int, current_content: Optional[str]) -> Optional[str]:
+    """Rebuild the content of a revision; None if it does not exist
+
+    Starts from the nearest full snapshot at or after the revision (or the
+    current content) and applies the deltas back down to it.
+    """
+    latest = current_revision(cursor, document_id)
+    if revision == latest:
+        return current_content or ''
+    if revision < 1 or revision > latest:
+        return None
+
+    cursor.execute('''
+        SELECT MIN(revision) FROM document_revisions
+        WHERE document_id = ? AND revision >= ? AND kind = 'snapshot'
+    ''', (document_id, revision))
+    snapshot = cursor.fetchone()[0]
+    cursor.execute(f'''
+        SELECT revision, kind, compression, data FROM document_revisions
+        WHERE document_id = ? AND revision >= ?{' AND revision <= ?' if snapshot else ''}
+        ORDER BY revision DESC
+    ''', (document_id, revision, snapshot) if snapshot else (document_id, revision))
+
+    text = current_content or ''
+    for _, kind, compression, data in cursor.fetchall():
+        stored = decompress_text(compression, data)
+        text = stored if kind == 'snapshot' else apply_delta(text, json.loads(stored))
+    return text
+
+
+def list_revisions(cursor, document_id: int) -> List[Dict]:
+    """Archived revisions of a document, newest first (without their data)"""
+    cursor.execute('''
+        SELECT revision, kind, size, stored_size, created_at FROM document_revisions
+        WHERE document_id = ? ORDER BY revision DESC
+    ''', (document_id,))
+    return [{'revision': row[0], 'kind': row[1], 'size': row[2], 'stored_size': row[3], 'created_at': row[4]}
+            for row in cursor.fetchall()]
@@ -0,0 +1,135 @@
+# Compact, dict-compatible row types returned by DatabaseManager reads
+import json
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Tuple
+
+
+class Row(MutableMapping):
+    """Slotted database row that behaves like the dict it replaces
+
+    Subclasses list their columns in FIELDS (also their __slots__) and the
+    columns holding JSON arrays in JSON_FIELDS. Those keep the raw text until
+    first read, so listings that only show names never run json.loads. Keys
+    that are not columns (joined data, search snippets) go to a small overflow
+    dict created on demand. Deleted columns are simply unset slots.
+    """
+
+    __slots__ = ('_lazy', '_extra')
+    FIELDS: Tuple[str, ...] = ()
+    JSON_FIELDS: Tuple[str, ...] = ()
+    _FIELD_SET = frozenset()
+    _JSON_BITS: Dict[str, int] = {}
+    _ALL_JSON = 0
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+        cls._JSON_BITS = {name: 1 << cls.FIELDS.index(name) for name in cls.JSON_FIELDS}
+        cls._ALL_JSON = sum(cls._JSON_BITS.values())
+
+    def __init__(self, values=()):
+        """values are the column values in FIELDS order, JSON columns as raw text"""
+        for name, value in zip(self.FIELDS, values):
+            object.__setattr__(self, name, value)
+        self._lazy = self._ALL_JSON
+        self._extra = None
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._FIELD_SET:
+            try:
+                value = object.__getattribute__(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            if self._lazy:
+                bit = self._JSON_BITS.get(key, 0)
+                if self._lazy & bit:
+                    value = json.loads(value) if value else []
+                    object.__setattr__(self, key, value)
+                    self._lazy &= ~bit
+            return value
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key in self._FIELD_SET:
+            object.__setattr__(self, key, value)
+            self._lazy &= ~self._JSON_BITS.get(key, 0)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in self._FIELD_SET:
+            try:
+                object.__delattr__(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for name in self.FIELDS:
+            if hasattr(self, name):
+                yield name
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, key) -> bool:
+        if key in self._FIELD_SET:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict copy (decodes any JSON column not read yet)"""
+        return {key: self[key] for key in self}
+
+    copy = to_dict
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self._lazy = 0
+        self._extra = None
+        for key, value in state.items():
+            self[key] = value
+
+
+class Project(Row):
+    FIELDS = ('id', 'name', 'type', 'description', 'functional_reqs', 'non_functional_reqs',
+              'conditions', 'recommended_docs', 'created_at', 'updated_at')
+    JSON_FIELDS = ('functional_reqs', 'non_functional_reqs', 'conditions', 'recommended_docs')
+    __slots__ = FIELDS
+
+
+class Document(Row):
+    FIELDS = ('id', 'project_id', 'name', 'type', 'content', 'status', 'created_at', 'updated_at', 'version')
+    __slots__ = FIELDS
+
+
+class Workflow(Row):
+    FIELDS = ('id', 'project_id', 'document_id', 'name', 'status', 'approvers', 'current_step',
+              'created_at', 'updated_at', 'version')
+    JSON_FIELDS = ('approvers',)
+    __slots__ = FIELDS
+
+
+class WorkflowDetail(Workflow):
+    """Workflow with its joined 'document' and 'project' summaries"""
+    FIELDS = Workflow.FIELDS + ('document', 'project')
+    __slots__ = ('document', 'project')
+
+
+class Comment(Row):
+    FIELDS = ('id', 'workflow_id', 'approver', 'action', 'comment', 'created_at')
+    __slots__ = FIELDS
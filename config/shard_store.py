@@ -0,0 +1,192 @@
+# Per-project SQLite shards for uploaded project files and their embeddings
+import glob
+import logging
+import os
+import re
+import sqlite3
+from typing import Dict, List, Optional
+
+from config.blob_store import BLOB_TABLE_SQL
+
+logger = logging.getLogger(__name__)
+
+# File ids in a shard start at project_id << FILE_ID_SHIFT, so the project
+# (and with it the shard) of any file id is known without a catalog lookup.
+# Ids below 1 << FILE_ID_SHIFT belong to files kept in the catalog database.
+FILE_ID_SHIFT = 32
+
+SHARD_FILE_PATTERN = 'project_{}.db'
+
+DATA_FILE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS project_data_files (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project_id INTEGER,
+        filename TEXT NOT NULL,
+        file_path TEXT,
+        file_type TEXT,
+        file_size INTEGER,
+        content TEXT,
+        content_hash TEXT,
+        content_blob TEXT,
+        is_template BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        source_fingerprint TEXT,
+        FOREIGN KEY (project_id) REFERENCES projects (id)
+    )
+'''
+
+EMBEDDING_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS vector_embeddings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project_id INTEGER,
+        file_id INTEGER,
+        chunk_index INTEGER,
+        chunk_text TEXT,
+        chunk_start INTEGER,
+        chunk_end INTEGER,
+        embedding_vector TEXT,
+        metadata TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (project_id) REFERENCES projects (id),
+        FOREIGN KEY (file_id) REFERENCES project_data_files (id)
+    )
+'''
+
+# Same lookups as the catalog indexes of migration 3
+SHARD_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_project_data_files_lookup '
+    'ON project_data_files (project_id, filename, content_hash)',
+    'CREATE INDEX IF NOT EXISTS idx_vector_embeddings_project '
+    'ON vector_embeddings (project_id, file_id, chunk_index)',
+    'CREATE INDEX IF NOT EXISTS idx_vector_embeddings_file ON vector_embeddings (file_id)',
+]
+
+DATA_FILE_FIELDS = ('project_id, filename, file_path, file_type, file_size, content, content_hash, '
+                    'content_blob, is_template, created_at, source_fingerprint')
+EMBEDDING_FIELDS = ('project_id, chunk_index, chunk_text, chunk_start, chunk_end, embedding_vector, '
+                    'metadata, created_at')
+
+# Columns added to shard tables after shards were introduced
+SHARD_COLUMNS = {'project_data_files': {'source_fingerprint': 'TEXT'}}
+
+
+def shard_schema(project_id: int) -> str:
+    """Name a project's shard is attached under"""
+    return f"shard_{int(project_id)}"
+
+
+def shard_path(shard_dir: str, project_id: int) -> str:
+    return os.path.join(shard_dir, SHARD_FILE_PATTERN.format(int(project_id)))
+
+
+def file_project(file_id: int) -> Optional[int]:
+    """Project whose shard holds file_id, or None for catalog files"""
+    return (int(file_id) >> FILE_ID_SHIFT) or None
+
+
+def upgrade_shard(conn, schema: str):
+    """Add SHARD_COLUMNS missing from a shard created by an older version"""
+    for table, columns in SHARD_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f'PRAGMA {schema}.table_info({table})').fetchall()}
+        for column, column_type in columns.items():
+            if column not in existing:
+                conn.execute(f'ALTER TABLE {schema}.{table} ADD COLUMN {column} {column_type}')
+
+
+def list_shards(shard_dir: str) -> Dict[int, str]:
+    """{project_id: path} of the shards in shard_dir"""
+    shards = {}
+    for path in glob.glob(os.path.join(shard_dir, SHARD_FILE_PATTERN.format('*'))):
+        match = re.fullmatch(SHARD_FILE_PATTERN.format(r'(\d+)'), os.path.basename(path))
+        if match:
+            shards[int(match.group(1))] = path
+    return shards
+
+
+def build_shard(path: str, project_id: int, catalog_path: str = None,
+                journal_mode: Optional[str] = 'WAL') -> Dict[str, int]:
+    """Create the shard file of a project, optionally moving in its catalog rows
+
+    The shard is built under a temporary name and renamed into place, so a
+    shard that exists is always complete. Copied files keep their id plus the
+    project's id offset; the caller deletes the originals from the catalog.
+    Rows are read through a connection of their own, so they are the last
+    committed state of the catalog.
+
+    Args:
+        journal_mode: Set on the new file, which keeps it; it cannot be set
+            later by a connection that attaches the shard inside a transaction
+
+    Returns:
+        Rows copied per table
+    """
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    offset = int(project_id) << FILE_ID_SHIFT
+    copied = {'project_data_files': 0, 'vector_embeddings': 0, 'content_blobs': 0}
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        cursor = conn.cursor()
+        if journal_mode:
+            cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+        for sql in [DATA_FILE_TABLE_SQL, EMBEDDING_TABLE_SQL, BLOB_TABLE_SQL] + SHARD_INDEXES:
+            cursor.execute(sql)
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('project_data_files', ?)", (offset,))
+
+        if catalog_path:
+            conn.commit()
+            cursor.execute('ATTACH DATABASE ? AS catalog', (catalog_path,))
+            cursor.execute(f'''
+                INSERT INTO project_data_files (id, {DATA_FILE_FIELDS})
+                SELECT id + ?, {DATA_FILE_FIELDS} FROM catalog.project_data_files WHERE project_id = ?
+            ''', (offset, project_id))
+            copied['project_data_files'] = cursor.rowcount
+            cursor.execute(f'''
+                INSERT INTO vector_embeddings (file_id, {EMBEDDING_FIELDS})
+                SELECT file_id + ?, {EMBEDDING_FIELDS} FROM catalog.vector_embeddings
+                WHERE project_id = ? AND file_id IN (SELECT id FROM catalog.project_data_files WHERE project_id = ?)
+                ORDER BY id
+            ''', (offset, project_id, project_id))
+            copied['vector_embeddings'] = cursor.rowcount
+            # Each blob is referenced once per shard file using it
+            cursor.execute('''
+                INSERT INTO content_blobs (hash, compression, size, stored_size, data, ref_count, created_at)
+                SELECT b.hash, b.compression, b.size, b.stored_size, b.data,
+                       (SELECT COUNT(*) FROM project_data_files f WHERE f.content_blob = b.hash), b.created_at
+                FROM catalog.content_blobs b
+                WHERE b.hash IN (SELECT content_blob FROM project_data_files)
+            ''')
+            copied['content_blobs'] = cursor.rowcount
+            conn.commit()
+            cursor.execute('DETACH DATABASE catalog')
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return copied
+
+
+def remove_shard(path: str) -> bool:
+    """Delete a shard file and its WAL files; False if it is still open elsewhere (Windows)"""
+    removed = True
+    for name in (path, path + '-wal', path + '-shm'):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+        except OSError as error:
+            logger.warning("Could not remove shard file %s: %s", name, error)
+            removed = False
+    return removed
+
+
+def shard_sizes(paths: List[str]) -> int:
+    """Bytes on disk used by shard files, including their WAL"""
+    total = 0
+    for path in paths:
+        for name in (path, path + '-wal'):
+            if os.path.exists(name):
+                total += os.path.getsize(name)
+    return total
@@ -0,0 +1,269 @@
+# Asynchronous write-behind queue that group-commits small inserts
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config.connection_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# A batch is committed when it holds MAX_BATCH_ROWS rows or its oldest write
+# has waited MAX_DELAY_SECONDS, whichever comes first
+MAX_BATCH_ROWS = 256
+MAX_DELAY_SECONDS = 0.005
+# Writers block (back-pressure) once this many writes are waiting. Keeping the
+# backlog to two batches bounds how long an accepted write waits for its
+# commit; a deep queue only adds latency, not throughput.
+MAX_PENDING_WRITES = 2 * MAX_BATCH_ROWS
+# Failed writes remembered for flush() and check()
+MAX_RECORDED_FAILURES = 1000
+
+
+class QueuedWriteError(Exception):
+    """A write handed to the write-behind queue could not be committed"""
+
+
+class _AcceptedQueue(queue.Queue):
+    """Queue that stamps each write with the time it was accepted, after any back-pressure wait"""
+
+    def _put(self, item):
+        super()._put(item if item is None else (item[0], time.perf_counter()) + item[1:])
+
+
+class WriteQueue:
+    """Process-wide write-behind queue for one database file
+
+    Callers enqueue (sql, rows) writes and return immediately. A single
+    background thread drains the queue and commits everything that arrived
+    within a few milliseconds in one transaction, so a burst of comments or
+    status changes costs one commit instead of one per write. Writes with the
+    same SQL are merged into one executemany call.
+
+    Under sustained load callers block once max_pending writes are waiting,
+    so an accepted write is committed within about
+    max_pending / max_batch_rows + 1 commits (15-35 ms in
+    tests/benchmark_write_queue.py) instead of behind an ever-growing backlog.
+
+    flush() is the durability barrier: it returns once every write enqueued
+    before the call has been committed or has failed, and reports failures.
+    """
+
+    _queues: Dict[str, 'WriteQueue'] = {}
+    _queues_lock = threading.Lock()
+
+    def __init__(self, pool: ConnectionPool, on_commit: Callable[[Iterable[str]], None] = None,
+                 max_batch_rows: int = MAX_BATCH_ROWS, max_delay: float = MAX_DELAY_SECONDS,
+                 max_pending: int = MAX_PENDING_WRITES):
+        self.pool = pool
+        self.on_commit = on_commit
+        self.max_batch_rows = max(1, max_batch_rows)
+        self.max_delay = max(0.0, max_delay)
+        self._queue: 'queue.Queue' = _AcceptedQueue(maxsize=max(1, max_pending))
+        self._cond = threading.Condition()
+        self._enqueued = 0          # sequence number of the last enqueued write
+        self._done = 0              # every write up to this sequence number is committed (or failed)
+        self._finished = set()      # finished sequence numbers above _done (writes can commit out of order)
+        self._failures: Dict[int, str] = {}  # sequence number -> error of failed writes, oldest first
+        self._pending_tables: Dict[str, int] = {}
+        self._stats = {'writes': 0, 'rows': 0, 'batches': 0, 'failed_writes': 0, 'max_batch_rows': 0,
+                       'max_latency_ms': 0.0, 'total_latency_ms': 0.0, 'blocked_enqueues': 0}
+        self.last_error: Optional[str] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"write-queue:{os.path.basename(pool.db_path)}",
+                                        daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def for_pool(cls, pool: ConnectionPool, on_commit: Callable[[Iterable[str]], None] = None) -> 'WriteQueue':
+        """Shared queue for a database file (one writer thread per file per process)"""
+        key = os.path.abspath(pool.db_path)
+        with cls._queues_lock:
+            write_queue = cls._queues.get(key)
+            if write_queue is None or write_queue._closed:
+                write_queue = cls._queues[key] = cls(pool, on_commit)
+                atexit.register(write_queue.close)
+            return write_queue
+
+    def enqueue(self, sql: str, rows: Sequence[Sequence[Any]], tables: Tuple[str, ...]) -> int:
+        """Queue rows for sql (executed with executemany); returns the write's sequence number"""
+        if self._closed:
+            raise RuntimeError("Write queue is closed")
+        rows = [tuple(row) for row in rows]
+        with self._cond:
+            self._enqueued += 1
+            seq = self._enqueued
+            for table in tables:
+                self._pending_tables[table] = self._pending_tables.get(table, 0) + 1
+        # Blocks when the queue is full, so producers cannot outrun the writer;
+        # the write is timestamped once it is accepted
+        item = (seq, sql, rows, tables)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._cond:
+                self._stats['blocked_enqueues'] += 1
+            self._queue.put(item)
+        return seq
+
+    def has_pending(self, tables: Iterable[str] = None) -> bool:
+        """Whether writes to any of tables (any table if None) are not committed yet"""
+        with self._cond:
+            if tables is None:
+                return self._done < self._enqueued
+            return any(self._pending_tables.get(table) for table in tables)
+
+    def flush(self, timeout: float = None, seqs: Iterable[int] = None) -> bool:
+        """Wait until every write enqueued so far is committed
+
+        Args:
+            timeout: Seconds to wait at most
+            seqs: Writes whose failure counts (default: every write)
+
+        Returns:
+            False if the timeout expired first or any of those writes failed
+        """
+        with self._cond:
+            target = self._enqueued
+            if not self._cond.wait_for(lambda: self._done >= target, timeout):
+                return False
+            if seqs is None:
+                return not self._failures
+            return not any(seq in self._failures for seq in seqs)
+
+    def check(self, seqs: Iterable[int]) -> Tuple[Dict[int, str], List[int]]:
+        """Outcome of some writes without waiting
+
+        Returns:
+            ({seq: error} of those that failed, seqs of those not finished yet)
+        """
+        with self._cond:
+            failed = {seq: self._failures[seq] for seq in seqs if seq in self._failures}
+            pending = [seq for seq in seqs if seq > self._done and seq not in self._finished]
+        return failed, pending
+
+    def close(self, timeout: float = 5.0):
+        """Flush outstanding writes and stop the writer thread"""
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _collect(self) -> List[tuple]:
+        """Block for the first write, then gather more until the batch is full or due"""
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch, rows = [first], len(first[3])
+        deadline = first[1] + self.max_delay
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Closing: commit what we have, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+            rows += len(item[3])
+        return batch
+
+    def _execute(self, cursor, batch: List[tuple]):
+        # Merge writes that share a statement into one executemany. A write
+        # joins an earlier group only if no group after it touches its tables,
+        # so writes to the same table keep their order.
+        groups: List[Tuple[str, set, list]] = []
+        for _, _, sql, rows, tables in batch:
+            for sql_, tables_, rows_ in reversed(groups):
+                if sql_ == sql:
+                    rows_.extend(rows)
+                    tables_.update(tables)
+                    break
+                if tables_.intersection(tables):
+                    groups.append((sql, set(tables), list(rows)))
+                    break
+            else:
+                groups.append((sql, set(tables), list(rows)))
+        for sql, _, rows in groups:
+            cursor.executemany(sql, rows)
+
+    def _commit(self, batch: List[tuple]) -> Dict[int, str]:
+        """Commit a batch in one transaction; on error retry writes one by one
+
+        Returns:
+            {seq: error} of the writes that failed
+        """
+        try:
+            with self.pool.transaction() as conn:
+                self._execute(conn.cursor(), batch)
+            return {}
+        except Exception as error:
+            logger.warning("Group commit of %d writes failed, retrying individually: %s", len(batch), error)
+        failed = {}
+        for item in batch:
+            try:
+                with self.pool.transaction() as conn:
+                    self._execute(conn.cursor(), [item])
+            except Exception as error:
+                failed[item[0]] = self.last_error = f"{type(error).__name__}: {error}"
+                logger.error("Queued write dropped: %s", self.last_error)
+        return failed
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                self.pool.close_thread_connection()
+                return
+            failed = self._commit(batch)
+            committed_at = time.perf_counter()
+
+            tables = {table for item in batch for table in item[4]}
+            if self.on_commit and tables:
+                try:
+                    self.on_commit(tables)
+                except Exception:
+                    logger.exception("Write queue commit callback failed")
+
+            latencies = [(committed_at - item[1]) * 1000 for item in batch]
+            with self._cond:
+                self._failures.update(failed)
+                while len(self._failures) > MAX_RECORDED_FAILURES:
+                    del self._failures[next(iter(self._failures))]
+                self._finished.update(item[0] for item in batch)
+                while self._done + 1 in self._finished:
+                    self._done += 1
+                    self._finished.discard(self._done)
+                for item in batch:
+                    for table in item[4]:
+                        self._pending_tables[table] -= 1
+                        if not self._pending_tables[table]:
+                            del self._pending_tables[table]
+                rows = sum(len(item[3]) for item in batch)
+                self._stats['writes'] += len(batch)
+                self._stats['rows'] += rows
+                self._stats['batches'] += 1
+                self._stats['failed_writes'] += len(failed)
+                self._stats['max_batch_rows'] = max(self._stats['max_batch_rows'], rows)
+                self._stats['max_latency_ms'] = max(self._stats['max_latency_ms'], max(latencies))
+                self._stats['total_latency_ms'] += sum(latencies)
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching and latency statistics"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['pending'] = self._enqueued - self._done
+        total_latency = stats.pop('total_latency_ms')
+        stats['avg_latency_ms'] = round(total_latency / stats['writes'], 3) if stats['writes'] else 0.0
+        stats['max_latency_ms'] = round(stats['max_latency_ms'], 3)
+        stats['avg_batch_writes'] = round(stats['writes'] / stats['batches'], 2) if stats['batches'] else 0.0
+        stats['last_error'] = self.last_error
+        return stats
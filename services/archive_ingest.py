@@ -0,0 +1,169 @@
+"""
+Streaming ingestion of zip and tar archives
+Members are read one at a time straight from the archive, never unpacked to disk
+"""
+
+import io
+import posixpath
+import tarfile
+import zipfile
+from dataclasses import dataclass
+from typing import Callable, Collection, Iterator, Optional
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+MAX_MEMBER_SIZE = 200 * 1024 * 1024
+MAX_ARCHIVE_DEPTH = 2  # Archives nested deeper than this are reported, not opened
+BINARY_SNIFF_BYTES = 8192
+
+
+@dataclass
+class ArchiveMember:
+    """A file inside an archive, with its content or the reason it was skipped"""
+    name: str  # Path of the member inside the archive
+    size: int
+    data: Optional[bytes] = None
+    error: str = ""
+    fingerprint: str = ""  # Size plus CRC (zip) or mtime (tar), known before reading
+    unchanged: bool = False  # Skipped without reading because its fingerprint matched
+
+
+def is_archive(filename: str) -> bool:
+    """Check whether a filename is an archive we can stream"""
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _is_hidden(member_name: str) -> bool:
+    parts = member_name.replace('\\', '/').split('/')
+    return any(part.startswith('.') or part == '__MACOSX' for part in parts if part)
+
+
+def _safe_member_name(member_name: str) -> Optional[str]:
+    """Member name relative to the archive root, or None if it points outside it"""
+    name = posixpath.normpath(member_name.replace('\\', '/').lstrip('/'))
+    if name == '..' or name.startswith('../'):
+        return None
+    return name
+
+
+def looks_binary(data: bytes) -> bool:
+    """Check whether content is binary rather than text, from its first bytes"""
+    return b'\0' in data[:BINARY_SNIFF_BYTES]
+
+
+def _read_capped(stream, name: str, size: int, max_member_size: int) -> ArchiveMember:
+    # The declared size can lie (zip bombs), so cap the actual read as well
+    data = stream.read(max_member_size + 1)
+    if len(data) > max_member_size:
+        return ArchiveMember(name, size, error=f"Archive member larger than {max_member_size // (1024 * 1024)}MB")
+    return ArchiveMember(name, len(data), data=data)
+
+
+def _iter_raw_members(archive, max_member_size: int,
+                      skip: Optional[Callable[[str, str], bool]]) -> Iterator[ArchiveMember]:
+    """Members of one archive level, unchanged ones yielded without their data"""
+    if zipfile.is_zipfile(archive):
+        if hasattr(archive, 'seek'):
+            archive.seek(0)
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                name = _safe_member_name(info.filename)
+                if name is None:
+                    yield ArchiveMember(info.filename, info.file_size, error="Unsafe path in archive")
+                    continue
+                if _is_hidden(name):
+                    continue
+                fingerprint = f"zip:{info.file_size}:{info.CRC:08x}"
+                if skip and skip(name, fingerprint):
+                    yield ArchiveMember(name, info.file_size, fingerprint=fingerprint, unchanged=True)
+                    continue
+                if info.file_size > max_member_size:
+                    yield ArchiveMember(name, info.file_size,
+                                        error=f"Archive member larger than {max_member_size // (1024 * 1024)}MB")
+                    continue
+                with zf.open(info) as stream:
+                    member = _read_capped(stream, name, info.file_size, max_member_size)
+                member.fingerprint = fingerprint
+                yield member
+        return
+
+    if hasattr(archive, 'seek'):
+        archive.seek(0)
+    # 'r|*' reads the tar as a forward-only stream with transparent decompression
+    if isinstance(archive, str) or hasattr(archive, '__fspath__'):
+        tf = tarfile.open(archive, mode='r|*')
+    else:
+        tf = tarfile.open(fileobj=archive, mode='r|*')
+    with tf:
+        for member in tf:
+            if not member.isfile():
+                continue
+            name = _safe_member_name(member.name)
+            if name is None:
+                yield ArchiveMember(member.name, member.size, error="Unsafe path in archive")
+                continue
+            if _is_hidden(name):
+                continue
+            # Tar headers carry no checksum of the content, so mtime stands in for it
+            fingerprint = f"tar:{member.size}:{int(member.mtime)}"
+            if skip and skip(name, fingerprint):
+                yield ArchiveMember(name, member.size, fingerprint=fingerprint, unchanged=True)
+                continue
+            if member.size > max_member_size:
+                yield ArchiveMember(name, member.size,
+                                    error=f"Archive member larger than {max_member_size // (1024 * 1024)}MB")
+                continue
+            stream = tf.extractfile(member)
+            read = _read_capped(stream, name, member.size, max_member_size)
+            read.fingerprint = fingerprint
+            yield read
+
+
+def iter_archive_members(archive, max_member_size: int = MAX_MEMBER_SIZE,
+                         skip: Optional[Callable[[str, str], bool]] = None,
+                         extensions: Optional[Collection[str]] = None,
+                         max_depth: int = MAX_ARCHIVE_DEPTH) -> Iterator[ArchiveMember]:
+    """Stream the regular, non-hidden files of a zip or tar archive
+
+    Archives inside the archive are streamed in turn, their members named
+    "<inner archive>/<member>", up to max_depth levels of nesting. Member
+    names are normalized relative to the archive root; members whose path
+    leads outside it ("../") are yielded with an error.
+
+    Args:
+        archive: Path or binary file object of the archive
+        max_member_size: Members above this size are yielded with an error instead of data
+        skip: Called with (name, fingerprint) before a member is read; members
+            it returns True for are yielded as unchanged, without data
+        extensions: Extensions (without dot) the caller can extract; members
+            with another extension are yielded with an error if they are binary
+        max_depth: Levels of nested archives to open
+
+    Yields:
+        ArchiveMember for each file, in archive order
+    """
+    for member in _iter_raw_members(archive, max_member_size, skip):
+        if member.data is None:
+            yield member
+        elif is_archive(member.name):
+            if max_depth <= 1:
+                yield ArchiveMember(member.name, member.size, error="Archive nested too deeply",
+                                    fingerprint=member.fingerprint)
+                continue
+            prefix = member.name + '/'
+            inner_skip = (lambda name, fingerprint: skip(prefix + name, fingerprint)) if skip else None
+            try:
+                for inner in iter_archive_members(io.BytesIO(member.data), max_member_size, inner_skip,
+                                                  extensions, max_depth - 1):
+                    inner.name = prefix + inner.name
+                    yield inner
+            except (zipfile.BadZipFile, tarfile.TarError) as e:
+                yield ArchiveMember(member.name, member.size, error=f"Could not read archive: {str(e)}",
+                                    fingerprint=member.fingerprint)
+        elif (extensions is not None and member.name.lower().rsplit('.', 1)[-1] not in extensions
+              and looks_binary(member.data)):
+            yield ArchiveMember(member.name, member.size, error="Unsupported binary file",
+                                fingerprint=member.fingerprint)
+        else:
+            yield member
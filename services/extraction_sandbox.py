@@ -0,0 +1,268 @@
+"""
+Sandboxed file extraction
+Runs extractors in a supervised pool of worker processes with per-file
+wall-clock and memory (RSS) limits, so a pathological PDF or PPTX cannot
+stall or exhaust the Streamlit worker
+"""
+
+import io
+import multiprocessing
+import os
+import signal
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+try:
+    import resource
+    HAS_RLIMIT = True
+except ImportError:  # Windows
+    HAS_RLIMIT = False
+
+
+@dataclass
+class SandboxLimits:
+    """Resource limits applied to every extraction
+
+    max_rss_mb is enforced by polling the worker's process tree;
+    max_address_space_mb is a hard RLIMIT_AS cap set in every worker (POSIX
+    only), which stops allocation spikes the poll would be too slow to see.
+    pdf_workers is passed on to the page-parallel PDF extractor.
+    """
+    timeout_seconds: float = 120.0
+    max_rss_mb: int = 1024
+    max_address_space_mb: Optional[int] = 4096
+    max_files_per_worker: int = 20
+    poll_interval: float = 0.1
+    pdf_workers: Optional[int] = None
+
+
+@dataclass
+class SandboxResult:
+    """Outcome of one sandboxed extraction"""
+    success: bool
+    value: Any = None
+    error: str = ""
+    reason: str = ""  # "", "error", "timeout", "memory" or "crash"
+    elapsed: float = 0.0
+
+
+MEMORY_ERROR = "MemoryError: extraction hit the worker's address space limit"
+
+
+def _worker_main(conn, chunk_size: int, limits: SandboxLimits):
+    """Worker loop: receive (source, filename) jobs until told to stop"""
+    if hasattr(os, 'setsid'):
+        # Own process group, so a kill also reaches the PDF page workers
+        os.setsid()
+    if HAS_RLIMIT and limits.max_address_space_mb:
+        cap = limits.max_address_space_mb * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (cap, cap))
+        except (ValueError, OSError):
+            pass
+
+    # Imported here so the parent never needs the extractor libraries loaded
+    from services.extractors import extract_content
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        source, filename = job
+        if isinstance(source, bytes):
+            # Archive members arrive as raw bytes and are never written to disk
+            source = io.BytesIO(source)
+        try:
+            conn.send((True, extract_content(source, filename, chunk_size, pdf_workers=limits.pdf_workers)))
+        except MemoryError:
+            conn.send((False, MEMORY_ERROR))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process and its children in MB, or None if it cannot be measured"""
+    if HAS_PSUTIL:
+        try:
+            process = psutil.Process(pid)
+            rss = process.memory_info().rss
+            for child in process.children(recursive=True):
+                try:
+                    rss += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return rss / (1024 * 1024)
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Worker:
+    """A single extraction process and the job it is currently running"""
+
+    def __init__(self, context, chunk_size: int, limits: SandboxLimits):
+        self.conn, child_conn = context.Pipe()
+        # Not daemonic, so the worker may start PDF page worker processes;
+        # the sandbox retires or kills every worker it starts
+        self.process = context.Process(target=_worker_main, args=(child_conn, chunk_size, limits))
+        self.process.start()
+        child_conn.close()
+        self.files_done = 0
+        self.job: Optional[Tuple[Any, str, str]] = None
+        self.started_at = 0.0
+
+    def submit(self, job: Tuple[Any, str, str]):
+        self.job = job
+        self.started_at = time.monotonic()
+        self.conn.send((job[1], job[2]))
+
+    def retire(self):
+        """Ask the worker to exit after its current job"""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        """Kill the worker together with any PDF page workers it started"""
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        elif HAS_PSUTIL:
+            try:
+                for child in psutil.Process(self.process.pid).children(recursive=True):
+                    child.kill()
+            except psutil.Error:
+                pass
+        self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class ExtractionSandbox:
+    """Supervised pool of extraction worker processes
+
+    Workers are started with the 'spawn' method so their memory footprint
+    is not inflated by the parent's embedding model, and are recycled after
+    ``max_files_per_worker`` files to cap memory growth.
+    """
+
+    def __init__(self, max_workers: int = 2, limits: Optional[SandboxLimits] = None,
+                 chunk_size: int = 1000):
+        self.max_workers = max(1, max_workers)
+        self.limits = limits or SandboxLimits()
+        self.chunk_size = chunk_size
+        self._context = multiprocessing.get_context("spawn")
+        self.stats = {"completed": 0, "failed": 0, "killed": 0, "workers_started": 0}
+
+    def _start_worker(self) -> _Worker:
+        self.stats["workers_started"] += 1
+        return _Worker(self._context, self.chunk_size, self.limits)
+
+    def run(self, jobs: Iterable[Tuple[Any, str, str]]) -> Iterator[Tuple[Any, SandboxResult]]:
+        """Extract files in the sandbox
+
+        Args:
+            jobs: Iterable of (key, source, filename) tuples, where source is a
+                file path or the raw bytes of the file. Jobs are pulled lazily,
+                so at most max_workers sources are held at a time.
+
+        Yields:
+            (key, SandboxResult) in completion order
+        """
+        pending = iter(jobs)
+        exhausted = False
+        idle: List[_Worker] = []
+        busy: List[_Worker] = []
+
+        try:
+            while not exhausted or busy:
+                # Hand out work
+                while not exhausted and len(busy) < self.max_workers:
+                    job = next(pending, None)
+                    if job is None:
+                        exhausted = True
+                        break
+                    worker = idle.pop() if idle else self._start_worker()
+                    worker.submit(job)
+                    busy.append(worker)
+
+                if not busy:
+                    continue
+
+                ready = wait([worker.conn for worker in busy], timeout=self.limits.poll_interval)
+
+                for worker in list(busy):
+                    key = worker.job[0]
+                    elapsed = time.monotonic() - worker.started_at
+                    result = None
+
+                    if worker.conn in ready:
+                        try:
+                            ok, payload = worker.conn.recv()
+                            if ok:
+                                result = SandboxResult(True, value=payload, elapsed=elapsed)
+                            else:
+                                reason = "memory" if payload == MEMORY_ERROR else "error"
+                                result = SandboxResult(False, error=payload, reason=reason, elapsed=elapsed)
+                        except (EOFError, OSError):
+                            result = SandboxResult(
+                                False, reason="crash", elapsed=elapsed,
+                                error=f"Extraction worker crashed (exit code {worker.process.exitcode})")
+                            worker.kill()
+                    elif elapsed > self.limits.timeout_seconds:
+                        worker.kill()
+                        self.stats["killed"] += 1
+                        result = SandboxResult(
+                            False, reason="timeout", elapsed=elapsed,
+                            error=f"Extraction timed out after {self.limits.timeout_seconds:.0f}s")
+                    else:
+                        rss = _rss_mb(worker.process.pid)
+                        if rss is not None and rss > self.limits.max_rss_mb:
+                            worker.kill()
+                            self.stats["killed"] += 1
+                            result = SandboxResult(
+                                False, reason="memory", elapsed=elapsed,
+                                error=f"Extraction exceeded memory limit ({rss:.0f} MB > {self.limits.max_rss_mb} MB)")
+
+                    if result is None:
+                        continue
+
+                    busy.remove(worker)
+                    worker.job = None
+                    self.stats["completed" if result.success else "failed"] += 1
+                    if worker.process.is_alive():
+                        worker.files_done += 1
+                        if worker.files_done >= self.limits.max_files_per_worker:
+                            worker.retire()
+                        else:
+                            idle.append(worker)
+                    yield key, result
+        finally:
+            for worker in busy:
+                worker.kill()
+            for worker in idle:
+                worker.retire()
@@ -0,0 +1,109 @@
+"""
+File content extractors used by the RAG pipeline
+Kept free of embedding-model imports so they can run in sandboxed worker processes
+"""
+
+import json
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from services.spreadsheet_extractor import (SPREADSHEET_EXTENSIONS, RowWindow, is_spreadsheet,
+                                            iter_spreadsheet_windows)
+from services.pdf_extractor import extract_pdf_pages, render_pages
+
+# Extensions with a dedicated extractor; anything else is decoded as text
+SUPPORTED_EXTENSIONS = {'pdf', 'docx', 'pptx', 'txt', 'md', 'json'} | SPREADSHEET_EXTENSIONS
+
+
+@dataclass
+class ExtractedContent:
+    """Text extracted from a file plus the structure needed to chunk it"""
+    content: str
+    windows: Optional[List[RowWindow]] = None  # Spreadsheets: header-prefixed row windows
+    page_offsets: Optional[List[Tuple[int, int]]] = None  # PDFs: (char offset, page number)
+
+
+@contextmanager
+def _open_source(file_obj):
+    """Yield a binary file object for either a path or an already open file"""
+    if isinstance(file_obj, str) or hasattr(file_obj, '__fspath__'):
+        with open(file_obj, 'rb') as opened:
+            yield opened
+    else:
+        yield file_obj
+
+
+def extract_text(file_obj, filename: str, chunk_size: int = 1000,
+                 pdf_workers: Optional[int] = None) -> str:
+    """Extract text content from various file types
+
+    Raises on parsing errors; callers decide how to report them.
+    """
+    file_extension = filename.lower().split('.')[-1]
+
+    # PDF and spreadsheet readers take paths themselves; PDF workers reopen the path
+    if file_extension == 'pdf':
+        text, _ = render_pages(extract_pdf_pages(file_obj, max_workers=pdf_workers))
+        return text
+
+    if is_spreadsheet(filename):
+        windows = iter_spreadsheet_windows(file_obj, filename, max_chars=chunk_size)
+        return "\n\n".join(window.text for window in windows)
+
+    with _open_source(file_obj) as source:
+        if file_extension == 'docx':
+            import docx
+            doc = docx.Document(source)
+            text = ""
+            for paragraph in doc.paragraphs:
+                text += paragraph.text + "\n"
+            # Extract tables
+            for table in doc.tables:
+                for row in table.rows:
+                    row_text = " | ".join([cell.text for cell in row.cells])
+                    text += row_text + "\n"
+            return text
+
+        elif file_extension == 'pptx':
+            from pptx import Presentation
+            prs = Presentation(source)
+            text = ""
+            for slide_num, slide in enumerate(prs.slides, 1):
+                text += f"\n--- Slide {slide_num} ---\n"
+                for shape in slide.shapes:
+                    if hasattr(shape, "text"):
+                        text += shape.text + "\n"
+            return text
+
+        elif file_extension in ['txt', 'md']:
+            return source.read().decode('utf-8')
+
+        elif file_extension == 'json':
+            data = json.loads(source.read().decode('utf-8'))
+            return json.dumps(data, indent=2)
+
+        else:
+            # For unknown file types, try to read as text
+            try:
+                return source.read().decode('utf-8', errors='ignore')
+            except Exception:
+                return f"Binary file: {filename} (content extraction not supported)"
+
+
+def extract_content(file_obj, filename: str, chunk_size: int = 1000,
+                    pdf_workers: Optional[int] = None) -> ExtractedContent:
+    """Extract a file for indexing
+
+    Spreadsheets are streamed as header-prefixed row windows which are used
+    directly as chunks; PDFs keep page offsets so every chunk can cite its pages.
+    """
+    if is_spreadsheet(filename):
+        windows = list(iter_spreadsheet_windows(file_obj, filename, max_chars=chunk_size))
+        return ExtractedContent("\n\n".join(window.text for window in windows), windows=windows)
+
+    if filename.lower().endswith('.pdf'):
+        content, page_offsets = render_pages(extract_pdf_pages(file_obj, max_workers=pdf_workers))
+        return ExtractedContent(content, page_offsets=page_offsets)
+
+    return ExtractedContent(extract_text(file_obj, filename, chunk_size, pdf_workers))
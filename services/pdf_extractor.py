@@ -0,0 +1,136 @@
+"""
+Page-parallel PDF text extraction
+Large PDFs are split into page ranges that are parsed in worker processes
+and reassembled in page order, keeping page boundaries as metadata
+"""
+
+import bisect
+import io
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+import PyPDF2
+
+# PDFs with fewer pages than this are parsed in-process; the worker start-up
+# cost outweighs the gain for small documents.
+MIN_PARALLEL_PAGES = 40
+PAGES_PER_RANGE = 20
+
+
+@dataclass
+class PdfPage:
+    """Extracted text of a single PDF page (1-based page number)"""
+    number: int
+    text: str
+
+
+def _open_reader(source: Union[str, bytes]) -> PyPDF2.PdfReader:
+    if isinstance(source, bytes):
+        return PyPDF2.PdfReader(io.BytesIO(source))
+    return PyPDF2.PdfReader(source)
+
+
+def _extract_page_range(source: Union[str, bytes], start: int, end: int) -> List[Tuple[int, str]]:
+    """Worker entry point: extract pages [start, end) from a path or raw bytes"""
+    reader = _open_reader(source)
+    pages = []
+    for index in range(start, end):
+        try:
+            text = reader.pages[index].extract_text() or ""
+        except Exception as e:
+            text = f"[Page {index + 1}: extraction error - {e}]"
+        pages.append((index + 1, text))
+    return pages
+
+
+def _as_source(file_obj) -> Union[str, bytes]:
+    """Turn a path or file-like object into something worker processes can open"""
+    if isinstance(file_obj, (str, bytes)):
+        return file_obj
+    if hasattr(file_obj, '__fspath__'):
+        return os.fspath(file_obj)
+    if hasattr(file_obj, 'seek'):
+        file_obj.seek(0)
+    return file_obj.read()
+
+
+def extract_pdf_pages(file_obj, max_workers: Optional[int] = None,
+                      pages_per_range: int = PAGES_PER_RANGE,
+                      min_parallel_pages: int = MIN_PARALLEL_PAGES) -> List[PdfPage]:
+    """Extract all pages of a PDF, in page order
+
+    Args:
+        file_obj: Path or file-like object of the PDF
+        max_workers: Worker processes to use (1 disables parallel extraction)
+        pages_per_range: Pages handed to a worker at a time
+        min_parallel_pages: Page count from which extraction is parallelized
+
+    Returns:
+        List of PdfPage in page order
+    """
+    source = _as_source(file_obj)
+    page_count = len(_open_reader(source).pages)
+
+    if max_workers is None:
+        max_workers = min(4, os.cpu_count() or 1)
+
+    if page_count < min_parallel_pages or max_workers <= 1:
+        return [PdfPage(number, text) for number, text in _extract_page_range(source, 0, page_count)]
+
+    ranges = [(start, min(start + pages_per_range, page_count))
+              for start in range(0, page_count, pages_per_range)]
+
+    spooled = None
+    if isinstance(source, bytes):
+        # Spool uploads to disk once so every range job gets a path instead of
+        # a pickled copy of the whole document
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+            f.write(source)
+        source = spooled = f.name
+
+    pages: List[PdfPage] = []
+    try:
+        # 'spawn' keeps the workers from inheriting the parent's memory (and
+        # its threads), as in extraction_sandbox
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(ranges)),
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [executor.submit(_extract_page_range, source, start, end) for start, end in ranges]
+            # Futures are consumed in submission order, so pages come back in order
+            for future in futures:
+                pages.extend(PdfPage(number, text) for number, text in future.result())
+    finally:
+        if spooled:
+            os.unlink(spooled)
+    return pages
+
+
+def render_pages(pages: List[PdfPage]) -> Tuple[str, List[Tuple[int, int]]]:
+    """Join pages into one text with page markers
+
+    Returns:
+        The text and a sorted list of (character offset, page number) marking
+        where each page starts
+    """
+    parts = []
+    page_offsets = []
+    offset = 0
+    for page in pages:
+        part = f"\n--- Page {page.number} ---\n{page.text}\n"
+        page_offsets.append((offset, page.number))
+        parts.append(part)
+        offset += len(part)
+    return "".join(parts), page_offsets
+
+
+def pages_for_span(page_offsets: List[Tuple[int, int]], start: int, end: int) -> List[int]:
+    """Page numbers covered by the character span [start, end) of rendered text"""
+    if not page_offsets or end <= start:
+        return []
+    starts = [offset for offset, _ in page_offsets]
+    first = max(bisect.bisect_right(starts, start) - 1, 0)
+    last = max(bisect.bisect_left(starts, end) - 1, first)
+    return [page_offsets[index][1] for index in range(first, last + 1)]
@@ -1,5 +1,6 @@
 """RAG (Retrieval-Augmented Generation) service for project data"""
 
+import io
 import os
 import hashlib
 import tempfile
@@ -18,10 +19,11 @@ except ImportError:
     HAS_RAG_DEPENDENCIES = False
 
 # File processing imports
-import PyPDF2
-import docx
-from pptx import Presentation
-import pandas as pd
+from services.extractors import SUPPORTED_EXTENSIONS, ExtractedContent, extract_content, extract_text
+from services.extraction_sandbox import ExtractionSandbox, SandboxLimits, SandboxResult
+from services.pdf_extractor import pages_for_span
+from services.upload_spool import UploadSpool
+from services.archive_ingest import is_archive, iter_archive_members
 
 class RAGService:
     """Service for handling RAG operations with project data"""
@@ -32,6 +34,13 @@ class RAGService:
         self.model = None
         self.chunk_size = 1000
         self.chunk_overlap = 200
+        self.pdf_workers = None  # None = one per CPU (capped), 1 = no worker processes
+        self.embedding_batch_size = 64  # Chunks per model.encode call
+        
+        # Folder ingestion runs extractors in a supervised subprocess pool
+        self.use_extraction_sandbox = True
+        self.sandbox_workers = 2
+        self.sandbox_limits = SandboxLimits(pdf_workers=self.pdf_workers)
         
         if HAS_RAG_DEPENDENCIES:
             try:
@@ -47,71 +56,28 @@ class RAGService:
     def extract_text_from_file(self, file_obj, filename: str) -> str:
         """Extract text content from various file types"""
         try:
-            file_extension = filename.lower().split('.')[-1]
-            
-            if file_extension == 'pdf':
-                pdf_reader = PyPDF2.PdfReader(file_obj)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
-                
-            elif file_extension == 'docx':
-                doc = docx.Document(file_obj)
-                text = ""
-                for paragraph in doc.paragraphs:
-                    text += paragraph.text + "\n"
-                # Extract tables
-                for table in doc.tables:
-                    for row in table.rows:
-                        row_text = " | ".join([cell.text for cell in row.cells])
-                        text += row_text + "\n"
-                return text
-                
-            elif file_extension in ['xlsx', 'xls']:
-                excel_data = pd.read_excel(file_obj, sheet_name=None)
-                text = ""
-                for sheet_name, df in excel_data.items():
-                    text += f"\n--- Sheet: {sheet_name} ---\n"
-                    text += df.to_string(index=False) + "\n"
-                return text
-                
-            elif file_extension == 'pptx':
-                prs = Presentation(file_obj)
-                text = ""
-                for slide_num, slide in enumerate(prs.slides, 1):
-                    text += f"\n--- Slide {slide_num} ---\n"
-                    for shape in slide.shapes:
-                        if hasattr(shape, "text"):
-                            text += shape.text + "\n"
-                return text
-                
-            elif file_extension in ['txt', 'md']:
-                return file_obj.read().decode('utf-8')
-                
-            elif file_extension == 'json':
-                data = json.loads(file_obj.read().decode('utf-8'))
-                return json.dumps(data, indent=2)
-                
-            else:
-                # For unknown file types, try to read as text
-                try:
-                    return file_obj.read().decode('utf-8', errors='ignore')
-                except:
-                    return f"Binary file: {filename} (content extraction not supported)"
-                    
+            return extract_text(file_obj, filename, self.chunk_size, self.pdf_workers)
         except Exception as e:
             return f"Error extracting content from {filename}: {str(e)}"
     
     def chunk_text(self, text: str, chunk_size: int = None, chunk_overlap: int = None) -> List[str]:
         """Split text into overlapping chunks"""
+        return [chunk for _, _, chunk in self.chunk_text_spans(text, chunk_size, chunk_overlap)]
+    
+    def chunk_text_spans(self, text: str, chunk_size: int = None,
+                         chunk_overlap: int = None) -> List[Tuple[int, int, str]]:
+        """Split text into overlapping chunks, keeping each chunk's (start, end) offsets
+        
+        text[start:end] equals the chunk, which lets the database store offsets
+        instead of a second copy of the text.
+        """
         if not text:
             return []
             
         chunk_size = chunk_size or self.chunk_size
         chunk_overlap = chunk_overlap or self.chunk_overlap
         
-        chunks = []
+        spans = []
         start = 0
         
         while start < len(text):
@@ -131,13 +97,16 @@ class RAGService:
                     chunk = chunk[:break_point + 1]
                     end = start + len(chunk)
             
-            chunks.append(chunk.strip())
+            # Offsets of the stripped chunk, so text[start:end] reproduces it exactly
+            stripped = chunk.strip()
+            chunk_start = start + (len(chunk) - len(chunk.lstrip()))
+            spans.append((chunk_start, chunk_start + len(stripped), stripped))
             start = end - chunk_overlap
             
             if start >= len(text):
                 break
         
-        return [chunk for chunk in chunks if chunk.strip()]
+        return [span for span in spans if span[2]]
     
     def compute_hash(self, content: str) -> str:
         """Compute hash of content for change detection"""
@@ -149,8 +118,26 @@ class RAGService:
             return {"success": False, "error": "RAG service not available"}
         
         try:
-            # Extract text content
-            content = self.extract_text_from_file(file_obj, filename)
+            extracted = extract_content(file_obj, filename, self.chunk_size, self.pdf_workers)
+        except Exception as e:
+            return {"success": False, "error": f"Error processing file {filename}: {str(e)}"}
+        
+        return self.index_extracted_content(project_id, extracted, filename, is_template)
+    
+    def index_extracted_content(self, project_id: int, extracted: ExtractedContent, filename: str,
+                                is_template: bool = False, source_fingerprint: str = None) -> Dict[str, Any]:
+        """Chunk, embed and save content that has already been extracted from a file
+        
+        source_fingerprint is stored with the file so an unchanged archive member
+        can be skipped before extraction the next time its archive is ingested.
+        """
+        if not self.is_available():
+            return {"success": False, "error": "RAG service not available"}
+        
+        try:
+            content = extracted.content
+            windows = extracted.windows
+            page_offsets = extracted.page_offsets
             if not content.strip():
                 return {"success": False, "error": "No content extracted from file"}
             
@@ -158,63 +145,76 @@ class RAGService:
             content_hash = self.compute_hash(content)
             
             # Check if file already exists with same content
-            existing_files = self.db_manager.get_project_data_files(project_id)
-            for existing_file in existing_files:
-                if (existing_file['filename'] == filename and 
-                    existing_file['content_hash'] == content_hash):
-                    return {
-                        "success": True, 
-                        "message": f"File {filename} already processed (no changes detected)",
-                        "file_id": existing_file['id']
-                    }
+            existing_file_id = self.db_manager.find_project_data_file(project_id, filename, content_hash)
+            if existing_file_id is not None:
+                if source_fingerprint:
+                    self.db_manager.update_source_fingerprint(existing_file_id, source_fingerprint)
+                return {
+                    "success": True, 
+                    "message": f"File {filename} already processed (no changes detected)",
+                    "file_id": existing_file_id
+                }
             
-            # Save file to database
             file_path = f"project_{project_id}/{filename}"
             file_size = len(content.encode('utf-8'))
             file_type = filename.lower().split('.')[-1] if '.' in filename else 'unknown'
             
-            file_id = self.db_manager.save_project_data_file(
-                project_id=project_id,
-                filename=filename,
-                file_path=file_path,
-                file_type=file_type,
-                file_size=file_size,
-                content=content,
-                content_hash=content_hash,
-                is_template=is_template
-            )
-            
             # Create text chunks
-            chunks = self.chunk_text(content)
+            chunk_pages = None
+            if windows is not None:
+                # Windows are joined with a blank line in between
+                spans = []
+                offset = 0
+                for window in windows:
+                    spans.append((offset, offset + len(window.text), window.text))
+                    offset += len(window.text) + 2
+            else:
+                spans = self.chunk_text_spans(content)
+                if page_offsets is not None:
+                    chunk_pages = [pages_for_span(page_offsets, start, end) for start, end, _ in spans]
+            chunks = [chunk for _, _, chunk in spans]
             
-            # Generate embeddings for chunks
-            embeddings_created = 0
+            # Embed every chunk before anything is written, so a failure leaves
+            # no partially indexed file behind
+            vectors = self.model.encode(chunks, batch_size=self.embedding_batch_size) if chunks else []
+            
+            embeddings = []
             for chunk_index, chunk_text in enumerate(chunks):
-                try:
-                    # Generate embedding
-                    embedding = self.model.encode(chunk_text).tolist()
-                    
-                    # Save embedding to database
-                    metadata = {
-                        "filename": filename,
-                        "chunk_size": len(chunk_text),
-                        "file_type": file_type,
-                        "is_template": is_template
-                    }
-                    
-                    self.db_manager.save_vector_embedding(
-                        project_id=project_id,
-                        file_id=file_id,
-                        chunk_index=chunk_index,
-                        chunk_text=chunk_text,
-                        embedding_vector=embedding,
-                        metadata=metadata
-                    )
-                    embeddings_created += 1
-                    
-                except Exception as e:
-                    print(f"Error creating embedding for chunk {chunk_index}: {e}")
-                    continue
+                metadata = {
+                    "filename": filename,
+                    "chunk_size": len(chunk_text),
+                    "file_type": file_type,
+                    "is_template": is_template
+                }
+                if windows is not None:
+                    metadata.update(windows[chunk_index].metadata)
+                elif chunk_pages is not None:
+                    metadata["pages"] = chunk_pages[chunk_index]
+                embeddings.append({
+                    "project_id": project_id,
+                    "chunk_index": chunk_index,
+                    "chunk_text": chunk_text,
+                    "embedding_vector": vectors[chunk_index].tolist(),
+                    "metadata": metadata,
+                    "chunk_span": spans[chunk_index][:2]
+                })
+            
+            # File record and all of its chunks are committed together
+            with self.db_manager.transaction():
+                file_id = self.db_manager.save_project_data_file(
+                    project_id=project_id,
+                    filename=filename,
+                    file_path=file_path,
+                    file_type=file_type,
+                    file_size=file_size,
+                    content=content,
+                    content_hash=content_hash,
+                    is_template=is_template,
+                    source_fingerprint=source_fingerprint
+                )
+                for embedding in embeddings:
+                    embedding["file_id"] = file_id
+                embeddings_created = self.db_manager.save_vector_embeddings(embeddings)
             
             return {
                 "success": True,
@@ -229,13 +229,15 @@ class RAGService:
             return {"success": False, "error": f"Error processing file {filename}: {str(e)}"}
     
     def process_folder(self, project_id: int, folder_path: str, is_template: bool = False) -> Dict[str, Any]:
-        """Process all files in a folder recursively"""
+        """Process all files in a folder recursively
+        
+        Zip and tar archives in the folder are streamed member by member; each
+        member is recorded under its path inside the archive.
+        """
         if not os.path.exists(folder_path):
             return {"success": False, "error": "Folder path does not exist"}
         
         results = []
-        total_files = 0
-        successful_files = 0
         
         # Supported file extensions
         supported_extensions = {
@@ -243,6 +245,7 @@ class RAGService:
             '.xlsx', '.xls', '.pptx', '.ppt', '.csv'
         }
         
+        jobs = []
         for root, dirs, files in os.walk(folder_path):
             for file in files:
                 file_path = os.path.join(root, file)
@@ -252,43 +255,165 @@ class RAGService:
                 if file.startswith('.'):
                     continue
                 
-                total_files += 1
-                
-                try:
-                    with open(file_path, 'rb') as file_obj:
-                        result = self.process_file(project_id, file_obj, file, is_template)
-                        results.append({
-                            "filename": file,
-                            "path": file_path,
-                            "result": result
-                        })
-                        
-                        if result["success"]:
-                            successful_files += 1
-                            
-                except Exception as e:
-                    results.append({
-                        "filename": file,
-                        "path": file_path,
-                        "result": {"success": False, "error": str(e)}
-                    })
+                jobs.append(((file_path, file), file_path, file))
+        
+        self._process_extraction_jobs(project_id, jobs, is_template, results)
+        return self._summarize_results(results)
+    
+    def process_archive(self, project_id: int, archive, archive_name: str,
+                        is_template: bool = False) -> Dict[str, Any]:
+        """Stream the members of a zip/tar archive through the extraction pipeline
+        
+        Returns the same result shape as process_folder.
+        """
+        results = []
+        self._process_extraction_jobs(project_id, [((archive_name, archive_name), archive, archive_name)],
+                                      is_template, results)
+        return self._summarize_results(results)
+    
+    def process_uploaded_files(self, project_id: int, uploaded_files, spool: UploadSpool,
+                               is_template: bool = False) -> Dict[str, Any]:
+        """Spool uploaded files to disk, then extract and index them from their paths
+        
+        Returns the same result shape as process_folder.
+        """
+        results = []
+        jobs = []
+        spooled_files = []
         
+        for uploaded_file in uploaded_files:
+            try:
+                spooled = spool.spool(uploaded_file)
+            except Exception as e:
+                results.append({
+                    "filename": uploaded_file.name,
+                    "path": None,
+                    "result": {"success": False, "error": str(e)}
+                })
+                continue
+            spooled_files.append(spooled)
+            jobs.append(((spooled.name, spooled.name), spooled.path, spooled.name))
+        
+        try:
+            self._process_extraction_jobs(project_id, jobs, is_template, results)
+        finally:
+            for spooled in spooled_files:
+                spool.discard(spooled)
+        
+        return self._summarize_results(results)
+    
+    def _summarize_results(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        successful_files = sum(1 for entry in results if entry["result"]["success"])
         return {
             "success": True,
-            "total_files": total_files,
+            "total_files": len(results),
             "successful_files": successful_files,
-            "failed_files": total_files - successful_files,
+            "failed_files": len(results) - successful_files,
             "results": results
         }
     
+    def _expand_archives(self, project_id: int, jobs, results: List[Dict[str, Any]],
+                         fingerprints: Dict[str, str]):
+        """Replace archive jobs by one job per archive member, streamed lazily
+        
+        Member content is passed to the extractors as bytes, so archives are
+        never unpacked to disk. Members whose size and checksum match what was
+        indexed last time are not read at all, and binary members without an
+        extractor are rejected; both are recorded in results directly. The
+        fingerprint of every member yielded is put in fingerprints.
+        """
+        for key, source, filename in jobs:
+            if not is_archive(filename):
+                yield key, source, filename
+                continue
+            
+            display_path = key[0]
+            try:
+                known = self.db_manager.get_source_fingerprints(project_id, f"{filename}/")
+                members = iter_archive_members(
+                    source, extensions=SUPPORTED_EXTENSIONS,
+                    skip=lambda name, fingerprint: known.get(f"{filename}/{name}") == fingerprint)
+                for member in members:
+                    member_filename = f"{filename}/{member.name}"
+                    member_key = (f"{display_path}/{member.name}", member_filename)
+                    if member.unchanged:
+                        results.append({
+                            "filename": member_filename,
+                            "path": member_key[0],
+                            "result": {"success": True,
+                                       "message": f"File {member_filename} unchanged in archive, skipped"}
+                        })
+                        continue
+                    if member.error:
+                        results.append({
+                            "filename": member_filename,
+                            "path": member_key[0],
+                            "result": {"success": False, "error": member.error}
+                        })
+                        continue
+                    fingerprints[member_filename] = member.fingerprint
+                    yield member_key, member.data, member_filename
+            except Exception as e:
+                results.append({
+                    "filename": filename,
+                    "path": display_path,
+                    "result": {"success": False, "error": f"Could not read archive {filename}: {str(e)}"}
+                })
+    
+    def _process_extraction_jobs(self, project_id: int, jobs, is_template: bool,
+                                 results: List[Dict[str, Any]]):
+        """Extract ((path, filename), source, filename) jobs and index each one, appending to results"""
+        fingerprints = {}
+        expanded = self._expand_archives(project_id, jobs, results, fingerprints)
+        for (file_path, file), extraction in self._extract_files(expanded):
+            fingerprint = fingerprints.pop(file, None)
+            if extraction.success:
+                result = self.index_extracted_content(project_id, extraction.value, file, is_template,
+                                                      source_fingerprint=fingerprint)
+            else:
+                result = {"success": False, "error": extraction.error}
+                if extraction.reason in ("timeout", "memory", "crash"):
+                    result["killed"] = extraction.reason
+            
+            results.append({
+                "filename": file,
+                "path": file_path,
+                "result": result
+            })
+    
+    def _extract_files(self, jobs):
+        """Extract (key, source, filename) jobs, yielding (key, SandboxResult)
+
+        Uses the extraction sandbox unless it is disabled, in which case files
+        are extracted in-process with the same result shape.
+        """
+        if not self.is_available():
+            for key, _, _ in jobs:
+                yield key, SandboxResult(False, error="RAG service not available", reason="error")
+            return
+        
+        if self.use_extraction_sandbox:
+            sandbox = ExtractionSandbox(self.sandbox_workers, self.sandbox_limits, self.chunk_size)
+            yield from sandbox.run(jobs)
+            return
+        
+        for key, source, filename in jobs:
+            if isinstance(source, bytes):
+                source = io.BytesIO(source)
+            try:
+                extracted = extract_content(source, filename, self.chunk_size, self.pdf_workers)
+                yield key, SandboxResult(True, value=extracted)
+            except Exception as e:
+                yield key, SandboxResult(False, error=str(e), reason="error")
+    
     def search_similar_content(self, project_id: int, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Search for similar content using vector similarity"""
         if not self.is_available():
             return []
         
         try:
-            # Get all embeddings for the project
-            embeddings_data = self.db_manager.get_vector_embeddings(project_id)
+            # Get all embeddings for the project; chunk text is loaded only for the hits
+            embeddings_data = self.db_manager.get_vector_embeddings(project_id, include_text=False)
             
             if not embeddings_data:
                 return []
@@ -312,7 +437,7 @@ class RAGService:
             
             # Sort by similarity and return top_k
             similarities.sort(key=lambda x: x['similarity'], reverse=True)
-            return similarities[:top_k]
+            return self.db_manager.load_chunk_texts(similarities[:top_k])
             
         except Exception as e:
             print(f"Error in similarity search: {e}")
@@ -332,9 +457,13 @@ class RAGService:
             chunk_text = chunk_data['chunk_text']
             filename = chunk_data['filename']
             similarity = chunk_data['similarity']
+            pages = (chunk_data.get('metadata') or {}).get('pages')
             
-            # Add metadata
-            context_part = f"[From {filename} (similarity: {similarity:.3f})]:\n{chunk_text}\n"
+            # Add metadata, citing page numbers where the source has them
+            source = filename
+            if pages:
+                source += f", p. {pages[0]}" if len(pages) == 1 else f", pp. {pages[0]}-{pages[-1]}"
+            context_part = f"[From {source} (similarity: {similarity:.3f})]:\n{chunk_text}\n"
             
             if current_length + len(context_part) > max_context_length:
                 break
@@ -346,27 +475,14 @@ class RAGService:
     
     def get_project_data_summary(self, project_id: int) -> Dict[str, Any]:
         """Get summary of all project data"""
-        files = self.db_manager.get_project_data_files(project_id)
-        embeddings = self.db_manager.get_vector_embeddings(project_id)
-        
-        summary = {
-            "total_files": len(files),
-            "total_chunks": len(embeddings),
-            "file_types": {},
-            "template_files": 0,
-            "data_files": 0
+        stats = self.db_manager.get_project_data_stats(project_id)
+        return {
+            "total_files": stats["total_files"],
+            "total_chunks": stats["total_chunks"],
+            "file_types": stats["file_types"],
+            "template_files": stats["template_files"],
+            "data_files": stats["data_files"]
         }
-        
-        for file in files:
-            file_type = file['file_type']
-            summary["file_types"][file_type] = summary["file_types"].get(file_type, 0) + 1
-            
-            if file['is_template']:
-                summary["template_files"] += 1
-            else:
-                summary["data_files"] += 1
-        
-        return summary
     
     def add_text_content(self, project_id: int, content: str, filename: str, file_type: str, is_template: bool = False) -> Dict:
         """Add text content directly to RAG system (for templates and other text content)"""
@@ -374,42 +490,33 @@ class RAGService:
             return {"success": False, "error": "RAG service not available"}
         
         try:
-            # Store file metadata
-            file_data = {
-                'project_id': project_id,
-                'filename': filename,
-                'file_type': file_type,
-                'file_size': len(content.encode('utf-8')),
-                'content': content,
-                'is_template': is_template
-            }
-            
-            file_id = self.db_manager.save_project_data_file(file_data)
-            
             # Process content for embeddings
-            chunks = self.chunk_text(content)
-            embeddings_saved = 0
+            spans = self.chunk_text_spans(content)
+            chunks = [chunk for _, _, chunk in spans]
+            vectors = self.model.encode(chunks, batch_size=self.embedding_batch_size) if chunks else []
             
-            for i, chunk in enumerate(chunks):
-                try:
-                    # Generate embedding
-                    embedding = self.model.encode(chunk)
-                    
-                    # Save to database
-                    embedding_data = {
+            with self.db_manager.transaction():
+                file_id = self.db_manager.save_project_data_file(
+                    project_id=project_id,
+                    filename=filename,
+                    file_path=f"project_{project_id}/{filename}",
+                    file_type=file_type,
+                    file_size=len(content.encode('utf-8')),
+                    content=content,
+                    content_hash=self.compute_hash(content),
+                    is_template=is_template
+                )
+                embeddings_saved = self.db_manager.save_vector_embeddings([
+                    {
                         'project_id': project_id,
                         'file_id': file_id,
-                        'chunk_text': chunk,
                         'chunk_index': i,
-                        'embedding': embedding.tolist()
+                        'chunk_text': chunk,
+                        'embedding_vector': vectors[i].tolist(),
+                        'chunk_span': spans[i][:2]
                     }
-                    
-                    self.db_manager.save_vector_embedding(embedding_data)
-                    embeddings_saved += 1
-                    
-                except Exception as e:
-                    print(f"Warning: Could not process chunk {i} for {filename}: {e}")
-                    continue
+                    for i, chunk in enumerate(chunks)
+                ])
             
             return {
                 "success": True,
@@ -0,0 +1,143 @@
+"""
+Streaming spreadsheet extraction for large Excel and CSV files
+Emits self-contained row windows that repeat the header row
+"""
+
+import csv
+import io
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence
+
+SPREADSHEET_EXTENSIONS = {'xlsx', 'xlsm', 'xls', 'csv'}
+
+DEFAULT_WINDOW_ROWS = 200
+DEFAULT_WINDOW_CHARS = 4000
+
+
+@dataclass
+class RowWindow:
+    """A window of spreadsheet rows that can be understood on its own"""
+    sheet: str
+    first_row: int
+    last_row: int
+    text: str
+
+    @property
+    def metadata(self) -> dict:
+        return {"sheet": self.sheet, "rows": [self.first_row, self.last_row]}
+
+
+def is_spreadsheet(filename: str) -> bool:
+    """Check whether a filename should go through the streaming spreadsheet extractor"""
+    return filename.lower().split('.')[-1] in SPREADSHEET_EXTENSIONS
+
+
+def _format_row(values: Sequence) -> str:
+    return " | ".join("" if value is None else str(value).strip() for value in values)
+
+
+def _windows_from_rows(sheet: str, rows: Iterator[Sequence], max_rows: int,
+                       max_chars: int) -> Iterator[RowWindow]:
+    """Group an iterator of rows into windows, each prefixed with the header row"""
+    header = None
+    for values in rows:
+        if any(value not in (None, "") for value in values):
+            header = _format_row(values)
+            break
+    if header is None:
+        return
+
+    # Row numbers are 1-based and count the header as row 1, like in Excel
+    row_number = 1
+    lines: List[str] = []
+    first_row = last_row = 2
+    size = 0
+
+    for values in rows:
+        row_number += 1
+        line = _format_row(values)
+        if not line.replace("|", "").strip():
+            continue
+
+        if lines and (len(lines) >= max_rows or size + len(line) > max_chars):
+            yield RowWindow(sheet, first_row, last_row, _render(sheet, header, lines))
+            lines = []
+            size = 0
+
+        if not lines:
+            first_row = row_number
+        lines.append(line)
+        last_row = row_number
+        size += len(line) + 1
+
+    if lines:
+        yield RowWindow(sheet, first_row, last_row, _render(sheet, header, lines))
+
+
+def _render(sheet: str, header: str, lines: List[str]) -> str:
+    return f"--- Sheet: {sheet} ---\n{header}\n" + "\n".join(lines)
+
+
+def iter_excel_windows(file_obj, max_rows: int = DEFAULT_WINDOW_ROWS,
+                       max_chars: int = DEFAULT_WINDOW_CHARS) -> Iterator[RowWindow]:
+    """Stream row windows from an .xlsx workbook using openpyxl read-only mode"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            rows = worksheet.iter_rows(values_only=True)
+            yield from _windows_from_rows(worksheet.title, rows, max_rows, max_chars)
+    finally:
+        workbook.close()
+
+
+def iter_legacy_excel_windows(file_obj, max_rows: int = DEFAULT_WINDOW_ROWS,
+                              max_chars: int = DEFAULT_WINDOW_CHARS) -> Iterator[RowWindow]:
+    """Row windows for legacy .xls files, which openpyxl cannot stream"""
+    import pandas as pd
+
+    excel_data = pd.read_excel(file_obj, sheet_name=None, header=None)
+    for sheet_name, df in excel_data.items():
+        rows = (tuple(None if pd.isna(value) else value for value in row)
+                for row in df.itertuples(index=False, name=None))
+        yield from _windows_from_rows(str(sheet_name), rows, max_rows, max_chars)
+        del df
+
+
+def iter_csv_windows(file_obj, sheet: str = "CSV", max_rows: int = DEFAULT_WINDOW_ROWS,
+                     max_chars: int = DEFAULT_WINDOW_CHARS,
+                     encoding: str = 'utf-8') -> Iterator[RowWindow]:
+    """Stream row windows from a CSV file without loading it into memory"""
+    if isinstance(file_obj, str) or hasattr(file_obj, '__fspath__'):
+        with open(file_obj, 'r', encoding=encoding, errors='replace', newline='') as text_stream:
+            yield from _windows_from_rows(sheet, csv.reader(text_stream), max_rows, max_chars)
+        return
+
+    text_stream = io.TextIOWrapper(file_obj, encoding=encoding, errors='replace', newline='')
+    try:
+        yield from _windows_from_rows(sheet, csv.reader(text_stream), max_rows, max_chars)
+    finally:
+        # Don't let the wrapper close the caller's file object
+        text_stream.detach()
+
+
+def iter_spreadsheet_windows(file_obj, filename: str, max_rows: int = DEFAULT_WINDOW_ROWS,
+                             max_chars: int = DEFAULT_WINDOW_CHARS) -> Iterator[RowWindow]:
+    """Dispatch to the right streaming reader based on the file extension"""
+    file_extension = filename.lower().split('.')[-1]
+
+    if file_extension == 'csv':
+        yield from iter_csv_windows(file_obj, sheet=filename, max_rows=max_rows, max_chars=max_chars)
+    elif file_extension == 'xls':
+        yield from iter_legacy_excel_windows(file_obj, max_rows=max_rows, max_chars=max_chars)
+    else:
+        yield from iter_excel_windows(file_obj, max_rows=max_rows, max_chars=max_chars)
+
+
+def extract_spreadsheet_text(file_obj, filename: str, max_rows: int = DEFAULT_WINDOW_ROWS,
+                             max_chars: Optional[int] = None) -> str:
+    """Extract a spreadsheet as text, one header-prefixed window after another"""
+    windows = iter_spreadsheet_windows(file_obj, filename, max_rows=max_rows,
+                                       max_chars=max_chars or DEFAULT_WINDOW_CHARS)
+    return "\n\n".join(window.text for window in windows)
@@ -0,0 +1,111 @@
+"""
+Upload spooling for Streamlit file uploads
+Streams UploadedFile content to a temp directory in chunks, hashing it on the
+way, so extractors work from file paths instead of in-memory buffers
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+SPOOL_CHUNK_SIZE = 1024 * 1024  # 1 MB
+MAX_UPLOAD_SIZE = 200 * 1024 * 1024  # Streamlit's default upload limit
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the spool's size limit"""
+
+
+@dataclass
+class SpooledFile:
+    """An uploaded file that has been written to disk"""
+    name: str
+    path: str
+    size: int
+    sha256: str
+
+
+class UploadSpool:
+    """Per-session spool directory for uploaded files
+
+    Files are keyed by Streamlit's ``file_id`` so that reruns reuse the
+    spooled copy instead of writing it again. The directory is removed when
+    the spool is cleaned up or garbage collected with the session.
+    """
+
+    def __init__(self, base_dir: Optional[str] = None, chunk_size: int = SPOOL_CHUNK_SIZE,
+                 max_file_size: int = MAX_UPLOAD_SIZE):
+        base_dir = base_dir or os.getenv("UPLOAD_SPOOL_DIR") or None
+        if base_dir:
+            os.makedirs(base_dir, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix="intellifusion_uploads_", dir=base_dir)
+        self.chunk_size = chunk_size
+        self.max_file_size = max_file_size
+        self._files: Dict[str, SpooledFile] = {}
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.directory, True)
+
+    def spool(self, uploaded_file, release: bool = True) -> SpooledFile:
+        """Write an uploaded file to disk and return where it went
+
+        Args:
+            uploaded_file: Streamlit UploadedFile (or any binary file object with a name)
+            release: Close the upload's in-memory buffer once it has been spooled
+
+        Raises:
+            UploadTooLargeError: If the file is larger than ``max_file_size``
+        """
+        key = getattr(uploaded_file, 'file_id', None) or f"{uploaded_file.name}:{id(uploaded_file)}"
+        spooled = self._files.get(key)
+        if spooled and os.path.exists(spooled.path):
+            if release:
+                uploaded_file.close()
+            return spooled
+
+        declared_size = getattr(uploaded_file, 'size', None)
+        if declared_size is not None and declared_size > self.max_file_size:
+            raise UploadTooLargeError(
+                f"{uploaded_file.name} is too large (>{self.max_file_size // (1024 * 1024)}MB)")
+
+        safe_name = os.path.basename(uploaded_file.name) or "upload"
+        file_dir = tempfile.mkdtemp(dir=self.directory)
+        path = os.path.join(file_dir, safe_name)
+
+        digest = hashlib.sha256()
+        size = 0
+        uploaded_file.seek(0)
+        try:
+            with open(path, 'wb') as spool_file:
+                while True:
+                    chunk = uploaded_file.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_file_size:
+                        raise UploadTooLargeError(
+                            f"{uploaded_file.name} is too large (>{self.max_file_size // (1024 * 1024)}MB)")
+                    digest.update(chunk)
+                    spool_file.write(chunk)
+        except Exception:
+            shutil.rmtree(file_dir, ignore_errors=True)
+            raise
+        finally:
+            if release:
+                uploaded_file.close()
+
+        spooled = SpooledFile(name=uploaded_file.name, path=path, size=size, sha256=digest.hexdigest())
+        self._files[key] = spooled
+        return spooled
+
+    def discard(self, spooled: SpooledFile):
+        """Delete a spooled file once it is no longer needed"""
+        self._files = {key: value for key, value in self._files.items() if value.path != spooled.path}
+        shutil.rmtree(os.path.dirname(spooled.path), ignore_errors=True)
+
+    def cleanup(self):
+        """Remove the spool directory and everything in it"""
+        self._files.clear()
+        self._finalizer()
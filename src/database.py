@@ -1,11 +1,15 @@
 """
 Database models for the Project Documentation Management System
 """
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON, Index
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, Session
 from sqlalchemy.sql import func
+from contextlib import contextmanager
 from datetime import datetime
+from typing import Iterator
+import threading
 import uuid
 
 from .config import Config
@@ -85,6 +89,11 @@ class Workflow(Base):
 class WorkflowTask(Base):
     """Workflow task model for individual approval tasks"""
     __tablename__ = "workflow_tasks"
+    __table_args__ = (
+        # Approver inboxes (pending tasks per assignee) and per-workflow status counts
+        Index("ix_workflow_tasks_status_assignee", "status", "assignee"),
+        Index("ix_workflow_tasks_workflow_status", "workflow_id", "status"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     workflow_id = Column(String, ForeignKey("workflows.id"), nullable=False)
@@ -118,24 +127,91 @@ class DocumentTemplate(Base):
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
 # Database setup
-def get_engine():
-    """Get database engine, creating it if necessary"""
-    return create_engine(Config.DATABASE_URL, echo=Config.DEBUG)
+# One engine (and so one connection pool) and one session factory per process,
+# created on first use and shared by every service and thread
+_engine = None
+_session_local = None
+_setup_lock = threading.Lock()
 
-def get_session_local():
-    """Get SessionLocal class"""
-    engine = get_engine()
-    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _engine_options(url: str) -> dict:
+    """Pool settings for the configured database URL"""
+    options = {"echo": Config.DEBUG, "pool_pre_ping": True}
+    if url.startswith("sqlite"):
+        # Sessions are used from Streamlit's worker threads
+        options["connect_args"] = {"check_same_thread": False}
+        if url in ("sqlite://", "sqlite:///:memory:"):
+            # In-memory databases use a single shared connection; no pool sizing applies
+            return options
+    options.update(
+        pool_size=Config.DATABASE_POOL_SIZE,
+        max_overflow=Config.DATABASE_MAX_OVERFLOW,
+        pool_timeout=Config.DATABASE_POOL_TIMEOUT,
+        pool_recycle=Config.DATABASE_POOL_RECYCLE,
+    )
+    return options
+
+def get_engine() -> Engine:
+    """Get the process-wide database engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        with _setup_lock:
+            if _engine is None:
+                _engine = create_engine(Config.DATABASE_URL, **_engine_options(Config.DATABASE_URL))
+    return _engine
+
+def get_session_local() -> sessionmaker:
+    """Get the process-wide SessionLocal factory bound to the shared engine"""
+    global _session_local
+    if _session_local is None:
+        engine = get_engine()
+        with _setup_lock:
+            if _session_local is None:
+                _session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return _session_local
+
+def get_session() -> Session:
+    """Open a new session on the shared engine; the caller must close it"""
+    return get_session_local()()
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """Session that commits on success, rolls back on error and always closes
+    
+    Example:
+        with session_scope() as db:
+            db.add(document)
+    """
+    db = get_session()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def dispose_engine():
+    """Close pooled connections and drop the shared engine (e.g. after fork or in tests)"""
+    global _engine, _session_local
+    with _setup_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = _session_local = None
 
 def create_tables():
-    """Create all database tables"""
+    """Create all database tables, and indexes added to existing ones since"""
     engine = get_engine()
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, indexes included, so
+    # databases created before an index was declared would never get it
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 def get_db():
     """Get database session"""
-    SessionLocal = get_session_local()
-    db = SessionLocal()
+    db = get_session()
     try:
         yield db
     finally:
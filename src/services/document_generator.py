@@ -12,7 +12,7 @@ from datetime import datetime
 import hashlib
 
 from ..config import Config
-from ..database import get_session_local, Document as DocumentModel, DocumentRevision
+from ..database import session_scope, Document as DocumentModel, DocumentRevision
 
 class DocumentGeneratorService:
     """Service for generating documents from templates"""
@@ -160,38 +160,35 @@ class DocumentGeneratorService:
         """Save document record to database"""
         
         try:
-            SessionLocal = get_session_local()
-            db = SessionLocal()
-            
             # Calculate content hash for change detection
             content_hash = self._calculate_file_hash(file_path)
             
-            # Create document record
-            document = DocumentModel(
-                project_id=project_id,
-                name=doc_name,
-                document_type=document_type,
-                template_name=template_name,
-                file_path=file_path,
-                content_hash=content_hash,
-                status="Draft"
-            )
-            
-            db.add(document)
-            db.commit()
-            
-            # Create initial revision
-            revision = DocumentRevision(
-                document_id=document.id,
-                version="1.0",
-                changes_description="Initial document creation",
-                file_path=file_path,
-                created_by="System"
-            )
-            
-            db.add(revision)
-            db.commit()
-            db.close()
+            with session_scope() as db:
+                # Create document record
+                document = DocumentModel(
+                    project_id=project_id,
+                    name=doc_name,
+                    document_type=document_type,
+                    template_name=template_name,
+                    file_path=file_path,
+                    content_hash=content_hash,
+                    status="Draft"
+                )
+                
+                db.add(document)
+                # Assigns the document id without committing yet
+                db.flush()
+                
+                # Create initial revision
+                revision = DocumentRevision(
+                    document_id=document.id,
+                    version="1.0",
+                    changes_description="Initial document creation",
+                    file_path=file_path,
+                    created_by="System"
+                )
+                
+                db.add(revision)
             
         except Exception as e:
             print(f"Error saving document record: {str(e)}")
@@ -3,10 +3,14 @@ Workflow Manager Service for handling approval processes
 """
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session, joinedload
 
 from ..config import Config
-from ..database import get_session_local, Workflow, WorkflowTask, Document as DocumentModel
+from ..database import get_session, Workflow, WorkflowTask, Document as DocumentModel
+
+# Task statuses that count as completed for progress reporting
+COMPLETED_TASK_STATUSES = ["Approved", "Rejected"]
 
 class WorkflowManagerService:
     """Service for managing document approval workflows"""
@@ -33,8 +37,7 @@ class WorkflowManagerService:
             Workflow ID
         """
         
-        SessionLocal = get_session_local()
-        db = SessionLocal()
+        db = get_session()
         try:
             # Use default approvers if none provided
             if not approvers:
@@ -88,9 +91,12 @@ class WorkflowManagerService:
             List of pending tasks
         """
         
-        db = SessionLocal()
+        db = get_session()
         try:
-            query = db.query(WorkflowTask).filter(WorkflowTask.status == "Pending")
+            # Documents are joined into the same query instead of one lookup per task
+            query = (db.query(WorkflowTask)
+                     .options(joinedload(WorkflowTask.document))
+                     .filter(WorkflowTask.status == "Pending"))
             
             if assignee:
                 query = query.filter(WorkflowTask.assignee == assignee)
@@ -99,8 +105,7 @@ class WorkflowManagerService:
             
             result = []
             for task in tasks:
-                # Get document info
-                document = db.query(DocumentModel).filter(DocumentModel.id == task.document_id).first()
+                document = task.document
                 
                 result.append({
                     "task_id": task.id,
@@ -139,7 +144,7 @@ class WorkflowManagerService:
             True if successful
         """
         
-        db = SessionLocal()
+        db = get_session()
         try:
             task = db.query(WorkflowTask).filter(WorkflowTask.id == task_id).first()
             
@@ -164,38 +169,44 @@ class WorkflowManagerService:
         finally:
             db.close()
     
+    def _task_status_counts(self, db: Session, workflow_id: str) -> Dict[str, int]:
+        """Number of tasks per status for a workflow, counted in SQL"""
+        rows = (db.query(WorkflowTask.status, func.count(WorkflowTask.id))
+                .filter(WorkflowTask.workflow_id == workflow_id)
+                .group_by(WorkflowTask.status)
+                .all())
+        return {status: count for status, count in rows}
+    
     def _check_workflow_completion(self, db: Session, workflow_id: str):
         """Check if workflow is complete and update document status"""
         
-        # Get all tasks for this workflow
-        tasks = db.query(WorkflowTask).filter(WorkflowTask.workflow_id == workflow_id).all()
+        status_counts = self._task_status_counts(db, workflow_id)
         
-        if not tasks:
+        if not status_counts:
             return
         
         # Check if all tasks are complete
-        pending_tasks = [t for t in tasks if t.status == "Pending"]
-        rejected_tasks = [t for t in tasks if t.status == "Rejected"]
-        
-        if not pending_tasks:  # All tasks completed
-            workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+        if not status_counts.get("Pending"):  # All tasks completed
+            workflow = db.get(Workflow, workflow_id)
+            # All tasks of a workflow review the same document
+            document_id = (db.query(WorkflowTask.document_id)
+                           .filter(WorkflowTask.workflow_id == workflow_id)
+                           .limit(1)
+                           .scalar())
+            document = db.get(DocumentModel, document_id) if document_id else None
             
-            if rejected_tasks:
+            if status_counts.get("Rejected"):
                 # If any task was rejected, mark workflow as cancelled
                 workflow.status = "Cancelled"
                 # Update document status
-                if tasks[0].document_id:
-                    document = db.query(DocumentModel).filter(DocumentModel.id == tasks[0].document_id).first()
-                    if document:
-                        document.status = "Rejected"
+                if document:
+                    document.status = "Rejected"
             else:
                 # All approved, mark workflow as completed
                 workflow.status = "Completed"
                 # Update document status
-                if tasks[0].document_id:
-                    document = db.query(DocumentModel).filter(DocumentModel.id == tasks[0].document_id).first()
-                    if document:
-                        document.status = "Approved"
+                if document:
+                    document.status = "Approved"
             
             db.commit()
     
@@ -210,7 +221,7 @@ class WorkflowManagerService:
             Workflow status information
         """
         
-        db = SessionLocal()
+        db = get_session()
         try:
             workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
             
@@ -221,7 +232,7 @@ class WorkflowManagerService:
             
             # Calculate progress
             total_tasks = len(tasks)
-            completed_tasks = len([t for t in tasks if t.status in ["Approved", "Rejected"]])
+            completed_tasks = len([t for t in tasks if t.status in COMPLETED_TASK_STATUSES])
             pending_tasks = len([t for t in tasks if t.status == "Pending"])
             approved_tasks = len([t for t in tasks if t.status == "Approved"])
             rejected_tasks = len([t for t in tasks if t.status == "Rejected"])
@@ -259,16 +270,28 @@ class WorkflowManagerService:
     def get_project_workflows(self, project_id: str) -> List[Dict]:
         """Get all workflows for a project"""
         
-        db = SessionLocal()
+        db = get_session()
         try:
-            workflows = db.query(Workflow).filter(Workflow.project_id == project_id).all()
+            # Task totals per workflow are aggregated in SQL and joined in,
+            # instead of loading every task of every workflow; only this
+            # project's tasks are aggregated
+            task_counts = (db.query(WorkflowTask.workflow_id.label("workflow_id"),
+                                    func.count(WorkflowTask.id).label("total"),
+                                    func.sum(case((WorkflowTask.status.in_(COMPLETED_TASK_STATUSES), 1),
+                                                  else_=0)).label("completed"))
+                           .join(Workflow, Workflow.id == WorkflowTask.workflow_id)
+                           .filter(Workflow.project_id == project_id)
+                           .group_by(WorkflowTask.workflow_id)
+                           .subquery())
+            rows = (db.query(Workflow, task_counts.c.total, task_counts.c.completed)
+                    .outerjoin(task_counts, task_counts.c.workflow_id == Workflow.id)
+                    .filter(Workflow.project_id == project_id)
+                    .all())
             
             result = []
-            for workflow in workflows:
-                tasks = db.query(WorkflowTask).filter(WorkflowTask.workflow_id == workflow.id).all()
-                
-                total_tasks = len(tasks)
-                completed_tasks = len([t for t in tasks if t.status in ["Approved", "Rejected"]])
+            for workflow, total, completed in rows:
+                total_tasks = total or 0
+                completed_tasks = completed or 0
                 progress = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
                 
                 result.append({
@@ -0,0 +1,118 @@
+"""
+Query plan benchmark for the schema migration indexes
+
+Builds a throwaway database with synthetic projects, files, embeddings,
+documents and workflows, then prints EXPLAIN QUERY PLAN output and timings
+for the app's hot lookups before and after the index migration.
+
+Run with:
+    python tests/benchmark_query_plans.py [--projects 200]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import DatabaseManager
+from config.migrations import run_migrations
+
+QUERIES = {
+    "embeddings for a project":
+        ("SELECT id, file_id, chunk_index FROM vector_embeddings WHERE project_id = ? "
+         "ORDER BY file_id, chunk_index", lambda p: (p,)),
+    "duplicate file check":
+        ("SELECT id FROM project_data_files WHERE project_id = ? AND filename = ? AND content_hash = ?",
+         lambda p: (p, f"file_{p}_3.txt", f"hash_{p}_3")),
+    "documents for a project":
+        ("SELECT * FROM documents WHERE project_id = ? ORDER BY created_at DESC", lambda p: (p,)),
+    "pending workflows for a project":
+        ("SELECT * FROM workflows WHERE project_id = ? AND status = ?", lambda p: (p, "Pending")),
+    "comments for a workflow":
+        ("SELECT * FROM workflow_comments WHERE workflow_id = ? ORDER BY created_at", lambda p: (p * 3,)),
+}
+
+INDEX_MIGRATION = 3
+
+
+def populate(db: DatabaseManager, projects: int):
+    with db.pool.transaction() as conn:
+        cursor = conn.cursor()
+        for p in range(1, projects + 1):
+            cursor.execute("INSERT INTO projects (id, name, type) VALUES (?, ?, ?)", (p, f"Project {p}", "HW"))
+            for f in range(10):
+                cursor.execute('''
+                    INSERT INTO project_data_files (project_id, filename, file_type, file_size, content_hash)
+                    VALUES (?, ?, 'txt', 100, ?)
+                ''', (p, f"file_{p}_{f}.txt", f"hash_{p}_{f}"))
+                file_id = cursor.lastrowid
+                cursor.executemany('''
+                    INSERT INTO vector_embeddings (project_id, file_id, chunk_index, chunk_text, embedding_vector)
+                    VALUES (?, ?, ?, '', ?)
+                ''', [(p, file_id, c, json.dumps([0.0] * 8)) for c in range(20)])
+            for d in range(5):
+                cursor.execute('''
+                    INSERT INTO documents (project_id, name, type, content) VALUES (?, ?, 'SRS', '')
+                ''', (p, f"Doc {d}"))
+                cursor.execute('''
+                    INSERT INTO workflows (project_id, document_id, name, status, approvers)
+                    VALUES (?, ?, 'Review', ?, '[]')
+                ''', (p, cursor.lastrowid, "Pending" if d % 2 else "Approved"))
+                cursor.executemany('''
+                    INSERT INTO workflow_comments (workflow_id, approver, action, comment) VALUES (?, 'qa', 'comment', '')
+                ''', [(cursor.lastrowid,)] * 4)
+
+
+def drop_indexes(db: DatabaseManager):
+    """Undo the index migration so the 'before' plans can be measured"""
+    with db.pool.transaction() as conn:
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'").fetchall():
+            conn.execute(f"DROP INDEX {name}")
+        conn.execute("DELETE FROM schema_migrations WHERE version >= ?", (INDEX_MIGRATION,))
+        conn.execute("DROP TABLE IF EXISTS sqlite_stat1")
+
+
+def report(db: DatabaseManager, label: str, projects: int, repeat: int) -> dict:
+    conn = db.pool.connection()
+    print(f"\n=== {label} (schema version {db.get_schema_version()}) ===")
+    timings = {}
+    for name, (sql, params) in QUERIES.items():
+        plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params(1)).fetchall()
+        start = time.perf_counter()
+        for i in range(repeat):
+            conn.execute(sql, params(i % projects + 1)).fetchall()
+        timings[name] = (time.perf_counter() - start) / repeat * 1000
+        print(f"- {name}: {timings[name]:.3f} ms/query")
+        for row in plan:
+            print(f"    {row[-1]}")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "benchmark.db"))
+        populate(db, args.projects)
+
+        drop_indexes(db)
+        before = report(db, "Before index migration", args.projects, args.repeat)
+
+        run_migrations(db.pool.connection())
+        after = report(db, "After index migration", args.projects, args.repeat)
+
+        print("\n=== Speedup ===")
+        for name in QUERIES:
+            print(f"- {name}: {before[name] / max(after[name], 1e-6):.1f}x")
+        db.pool.close_thread_connection()
+
+
+if __name__ == "__main__":
+    main()
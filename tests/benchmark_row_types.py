@@ -0,0 +1,100 @@
+"""
+Row type benchmark for DatabaseManager listings
+
+Builds a large listing of synthetic project and workflow rows both as the
+eagerly decoded dicts get_projects/get_workflows used to return and as the
+slotted row types in config/rows.py, and reports build time (for a page that
+only reads names, and for one that reads every JSON column) and the memory
+held by the listing.
+
+Run with:
+    python tests/benchmark_row_types.py [--rows 50000]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.rows import Project, Workflow
+
+
+def project_dict(row):
+    return {
+        'id': row[0], 'name': row[1], 'type': row[2], 'description': row[3],
+        'functional_reqs': json.loads(row[4]) if row[4] else [],
+        'non_functional_reqs': json.loads(row[5]) if row[5] else [],
+        'conditions': json.loads(row[6]) if row[6] else [],
+        'recommended_docs': json.loads(row[7]) if row[7] else [],
+        'created_at': row[8], 'updated_at': row[9]
+    }
+
+
+def workflow_dict(row):
+    return {
+        'id': row[0], 'project_id': row[1], 'document_id': row[2], 'name': row[3], 'status': row[4],
+        'approvers': json.loads(row[5]) if row[5] else [],
+        'current_step': row[6], 'created_at': row[7], 'updated_at': row[8]
+    }
+
+
+def synthetic_rows(count):
+    reqs = json.dumps([f"Requirement {i}: response time below {i * 5} ms" for i in range(6)])
+    projects = [(i, f"Project {i}", "Software Development", "Synthetic project", reqs, reqs, reqs,
+                 json.dumps(["PMP", "TCD"]), "2025-01-01 00:00:00", "2025-01-01 00:00:00")
+                for i in range(count)]
+    workflows = [(i, i, i, f"Review {i}", "Active", json.dumps(["PM", "Tech Lead", "QA"]), 0,
+                  "2025-01-01 00:00:00", "2025-01-01 00:00:00")
+                 for i in range(count)]
+    return projects, workflows
+
+
+def measure(build, rows, touch):
+    gc.collect()
+    start = time.perf_counter()
+    items = [build(row) for row in rows]
+    for item in items:
+        touch(item)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    items = [build(row) for row in rows]
+    for item in items:
+        touch(item)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return elapsed * 1000, memory / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    projects, workflows = synthetic_rows(args.rows)
+    cases = [
+        ("projects, names only", projects, project_dict, Project, lambda p: p['name']),
+        ("projects, all requirements", projects, project_dict, Project,
+         lambda p: (p['functional_reqs'], p['non_functional_reqs'], p['conditions'], p['recommended_docs'])),
+        ("workflows, names only", workflows, workflow_dict, Workflow, lambda w: w['name']),
+        ("workflows, approvers", workflows, workflow_dict, Workflow, lambda w: w['approvers']),
+    ]
+
+    print(f"{args.rows:,} rows per listing")
+    for label, rows, as_dict, row_type, touch in cases:
+        dict_ms, dict_mb = measure(as_dict, rows, touch)
+        row_ms, row_mb = measure(row_type, rows, touch)
+        print(f"- {label}: dict {dict_ms:.0f} ms / {dict_mb:.1f} MB -> "
+              f"row {row_ms:.0f} ms / {row_mb:.1f} MB "
+              f"({dict_ms / max(row_ms, 1e-6):.1f}x faster, {100 * (1 - row_mb / dict_mb):.0f}% less memory)")
+
+
+if __name__ == "__main__":
+    main()
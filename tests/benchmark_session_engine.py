@@ -0,0 +1,78 @@
+"""
+Session setup benchmark for the src services layer
+
+Compares building an engine and session factory per operation (what
+get_session_local() used to do) with the process-wide engine and session
+factory in src/database.py, on a throwaway SQLite database. Each operation
+inserts a project and reads it back, like a service call would.
+
+Run with:
+    python tests/benchmark_session_engine.py [--ops 300]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_ops(open_session, ops: int) -> float:
+    """Run ops insert-and-read operations; returns operations per second"""
+    from src.database import Project
+
+    start = time.perf_counter()
+    for i in range(ops):
+        db, cleanup = open_session()
+        try:
+            project = Project(name=f"Benchmark {i}", project_type="Software Development")
+            db.add(project)
+            db.commit()
+            db.query(Project).filter(Project.id == project.id).first()
+        finally:
+            db.close()
+            cleanup()
+    return ops / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ops", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Config reads DATABASE_URL and creates its directories on import
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'benchmark.db')}"
+        os.chdir(tmp)
+        sys.path.insert(0, REPO_ROOT)
+
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from src.config import Config
+        from src.database import create_tables, dispose_engine, get_session
+
+        create_tables()
+
+        def per_operation_engine():
+            engine = create_engine(Config.DATABASE_URL, echo=Config.DEBUG)
+            db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+            # The old code left the engine to the garbage collector; dispose it
+            # here so the run does not pile up open connections
+            return db, engine.dispose
+
+        def shared_engine():
+            return get_session(), lambda: None
+
+        before = run_ops(per_operation_engine, args.ops)
+        after = run_ops(shared_engine, args.ops)
+        dispose_engine()
+
+    print(f"Engine per operation: {before:,.0f} ops/s")
+    print(f"Shared engine:        {after:,.0f} ops/s")
+    print(f"Speedup:              {after / max(before, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import io
+import os
+import sys
+import tarfile
+import zipfile
+
+# Add the current directory to Python path
+sys.path.append(os.getcwd())
+
+from services.archive_ingest import iter_archive_members, looks_binary
+
+EXTENSIONS = {'txt', 'pdf'}
+
+
+def make_zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+def make_tar(files, mtime=1700000000):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as tf:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = mtime
+            tf.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def members(archive, **kwargs):
+    return {m.name: m for m in iter_archive_members(io.BytesIO(archive), **kwargs)}
+
+
+def test_zip_members_matching_crc_are_not_read():
+    archive = make_zip({'a.txt': b'alpha', 'b.txt': b'beta'})
+    first = members(archive)
+    assert first['a.txt'].fingerprint.startswith('zip:5:')
+    known = {name: m.fingerprint for name, m in first.items()}
+
+    changed = make_zip({'a.txt': b'alpha', 'b.txt': b'gamma'})
+    second = members(changed, skip=lambda name, fingerprint: known.get(name) == fingerprint)
+    assert second['a.txt'].unchanged and second['a.txt'].data is None
+    assert not second['b.txt'].unchanged and second['b.txt'].data == b'gamma'
+
+
+def test_tar_members_matching_mtime_are_not_read(tmp_path):
+    path = tmp_path / "docs.tar.gz"
+    path.write_bytes(make_tar({'a.txt': b'alpha'}))
+    known = {m.name: m.fingerprint for m in iter_archive_members(str(path))}
+    assert known == {'a.txt': 'tar:5:1700000000'}
+
+    skip = lambda name, fingerprint: known.get(name) == fingerprint
+    assert members(make_tar({'a.txt': b'alpha'}), skip=skip)['a.txt'].unchanged
+    # Same size, newer mtime: read again
+    touched = members(make_tar({'a.txt': b'alpha'}, mtime=1700000100), skip=skip)['a.txt']
+    assert not touched.unchanged and touched.data == b'alpha'
+
+
+def test_nested_archives_stop_at_depth_two():
+    innermost = make_zip({'deep.txt': b'too deep'})
+    inner = make_tar({'inner.txt': b'inner', 'third.zip': innermost})
+    outer = make_zip({'top.txt': b'top', 'second.tar.gz': inner})
+
+    found = members(outer)
+    assert found['top.txt'].data == b'top'
+    assert found['second.tar.gz/inner.txt'].data == b'inner'
+    assert found['second.tar.gz/third.zip'].error == "Archive nested too deeply"
+    assert 'second.tar.gz/third.zip/deep.txt' not in found
+
+
+def test_nested_archive_skip_sees_the_full_name():
+    outer = make_zip({'second.zip': make_zip({'inner.txt': b'inner'})})
+    seen = []
+    members(outer, skip=lambda name, fingerprint: seen.append(name) or False)
+    assert seen == ['second.zip', 'second.zip/inner.txt']
+
+
+def test_binary_members_without_extractor_are_rejected():
+    archive = make_zip({'notes.txt': b'plain text', 'image.bin': b'\x89PNG\0\0data',
+                        'readme.md': b'# text', 'spec.pdf': b'%PDF\0binary'})
+    found = members(archive, extensions=EXTENSIONS)
+    assert found['image.bin'].error == "Unsupported binary file" and found['image.bin'].data is None
+    # Text without an extractor and binary with one are both passed on
+    assert found['readme.md'].data == b'# text'
+    assert found['spec.pdf'].data == b'%PDF\0binary'
+    assert found['notes.txt'].data == b'plain text'
+
+
+def test_looks_binary_only_sniffs_the_start():
+    assert looks_binary(b'abc\0')
+    assert not looks_binary(b'a' * 8192 + b'\0')
+
+
+def test_members_outside_the_archive_root_are_rejected():
+    archive = make_zip({'../escape.txt': b'x', 'docs/../../up.txt': b'y',
+                        '/abs/root.txt': b'z', 'docs/./sub/../ok.txt': b'ok',
+                        '__MACOSX/._ok.txt': b'', '.git/config': b''})
+    found = members(archive)
+    assert set(found) == {'../escape.txt', 'docs/../../up.txt', 'abs/root.txt', 'docs/ok.txt'}
+    assert found['../escape.txt'].error == "Unsafe path in archive"
+    assert found['docs/../../up.txt'].error == "Unsafe path in archive"
+    assert found['../escape.txt'].data is None
+    assert found['abs/root.txt'].data == b'z'
+    assert found['docs/ok.txt'].data == b'ok'
+
+
+def test_tar_members_outside_the_archive_root_are_rejected():
+    found = members(make_tar({'../../etc/passwd': b'x', 'ok.txt': b'ok'}))
+    assert found['../../etc/passwd'].error == "Unsafe path in archive"
+    assert found['ok.txt'].data == b'ok'
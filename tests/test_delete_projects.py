@@ -0,0 +1,167 @@
+import os
+import sqlite3
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.append(os.getcwd())
+
+from config.database import DatabaseManager
+from config.shard_store import list_shards
+
+PROJECT = {'type': 'HW', 'description': '', 'functional_reqs': ['Brake within 10 ms', 'Log faults']}
+SHARED_TEXT = 'shared supplier spec'
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseManager(str(tmp_path / "delete.db"))
+
+
+def populate(db, name, embeddings=2):
+    """A project with a document revision, a commented workflow, requirements and two files"""
+    project_id = db.save_project({'name': name, **PROJECT})
+    document_id = db.save_document({'project_id': project_id, 'name': 'Plan', 'type': 'PMP', 'content': 'v1'})
+    db.update_document(document_id, {'content': 'v2'})
+    workflow_id = db.save_workflow({'project_id': project_id, 'document_id': document_id, 'name': 'W',
+                                    'approvers': ['a']})
+    db.add_workflow_comment(workflow_id, 'qa', 'Comment', 'looks good')
+    for filename, content in ((f'{name}.txt', f'own text of {name}'), ('spec.txt', SHARED_TEXT)):
+        file_id = db.save_project_data_file(project_id, filename, filename, 'txt', len(content), content,
+                                            f'{name}-{filename}')
+        db.save_vector_embeddings([{'project_id': project_id, 'file_id': file_id, 'chunk_index': i,
+                                    'chunk_text': None, 'embedding_vector': [0.5],
+                                    'chunk_span': (0, len(content))} for i in range(embeddings)])
+    return project_id, workflow_id
+
+
+def count(db, table, where='1'):
+    with sqlite3.connect(db.db_path) as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM {table} WHERE {where}').fetchone()[0]
+
+
+def test_delete_cascades_to_every_related_table(db):
+    doomed, doomed_workflow = populate(db, 'Doomed')
+    kept, kept_workflow = populate(db, 'Kept')
+
+    deleted = db.delete_projects([doomed, doomed, None])
+    assert deleted == {'workflow_comments': 1, 'document_revisions': 1, 'workflows': 1, 'documents': 1,
+                       'project_requirements': 2, 'project_data_files': 2, 'projects': 1,
+                       'vector_embeddings': 4}
+
+    assert [p['id'] for p in db.get_projects()] == [kept]
+    assert db.count_workflow_comments([doomed_workflow, kept_workflow]) == {doomed_workflow: 0, kept_workflow: 1}
+    assert not any(db.get_project_requirements(doomed).values())
+    assert db.list_project_data_files(doomed) == []
+    assert db.get_vector_embeddings(doomed) == []
+    assert len(db.get_vector_embeddings(kept)) == 4
+    for table in ('documents', 'workflows', 'project_requirements', 'project_data_files', 'vector_embeddings'):
+        assert count(db, table, f'project_id = {doomed}') == 0
+
+
+def test_shared_blobs_outlive_the_deleted_project(db):
+    doomed, _ = populate(db, 'Doomed')
+    kept, _ = populate(db, 'Kept')
+    # Two own texts plus the shared one
+    assert count(db, 'content_blobs') == 3
+
+    db.delete_projects([doomed])
+    assert count(db, 'content_blobs') == 2
+    shared = next(f for f in db.list_project_data_files(kept) if f['filename'] == 'spec.txt')
+    assert db.get_file_content(shared['id']) == SHARED_TEXT
+
+    db.delete_projects([kept])
+    assert count(db, 'content_blobs') == 0
+
+
+def test_embeddings_are_deleted_in_batches(db, monkeypatch):
+    doomed, _ = populate(db, 'Doomed', embeddings=5)
+    kept, _ = populate(db, 'Kept', embeddings=1)
+
+    transaction = db.pool.transaction
+    transactions = []
+    monkeypatch.setattr(db.pool, 'transaction', lambda *args, **kwargs: transactions.append(1) or
+                        transaction(*args, **kwargs))
+
+    assert db.delete_projects([doomed], embedding_batch_size=3)['vector_embeddings'] == 10
+    # One transaction for the catalog rows, then batches of 3, 3, 3 and 1
+    assert len(transactions) == 1 + 4
+    assert len(db.get_vector_embeddings(kept)) == 2
+
+
+def test_delete_drops_only_the_deleted_shards(tmp_path):
+    shard_dir = str(tmp_path / "shards")
+    db = DatabaseManager(str(tmp_path / "catalog.db"), shard_dir=shard_dir)
+    doomed, _ = populate(db, 'Doomed')
+    kept, _ = populate(db, 'Kept')
+    assert sorted(list_shards(shard_dir)) == [doomed, kept]
+
+    deleted = db.delete_projects([doomed])
+    assert deleted['project_data_files'] == 2 and deleted['vector_embeddings'] == 4
+    assert list(list_shards(shard_dir)) == [kept]
+    assert len(db.get_vector_embeddings(kept)) == 4
+
+
+def test_delete_nothing(db):
+    populate(db, 'Kept')
+    assert db.delete_projects([]) == {}
+    assert db.delete_projects([None]) == {}
+    assert len(db.get_projects()) == 1
+
+
+@pytest.fixture
+def app(db, tmp_path, monkeypatch):
+    pytest.importorskip("streamlit")
+    from app import main
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main.st, 'session_state', SimpleNamespace(db=db))
+    return main
+
+
+def make_folder(app, name, *files):
+    folder = app.get_project_folder(name)
+    os.makedirs(os.path.join(folder, 'template'), exist_ok=True)
+    for path in ('template/plan.docx',) + files:
+        with open(os.path.join(folder, path), 'w') as f:
+            f.write('x')
+    return folder
+
+
+def test_deleted_project_folder_is_removed(app, db):
+    project_id, _ = populate(db, 'Brake ECU')
+    folder = make_folder(app, 'Brake ECU')
+
+    app.delete_projects_with_folders([{'id': project_id, 'name': 'Brake ECU'}])
+    assert not os.path.exists(folder)
+    assert db.get_projects() == []
+
+
+def test_reserved_template_folder_is_kept(app, db):
+    # Regression: deleting a project named project_templates removed the shipped templates
+    project_id, _ = populate(db, 'project_templates')
+    folder = make_folder(app, 'project_templates', 'PMP_template.docx')
+
+    app.delete_projects_with_folders([{'id': project_id, 'name': 'project_templates'}])
+    assert os.path.exists(os.path.join(folder, 'template', 'plan.docx'))
+    assert os.path.exists(os.path.join(folder, 'PMP_template.docx'))
+
+
+def test_folder_shared_with_a_remaining_project_is_kept(app, db):
+    doomed, _ = populate(db, 'Brake ECU')
+    populate(db, 'Brake_ECU')
+    folder = make_folder(app, 'Brake ECU')
+    assert folder == app.get_project_folder('Brake_ECU')
+
+    app.delete_projects_with_folders([{'id': doomed, 'name': 'Brake ECU'}])
+    assert os.path.exists(os.path.join(folder, 'template', 'plan.docx'))
+
+
+def test_only_the_template_subfolder_is_removed(app, db):
+    project_id, _ = populate(db, 'Brake ECU')
+    folder = make_folder(app, 'Brake ECU', 'notes.txt')
+
+    app.delete_projects_with_folders([{'id': project_id, 'name': 'Brake ECU'}])
+    assert not os.path.exists(os.path.join(folder, 'template'))
+    assert os.path.exists(os.path.join(folder, 'notes.txt'))
@@ -0,0 +1,129 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.append(os.getcwd())
+
+from config.database import DatabaseManager
+
+APPROVERS = 8
+
+
+@pytest.fixture(params=[False, True], ids=['direct', 'write-behind'])
+def db_path(request, tmp_path):
+    path = str(tmp_path / "concurrency.db")
+    return path, request.param
+
+
+@pytest.fixture
+def workflow(db_path):
+    path, write_behind = db_path
+    db = DatabaseManager(path, write_behind=write_behind)
+    project_id = db.save_project({'name': 'P', 'type': 'HW', 'description': ''})
+    document_id = db.save_document({'project_id': project_id, 'name': 'D', 'type': 'PMP', 'content': 'draft'})
+    workflow_id = db.save_workflow({'project_id': project_id, 'document_id': document_id, 'name': 'W',
+                                    'approvers': ['a', 'b', 'c']})
+    return db, workflow_id, document_id
+
+
+def test_stale_workflow_version_conflicts(workflow):
+    db, workflow_id, _ = workflow
+    version = db.get_workflows()[0]['version']
+
+    result = db.update_workflow_if_version(workflow_id, version, {'current_step': 1})
+    assert result == {'updated': True, 'conflict': False, 'version': version + 1, 'current': None}
+
+    stale = db.update_workflow_if_version(workflow_id, version, {'status': 'Rejected'})
+    assert stale['conflict'] and not stale['updated']
+    assert stale['version'] == version + 1
+    assert stale['current']['current_step'] == 1
+    assert db.get_workflows()[0]['status'] != 'Rejected'
+
+
+def test_missing_workflow_conflicts(workflow):
+    db, _, _ = workflow
+    result = db.update_workflow_if_version(999, 1, {'status': 'Rejected'})
+    assert result['conflict'] and result['current'] is None
+
+
+def test_stale_document_version_conflicts(workflow):
+    db, _, document_id = workflow
+    version = db.get_documents()[0]['version']
+
+    assert db.update_document_if_version(document_id, version, {'content': 'first'})['updated']
+    stale = db.update_document_if_version(document_id, version, {'content': 'second'})
+    assert stale['conflict'] and not stale['updated']
+    assert stale['version'] == version + 1
+    assert 'content' not in stale['current']
+
+    document = db.get_documents()[0]
+    assert document['content'] == 'first'
+    assert db.get_document_revision(document_id, 1) == 'draft'
+    assert db.get_document_revision(document_id, 3) is None
+
+
+def test_concurrent_approvals_record_one_decision(workflow, db_path):
+    """Approvers who all loaded the same version race; exactly one decision and one comment land"""
+    db, workflow_id, document_id = workflow
+    path, write_behind = db_path
+    version = db.get_workflows()[0]['version']
+    barrier = threading.Barrier(APPROVERS)
+    outcomes = []
+    errors = []
+
+    def approve(i):
+        local = DatabaseManager(path, write_behind=write_behind)
+        barrier.wait()
+        try:
+            # Same sequence as the approval form in app/main.py
+            with local.transaction():
+                result = local.update_workflow_if_version(workflow_id, version, {'current_step': 1})
+                if not result['conflict']:
+                    local.add_workflow_comment(workflow_id, f'approver{i}', 'Approve', '')
+                    local.log_audit_event('workflow.approve', 'workflow', workflow_id, f'approver{i}')
+                    local.update_document(document_id, {'status': 'In Review'})
+            outcomes.append(result['updated'])
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=approve, args=(i,)) for i in range(APPROVERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert outcomes.count(True) == 1
+    assert outcomes.count(False) == APPROVERS - 1
+    assert db.flush_writes(timeout=5)
+    assert db.count_workflow_comments([workflow_id]) == {workflow_id: 1}
+    assert len(db.get_audit_events('workflow', workflow_id)) == 1
+    workflow_row = db.get_workflows()[0]
+    assert workflow_row['version'] == version + 1
+    assert workflow_row['current_step'] == 1
+
+
+def test_retried_increments_are_not_lost(workflow, db_path):
+    db, workflow_id, _ = workflow
+    path, write_behind = db_path
+
+    def bump(times):
+        local = DatabaseManager(path, write_behind=write_behind)
+        for _ in range(times):
+            while True:
+                current = local.get_workflows(limit=1)[0]
+                result = local.update_workflow_if_version(workflow_id, current['version'],
+                                                          {'current_step': current['current_step'] + 1})
+                if result['updated']:
+                    break
+
+    threads = [threading.Thread(target=bump, args=(10,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert db.get_workflows()[0]['current_step'] == 40
@@ -0,0 +1,138 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.append(os.getcwd())
+
+from config.database import DatabaseManager
+
+PROJECT = {'type': 'HW', 'description': ''}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.db")
+
+
+@pytest.fixture
+def db(path):
+    return DatabaseManager(path)
+
+
+@pytest.fixture
+def workflow(db):
+    project_id = db.save_project({'name': 'P', **PROJECT})
+    document_id = db.save_document({'project_id': project_id, 'name': 'D', 'type': 'PMP', 'content': 'draft'})
+    workflow_id = db.save_workflow({'project_id': project_id, 'document_id': document_id, 'name': 'W',
+                                    'approvers': ['a']})
+    return project_id, document_id, workflow_id
+
+
+def names(rows):
+    return [row['name'] for row in rows]
+
+
+def test_repeated_listing_is_served_from_the_cache(db, workflow):
+    db.get_projects()
+    hits = db.get_cache_stats()['hits']
+    db.get_projects()
+    assert db.get_cache_stats()['hits'] == hits + 1
+
+
+def test_saves_refresh_listings(db, workflow):
+    project_id, document_id, _ = workflow
+    assert names(db.get_projects()) == ['P']
+    assert names(db.get_documents(project_id)) == ['D']
+    assert names(db.get_workflows(project_id)) == ['W']
+
+    second = db.save_project({'name': 'Q', **PROJECT})
+    db.save_document({'project_id': project_id, 'name': 'E', 'type': 'TCD', 'content': ''})
+    db.save_workflow({'project_id': project_id, 'document_id': document_id, 'name': 'X', 'approvers': ['b']})
+
+    assert sorted(names(db.get_projects())) == ['P', 'Q']
+    assert sorted(names(db.get_documents(project_id))) == ['D', 'E']
+    assert sorted(names(db.get_workflows(project_id))) == ['W', 'X']
+    assert db.get_projects_page(limit=1)['has_more']
+    assert db.get_documents(second) == []
+
+
+def test_updates_refresh_listings(db, workflow):
+    project_id, document_id, workflow_id = workflow
+    db.get_projects(), db.get_documents(), db.get_workflows()
+
+    db.update_project(project_id, {'description': 'changed'})
+    db.update_document(document_id, {'status': 'In Review'})
+    db.update_workflow(workflow_id, {'current_step': 1})
+
+    assert db.get_projects()[0]['description'] == 'changed'
+    assert db.get_documents()[0]['status'] == 'In Review'
+    assert db.get_workflows()[0]['current_step'] == 1
+
+
+def test_delete_projects_refreshes_listings(db, workflow):
+    project_id, _, _ = workflow
+    kept = db.save_project({'name': 'Kept', **PROJECT})
+    assert len(db.get_projects()) == 2 and len(db.get_workflows()) == 1
+    before = db.get_metrics()
+
+    db.delete_projects([project_id])
+    assert [p['id'] for p in db.get_projects()] == [kept]
+    assert db.get_documents() == []
+    assert db.get_workflows() == []
+    assert db.get_metrics() != before
+
+
+def test_write_behind_flush_refreshes_other_sessions(path, workflow):
+    _, _, workflow_id = workflow
+    writer = DatabaseManager(path, write_behind=True)
+    # No write queue of its own, so its reads do not wait for the writer's
+    reader = DatabaseManager(path)
+    try:
+        assert reader.get_workflows()[0]['current_step'] == 0
+
+        writer.update_workflow(workflow_id, {'current_step': 1})
+        # Until the batch commits this read may cache the old row again
+        reader.get_workflows()
+        assert writer.flush_writes(timeout=10)
+
+        assert reader.get_workflows()[0]['current_step'] == 1
+    finally:
+        writer.write_queue.close()
+
+
+def test_rolled_back_write_does_not_leak_into_the_cache(db, workflow):
+    project_id, _, _ = workflow
+    assert db.get_projects()[0]['description'] == ''
+    bypassed = db.get_cache_stats()['bypassed']
+
+    with pytest.raises(RuntimeError):
+        with db.pool.transaction():
+            db.update_project(project_id, {'description': 'uncommitted'})
+            # Reads inside the transaction see its writes but bypass the cache
+            assert db.get_projects()[0]['description'] == 'uncommitted'
+            raise RuntimeError("abort")
+
+    assert db.get_cache_stats()['bypassed'] == bypassed + 1
+    assert db.get_projects()[0]['description'] == ''
+
+
+def test_reads_during_an_outer_transaction_are_refreshed_on_commit(db, workflow):
+    project_id, _, _ = workflow
+    db.get_projects()
+    seen = []
+
+    def read_elsewhere():
+        seen.append(db.get_projects()[0]['description'])
+
+    with db.pool.transaction():
+        db.update_project(project_id, {'description': 'committed'})
+        # Another session reads (and caches) the committed state meanwhile
+        reader = threading.Thread(target=read_elsewhere)
+        reader.start()
+        reader.join()
+
+    assert seen == ['']
+    assert db.get_projects()[0]['description'] == 'committed'
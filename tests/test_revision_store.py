@@ -0,0 +1,89 @@
+import os
+import random
+import sys
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.append(os.getcwd())
+
+from config.database import DatabaseManager
+from config.revision_store import SNAPSHOT_INTERVAL, apply_delta, make_delta
+
+EDITS = 35
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseManager(str(tmp_path / "revisions.db"))
+
+
+@pytest.fixture
+def edited_plan(db):
+    """A ~37 KB plan edited EDITS times; returns (project_id, document_id, every version oldest first)"""
+    rng = random.Random(3)
+    words = ['brake', 'torque', 'ASIL', 'supplier', 'review', 'timing']
+    lines = [f"Section {i}: " + ' '.join(rng.choice(words) for _ in range(12)) + "\n" for i in range(400)]
+    versions = [''.join(lines)]
+    project_id = db.save_project({'name': 'Plan project', 'type': 'HW', 'description': ''})
+    document_id = db.save_document({'project_id': project_id, 'name': 'Plan', 'type': 'PMP',
+                                    'content': versions[0]})
+    for n in range(EDITS):
+        i = rng.randrange(len(lines))
+        lines[i] = f"Edited {n}: " + lines[i]
+        if n % 5 == 0:
+            lines.insert(rng.randrange(len(lines)), f"New line {n}\n")
+        if n % 7 == 0:
+            del lines[rng.randrange(len(lines))]
+        versions.append(''.join(lines))
+        db.update_document(document_id, {'content': versions[-1]})
+    return project_id, document_id, versions
+
+
+def test_delta_round_trip():
+    older = "a\nb\nc\n"
+    newer = "a\nB\nc\nd\n"
+    assert apply_delta(newer, make_delta(newer, older)) == older
+
+
+def test_every_revision_reconstructs_across_snapshots(db, edited_plan):
+    _, document_id, versions = edited_plan
+    assert len(versions[0]) > 35 * 1024
+    assert EDITS > 3 * SNAPSHOT_INTERVAL
+
+    for revision, content in enumerate(versions, 1):
+        assert db.get_document_revision(document_id, revision) == content
+
+    revisions = db.get_document_revisions(document_id)
+    assert [r['revision'] for r in revisions] == list(range(len(versions), 0, -1))
+    assert revisions[0]['kind'] == 'current'
+    assert sum(r['kind'] == 'snapshot' for r in revisions) == EDITS // SNAPSHOT_INTERVAL
+
+
+def test_oldest_revision_and_out_of_range(db, edited_plan):
+    _, document_id, versions = edited_plan
+    assert db.get_document_revision(document_id, 1) == versions[0]
+    assert db.get_document_revision(document_id, 0) is None
+    assert db.get_document_revision(document_id, len(versions) + 1) is None
+
+
+def test_unchanged_content_records_no_revision(db, edited_plan):
+    _, document_id, versions = edited_plan
+    db.update_document(document_id, {'status': 'Approved'})
+    db.update_document(document_id, {'content': versions[-1]})
+    assert len(db.get_document_revisions(document_id)) == len(versions)
+
+
+def test_revisions_are_compressed(db, edited_plan):
+    stats = db.get_revision_storage_stats()
+    assert stats['revisions'] == EDITS
+    assert stats['stored_size'] < stats['original_size'] / 10
+
+
+def test_delete_projects_removes_revisions(db, edited_plan):
+    project_id, document_id, _ = edited_plan
+    deleted = db.delete_projects([project_id])
+    assert deleted['document_revisions'] == EDITS
+    assert db.get_revision_storage_stats()['revisions'] == 0
+    assert db.get_document_revisions(document_id) == []
+    assert db.get_document_revision(document_id, 1) is None
@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.append(os.getcwd())
+
+from config import migrations
+from config.connection_pool import ConnectionPool
+from config.database import DatabaseManager
+from config.migrations import ALL_SEARCH_INDEXES
+
+INDEXES = sorted(index for index, _, _ in ALL_SEARCH_INDEXES)
+
+requires_fts5 = pytest.mark.skipif(not migrations.fts5_available(sqlite3.connect(':memory:').cursor()),
+                                   reason="SQLite built without FTS5")
+
+
+def search_index_names(path):
+    with sqlite3.connect(path) as conn:
+        return sorted(row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%\\_fts' ESCAPE '\\'"))
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "search.db")
+
+
+@pytest.fixture
+def no_fts5(monkeypatch):
+    """Migrate as on a SQLite build without FTS5"""
+    monkeypatch.setattr(migrations, 'fts5_available', lambda cursor: False)
+
+
+def populate(db):
+    """Two projects with documents, review comments and requirements"""
+    brake = db.save_project({'name': 'Brake ECU', 'type': 'HW', 'description': '',
+                             'functional_reqs': ['Brake torque within 10 ms', 'Log sensor faults'],
+                             'conditions': ['Supplier delivers torque sensor']})
+    body = db.save_project({'name': 'Body control', 'type': 'SW', 'description': '',
+                            'non_functional_reqs': ['Wake up within 50 ms']})
+    plan = db.save_document({'project_id': brake, 'name': 'Torque plan', 'type': 'PMP',
+                             'content': 'The brake torque ramp is reviewed by the supplier.'})
+    notes = db.save_document({'project_id': body, 'name': 'Notes', 'type': 'TCD',
+                              'content': 'Torque is mentioned once in the appendix.'})
+    workflow_id = db.save_workflow({'project_id': brake, 'document_id': plan, 'name': 'Review',
+                                    'approvers': ['a']})
+    db.add_workflow_comment(workflow_id, 'qa', 'Comment', 'Please add the sensor timing table')
+    return {'brake': brake, 'body': body, 'plan': plan, 'notes': notes, 'workflow': workflow_id}
+
+
+@requires_fts5
+def test_fts_search_ranks_and_highlights(path):
+    db = DatabaseManager(path)
+    ids = populate(db)
+    assert search_index_names(path) == INDEXES
+
+    results = db.search_documents('torque')
+    # Name matches weigh more than body matches (bm25 column weights)
+    assert [r['id'] for r in results] == [ids['plan'], ids['notes']]
+    assert results[0]['score'] > results[1]['score']
+    assert '**torque**' in results[0]['snippet'].lower()
+    assert results[0]['project_name'] == 'Brake ECU' and 'content' not in results[0]
+
+    assert [r['id'] for r in db.search_documents('torq*')] == [ids['plan'], ids['notes']]
+    assert [r['id'] for r in db.search_documents('torque supplier')] == [ids['plan']]
+    assert db.search_documents('torque', project_id=ids['body'])[0]['id'] == ids['notes']
+    assert db.search_documents('<>') == []
+
+    comments = db.search_workflow_comments('sensor timing', highlight=('[', ']'))
+    assert [c['workflow_id'] for c in comments] == [ids['workflow']]
+    assert '[sensor]' in comments[0]['snippet']
+
+    requirements = db.search_requirements('torque')
+    assert {r['kind'] for r in requirements} == {'functional_reqs', 'conditions'}
+    assert [p['project_id'] for p in db.find_projects_by_requirement('within')] in (
+        [ids['brake'], ids['body']], [ids['body'], ids['brake']])
+
+
+def test_like_fallback_without_fts5(path, no_fts5):
+    db = DatabaseManager(path)
+    ids = populate(db)
+    assert search_index_names(path) == []
+
+    results = db.search_documents('torque')
+    # Newest first, every result scored 0
+    assert [r['id'] for r in results] == [ids['notes'], ids['plan']]
+    assert all(r['score'] == 0 for r in results)
+    assert '**Torque**' in results[0]['snippet']
+    assert [r['id'] for r in db.search_documents('torque supplier')] == [ids['plan']]
+    # LIKE wildcards in the query are matched literally
+    assert db.search_documents('tor%') == []
+
+    assert db.search_workflow_comments('timing')[0]['workflow_id'] == ids['workflow']
+    assert [r['text'] for r in db.search_requirements('torque', kind='conditions')] == [
+        'Supplier delivers torque sensor']
+    found = db.find_projects_by_requirement('within')
+    assert sorted(p['project_id'] for p in found) == [ids['brake'], ids['body']]
+
+
+@requires_fts5
+def test_triggers_keep_the_index_in_sync(path):
+    db = DatabaseManager(path)
+    ids = populate(db)
+
+    db.update_document(ids['plan'], {'content': 'Rewritten around the caliper.'})
+    assert [r['id'] for r in db.search_documents('caliper')] == [ids['plan']]
+    # Still found by its name, no longer by the old body
+    assert [r['id'] for r in db.search_documents('ramp')] == []
+    assert [r['id'] for r in db.search_documents('torque')] == [ids['plan'], ids['notes']]
+
+    db.update_project(ids['brake'], {'functional_reqs': ['Release within 20 ms']})
+    assert [r['text'] for r in db.search_requirements('release')] == ['Release within 20 ms']
+    assert [r['kind'] for r in db.search_requirements('torque')] == ['conditions']
+
+    db.delete_projects([ids['brake']])
+    assert [r['id'] for r in db.search_documents('torque')] == [ids['notes']]
+    assert db.search_workflow_comments('sensor') == []
+    assert db.search_requirements('torque') == []
+    with sqlite3.connect(path) as conn:
+        # An external-content index that missed a delete fails its integrity check
+        for index in INDEXES:
+            conn.execute(f"INSERT INTO {index} ({index}) VALUES ('integrity-check')")
+
+
+@requires_fts5
+def test_missing_indexes_are_repaired_at_startup(path, monkeypatch):
+    monkeypatch.setattr(migrations, 'fts5_available', lambda cursor: False)
+    ids = populate(DatabaseManager(path))
+    assert search_index_names(path) == []
+
+    # The same database opened by a new process on a build with FTS5
+    monkeypatch.undo()
+    monkeypatch.setattr(ConnectionPool, '_pools', {})
+    db = DatabaseManager(path)
+    assert search_index_names(path) == INDEXES
+    # Rows written before the repair are indexed and ranked
+    assert [r['id'] for r in db.search_documents('torque')] == [ids['plan'], ids['notes']]
+    assert db.search_workflow_comments('timing')[0]['workflow_id'] == ids['workflow']
+    assert db.search_requirements('torque')[0]['score'] != 0
+
+    # Later writes are picked up by the new triggers
+    db.save_document({'project_id': ids['body'], 'name': 'Caliper spec', 'type': 'TCD', 'content': ''})
+    assert [r['name'] for r in db.search_documents('caliper')] == ['Caliper spec']
+
+
+@requires_fts5
+def test_repair_restores_a_dropped_requirements_index(path):
+    db = DatabaseManager(path)
+    ids = populate(db)
+    with sqlite3.connect(path) as conn:
+        conn.execute('DROP TABLE project_requirements_fts')
+        for trigger in ('ai', 'ad', 'au'):
+            conn.execute(f'DROP TRIGGER project_requirements_fts_{trigger}')
+
+    assert migrations.ensure_search_indexes(sqlite3.connect(path)) == ['project_requirements_fts']
+    assert migrations.ensure_search_indexes(sqlite3.connect(path)) == []
+    fresh = DatabaseManager(path)
+    assert [r['project_id'] for r in fresh.search_requirements('torque')] == [ids['brake'], ids['brake']]
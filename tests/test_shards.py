@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.append(os.getcwd())
+
+from config.connection_pool import MAX_ATTACHED
+from config.database import DatabaseManager
+from config.shard_store import FILE_ID_SHIFT, list_shards
+
+PROJECT = {'type': 'HW', 'description': ''}
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "catalog.db"), str(tmp_path / "shards")
+
+
+@pytest.fixture
+def db(paths):
+    return DatabaseManager(paths[0], shard_dir=paths[1])
+
+
+def add_file(db, project_id, name, content):
+    file_id = db.save_project_data_file(project_id, name, name, 'txt', len(content), content, name + '-hash')
+    db.save_vector_embeddings([{'project_id': project_id, 'file_id': file_id, 'chunk_index': 0,
+                                'chunk_text': None, 'embedding_vector': [0.5], 'chunk_span': (0, len(content))}])
+    return file_id
+
+
+def catalog_count(paths, table, project_id):
+    with sqlite3.connect(paths[0]) as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM {table} WHERE project_id = ?', (project_id,)).fetchone()[0]
+
+
+def test_files_are_routed_to_the_project_shard(db, paths):
+    project_id = db.save_project({'name': 'P', **PROJECT})
+    file_id = add_file(db, project_id, 'a.txt', 'hello shard')
+
+    assert file_id >> FILE_ID_SHIFT == project_id
+    assert list(list_shards(paths[1])) == [project_id]
+    assert catalog_count(paths, 'project_data_files', project_id) == 0
+    assert db.get_file_content(file_id) == 'hello shard'
+    assert db.find_project_data_file(project_id, 'a.txt', 'a.txt-hash') == file_id
+    assert [e['chunk_text'] for e in db.get_vector_embeddings(project_id)] == ['hello shard']
+    with sqlite3.connect(list_shards(paths[1])[project_id]) as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+
+def test_write_to_unattached_shard_inside_transaction(db):
+    project_ids = [db.save_project({'name': f'P{i}', **PROJECT}) for i in range(MAX_ATTACHED + 4)]
+    # More shards than stay attached, so the first ones are detached again
+    for project_id in project_ids:
+        add_file(db, project_id, 'a.txt', f'first {project_id}')
+
+    # After a catalog write, new and previously detached shards are attached
+    # inside the open transaction
+    new_project = db.save_project({'name': 'New', **PROJECT})
+    touched = project_ids[:MAX_ATTACHED] + [new_project]
+    with db.transaction():
+        db.update_project(project_ids[0], {'description': 'changed'})
+        file_ids = {project_id: add_file(db, project_id, 'b.txt', f'second {project_id}')
+                    for project_id in touched}
+
+    for project_id, file_id in file_ids.items():
+        assert file_id >> FILE_ID_SHIFT == project_id
+        assert db.get_file_content(file_id) == f'second {project_id}'
+    assert sorted(f['filename'] for f in db.list_project_data_files(project_ids[-1])) == ['a.txt']
+
+
+def test_rolled_back_shard_writes_leave_nothing(db):
+    project_id = db.save_project({'name': 'P', **PROJECT})
+    add_file(db, project_id, 'a.txt', 'kept')
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.update_project(project_id, {'description': 'changed'})
+            add_file(db, project_id, 'b.txt', 'rolled back')
+            raise RuntimeError("abort")
+    assert [f['filename'] for f in db.list_project_data_files(project_id)] == ['a.txt']
+    assert len(db.get_vector_embeddings(project_id)) == 1
+
+
+def test_catalog_files_move_into_the_shard(paths):
+    unsharded = DatabaseManager(paths[0])
+    project_id = unsharded.save_project({'name': 'Legacy', **PROJECT})
+    legacy_id = add_file(unsharded, project_id, 'a.txt', 'legacy text')
+
+    db = DatabaseManager(paths[0], shard_dir=paths[1])
+    # Served from the catalog until the project is moved
+    assert db.get_file_content(legacy_id) == 'legacy text'
+
+    moved = db.shard_projects()
+    assert moved == {project_id: {'project_data_files': 1, 'vector_embeddings': 1, 'content_blobs': 1}}
+    assert catalog_count(paths, 'project_data_files', project_id) == 0
+    assert catalog_count(paths, 'vector_embeddings', project_id) == 0
+    shard_id = legacy_id + (project_id << FILE_ID_SHIFT)
+    assert db.get_file_content(shard_id) == 'legacy text'
+    assert [e['file_id'] for e in db.get_vector_embeddings(project_id)] == [shard_id]
+    assert add_file(db, project_id, 'b.txt', 'new') >> FILE_ID_SHIFT == project_id
+
+
+def test_move_is_refused_inside_a_transaction(paths):
+    unsharded = DatabaseManager(paths[0])
+    project_id = unsharded.save_project({'name': 'Legacy', **PROJECT})
+    add_file(unsharded, project_id, 'a.txt', 'legacy text')
+
+    db = DatabaseManager(paths[0], shard_dir=paths[1])
+    with db.transaction():
+        # A write inside a transaction stays in the catalog instead of moving the project
+        file_id = add_file(db, project_id, 'b.txt', 'in transaction')
+        with pytest.raises(RuntimeError):
+            db.shard_projects([project_id])
+    assert file_id >> FILE_ID_SHIFT == 0
+    assert list_shards(paths[1]) == {}
+    assert catalog_count(paths, 'project_data_files', project_id) == 2
+
+    assert db.shard_projects([project_id])[project_id]['project_data_files'] == 2
+
+
+def test_delete_projects_removes_the_shard(db, paths):
+    project_id = db.save_project({'name': 'P', **PROJECT})
+    add_file(db, project_id, 'a.txt', 'hello')
+    deleted = db.delete_projects([project_id])
+    assert deleted['project_data_files'] == 1
+    assert deleted['vector_embeddings'] == 1
+    assert list_shards(paths[1]) == {}
@@ -0,0 +1,116 @@
+import csv
+import io
+import os
+import sys
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.append(os.getcwd())
+
+from services.spreadsheet_extractor import iter_csv_windows, iter_spreadsheet_windows, extract_spreadsheet_text
+
+HEADER = ['id', 'requirement', 'owner']
+ROWS = [[str(i), f'Brake response within {i} ms', 'QA' if i % 2 else 'PM'] for i in range(1, 48)]
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "reqs.csv"
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([])  # Leading blank rows are skipped before the header
+        writer.writerow(HEADER)
+        for i, row in enumerate(ROWS):
+            writer.writerow(row)
+            if i == 10:
+                writer.writerow(['', '', ''])  # Blank rows inside the data are dropped
+    return str(path)
+
+
+def baseline_lines():
+    """Every data row as one line, the way a whole-file read formats them"""
+    return [' | '.join(row) for row in ROWS]
+
+
+def body(window):
+    return window.text.split('\n')[2:]
+
+
+def test_windows_repeat_the_header(csv_path):
+    windows = list(iter_spreadsheet_windows(csv_path, 'reqs.csv', max_rows=10))
+    assert len(windows) == 5
+    for window in windows:
+        assert window.text.startswith("--- Sheet: reqs.csv ---\nid | requirement | owner\n")
+        assert window.metadata == {'sheet': 'reqs.csv', 'rows': [window.first_row, window.last_row]}
+        assert 0 < len(body(window)) <= 10
+
+
+def test_windows_cover_every_row_once_in_order(csv_path):
+    windows = list(iter_spreadsheet_windows(csv_path, 'reqs.csv', max_rows=10))
+    assert [line for window in windows for line in body(window)] == baseline_lines()
+    # Rows are numbered from the header (row 1); the skipped blank row still counts
+    assert (windows[0].first_row, windows[-1].last_row) == (2, len(ROWS) + 2)
+    for previous, window in zip(windows, windows[1:]):
+        assert window.first_row > previous.last_row
+
+
+def test_windows_respect_max_chars(csv_path):
+    windows = list(iter_spreadsheet_windows(csv_path, 'reqs.csv', max_rows=1000, max_chars=300))
+    assert len(windows) > 1
+    for window in windows:
+        assert sum(len(line) + 1 for line in body(window)) <= 300 or len(body(window)) == 1
+    assert [line for window in windows for line in body(window)] == baseline_lines()
+
+
+def test_file_object_and_path_give_the_same_windows(csv_path):
+    from_path = list(iter_csv_windows(csv_path, sheet='reqs.csv', max_rows=7))
+    with open(csv_path, 'rb') as f:
+        from_file = list(iter_csv_windows(f, sheet='reqs.csv', max_rows=7))
+        assert not f.closed
+    assert from_file == from_path
+
+
+def test_extracted_text_joins_the_windows(csv_path):
+    windows = list(iter_spreadsheet_windows(csv_path, 'reqs.csv', max_rows=10))
+    text = extract_spreadsheet_text(csv_path, 'reqs.csv', max_rows=10)
+    assert text == "\n\n".join(window.text for window in windows)
+
+
+def test_empty_csv_has_no_windows():
+    assert list(iter_csv_windows(io.BytesIO(b"\n\n"))) == []
+
+
+def test_xlsx_windows_per_sheet(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    first = workbook.active
+    first.title = 'Reqs'
+    first.append(HEADER)
+    for row in ROWS:
+        first.append([int(row[0])] + row[1:])
+    second = workbook.create_sheet('Risks')
+    second.append(['risk', 'level'])
+    second.append(['Sensor failure', 'High'])
+    path = str(tmp_path / "reqs.xlsx")
+    workbook.save(path)
+
+    windows = list(iter_spreadsheet_windows(path, 'reqs.xlsx', max_rows=20))
+    reqs = [window for window in windows if window.sheet == 'Reqs']
+    assert len(reqs) == 3
+    assert all(window.text.startswith("--- Sheet: Reqs ---\nid | requirement | owner\n") for window in reqs)
+    assert [line for window in reqs for line in body(window)] == baseline_lines()
+    assert windows[-1].text == "--- Sheet: Risks ---\nrisk | level\nSensor failure | High"
+
+
+def test_extract_content_chunks_match_the_windows(csv_path):
+    pytest.importorskip("PyPDF2")
+    from services.extractors import extract_content, extract_text
+
+    extracted = extract_content(csv_path, 'reqs.csv', chunk_size=500)
+    assert extracted.content == extract_text(csv_path, 'reqs.csv', chunk_size=500)
+    # RAGService slices the content at these offsets to cite each chunk
+    offset = 0
+    for window in extracted.windows:
+        assert extracted.content[offset:offset + len(window.text)] == window.text
+        offset += len(window.text) + 2
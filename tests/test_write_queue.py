@@ -0,0 +1,134 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.append(os.getcwd())
+
+from config.connection_pool import ConnectionPool
+from config.database import DatabaseManager
+from config.write_queue import QueuedWriteError, WriteQueue
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "queue.db"), write_behind=True)
+    yield db
+    db.write_queue.close()
+
+
+@pytest.fixture
+def workflow_id(db):
+    project_id = db.save_project({'name': 'P', 'type': 'HW', 'description': ''})
+    document_id = db.save_document({'project_id': project_id, 'name': 'D', 'type': 'PMP', 'content': ''})
+    return db.save_workflow({'project_id': project_id, 'document_id': document_id, 'name': 'W',
+                             'approvers': ['a']})
+
+
+def test_reads_see_queued_writes(db, workflow_id):
+    db.add_workflow_comment(workflow_id, 'qa', 'Comment', 'first')
+    db.update_workflow(workflow_id, {'current_step': 1})
+    db.log_audit_event('workflow.comment', 'workflow', workflow_id, 'qa')
+
+    assert [c['comment'] for c in db.get_workflow_comments(workflow_id)] == ['first']
+    assert db.get_workflows()[0]['current_step'] == 1
+    assert len(db.get_audit_events('workflow', workflow_id)) == 1
+    assert db.get_write_queue_stats()['writes'] == 3
+
+
+def test_concurrent_writes_are_group_committed(db, workflow_id):
+    def writer(thread):
+        for i in range(200):
+            db.add_workflow_comment(workflow_id, f'user{thread}', 'Comment', str(i))
+
+    threads = [threading.Thread(target=writer, args=(t,)) for t in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert db.flush_writes(timeout=10)
+    assert db.count_workflow_comments([workflow_id]) == {workflow_id: 800}
+    stats = db.get_write_queue_stats()
+    assert stats['batches'] < stats['writes']
+    assert stats['pending'] == 0 and stats['failed_writes'] == 0
+
+
+def test_writes_inside_a_transaction_are_not_queued(db, workflow_id):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.add_workflow_comment(workflow_id, 'qa', 'Comment', 'rolled back')
+            raise RuntimeError("abort")
+    assert db.get_write_queue_stats()['writes'] == 0
+    assert db.count_workflow_comments([workflow_id]) == {workflow_id: 0}
+
+
+def test_failed_write_is_reported(db, workflow_id):
+    # audit_events.event_type is NOT NULL
+    db.log_audit_event('workflow.comment', 'workflow', workflow_id, 'qa')
+    db.log_audit_event(None, 'workflow', workflow_id, 'qa')
+    db.add_workflow_comment(workflow_id, 'qa', 'Comment', 'kept')
+
+    assert db.flush_writes(timeout=10) is False
+    assert len(db.write_errors) == 1 and 'IntegrityError' in db.write_errors[0]
+    assert db.get_write_queue_stats()['failed_writes'] == 1
+    # Writes in the same batch are retried one by one and still land
+    assert len(db.get_audit_events('workflow', workflow_id)) == 1
+    assert db.count_workflow_comments([workflow_id]) == {workflow_id: 1}
+    # Reported once
+    assert db.flush_writes(timeout=10) is True
+    assert db.write_errors == []
+
+
+def test_failed_write_fails_the_next_read(db, workflow_id):
+    db.log_audit_event(None, 'workflow', workflow_id, 'qa')
+    with pytest.raises(QueuedWriteError, match='IntegrityError'):
+        db.get_audit_events()
+    assert db.get_audit_events() == []
+
+
+def test_failures_are_reported_to_the_manager_that_queued_them(db, tmp_path, workflow_id):
+    other = DatabaseManager(str(tmp_path / "queue.db"), write_behind=True)
+    assert other.write_queue is db.write_queue
+    other.log_audit_event(None, 'workflow', workflow_id, 'qa')
+
+    assert db.flush_writes(timeout=10) is True
+    assert other.flush_writes(timeout=10) is False
+
+
+def test_flush_reports_failures_up_to_the_barrier(tmp_path):
+    pool = ConnectionPool.for_path(str(tmp_path / "raw.db"))
+    with pool.transaction() as conn:
+        conn.execute('CREATE TABLE t (x INTEGER NOT NULL)')
+    write_queue = WriteQueue(pool)
+    try:
+        good = write_queue.enqueue('INSERT INTO t (x) VALUES (?)', [(1,)], ('t',))
+        bad = write_queue.enqueue('INSERT INTO t (x) VALUES (?)', [(None,)], ('t',))
+
+        assert write_queue.flush(timeout=10) is False
+        assert write_queue.flush(timeout=10, seqs=[good]) is True
+        failed, pending = write_queue.check([good, bad])
+        assert list(failed) == [bad] and pending == []
+    finally:
+        write_queue.close()
+
+
+def test_backlog_is_bounded(tmp_path):
+    pool = ConnectionPool.for_path(str(tmp_path / "raw.db"))
+    with pool.transaction() as conn:
+        conn.execute('CREATE TABLE t (x INTEGER)')
+    write_queue = WriteQueue(pool, max_batch_rows=8, max_pending=16)
+    try:
+        for i in range(500):
+            write_queue.enqueue('INSERT INTO t (x) VALUES (?)', [(i,)], ('t',))
+            assert write_queue.stats()['pending'] <= 16 + 8
+        assert write_queue.flush(timeout=10)
+        stats = write_queue.stats()
+        assert stats['blocked_enqueues'] > 0
+        assert stats['max_batch_rows'] <= 8
+        with pool.transaction() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 500
+    finally:
+        write_queue.close()